@@ -0,0 +1,2 @@
+# audit_service/__init__.py
+from .pipeline import aaudit_document
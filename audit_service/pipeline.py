@@ -0,0 +1,182 @@
+# audit_service/pipeline.py
+import asyncio
+import time
+from pathlib import Path
+from combined_checker import acheck_combined_compliance
+from common.async_client import AsyncModelClient
+from common.audit_index import file_sha256
+from common.config import Config
+from common.logger import setup_logger
+from common.metrics import document_counters, document_scope, get_metrics
+from common.page_journal import PageJournal
+from common.page_stream import get_event_writer
+from common.result_sink import emit_results
+from common.run_ledger import get_run_ledger, issue_category
+from contract_checker import acheck_contract_compliance
+from contract_checker.validator import validate_contract, export_to_excel
+from seal_detector import adetect_seal_compliance
+from seal_detector.exporter import export_seal_to_excel
+
+logger = setup_logger("AuditPipeline")
+
+MODES = ("seal", "contract", "combined")
+
+
+def report_seal(report: dict, pdf_path: str, export: bool = True):
+    """输出盖章核验结论并导出 Excel（export=False 时仅输出结论，返回 None）。"""
+    errors = report.get("errors", [])
+    warnings = report.get("warnings", [])
+
+    if errors:
+        logger.error("❌ 盖章核验不通过，发现以下严重问题：")
+        for err in errors:
+            logger.error(f"   • {err}")
+    if warnings:
+        logger.warning("⚠️ 盖章核验发现以下注意项：")
+        for warn in warnings:
+            logger.warning(f"   • {warn}")
+    if not errors and not warnings:
+        logger.info("✅ 盖章合规性核验通过：所有签章符合要求.")
+    if not export:
+        return None
+
+    # 导出 Excel：与 _seal_raw.json 同目录同名（仅扩展名不同）
+    pdf_stem = Path(pdf_path).stem
+    excel_path = Config.OUTPUT_DIR / f"{pdf_stem}_seal.xlsx"
+    export_seal_to_excel(report, str(excel_path))
+    logger.info(f"盖章结果已导出至: {excel_path}")
+    return excel_path
+
+
+def report_contract(report: dict, pdf_path: str, export: bool = True):
+    """输出合同审核结论并导出 Excel（export=False 时仅输出结论，返回 None）。"""
+    errors = report.get("errors", [])
+    warnings = report.get("warnings", [])
+
+    if errors:
+        logger.error("❌ 合同审核不通过，发现以下严重问题：")
+        for err in errors:
+            logger.error(f"   • {err}")
+    if warnings:
+        logger.warning("⚠️ 合同审核发现以下注意项：")
+        for warn in warnings:
+            logger.warning(f"   • {warn}")
+    if not errors and not warnings:
+        logger.info("✅ 合同合规性核验通过：所有审核项符合要求.")
+    if not export:
+        return None
+
+    # 导出 Excel：与 _raw.json 同目录同名（仅扩展名不同）
+    pdf_stem = Path(pdf_path).stem
+    excel_path = Config.OUTPUT_DIR / f"{pdf_stem}.xlsx"
+    export_to_excel(report, str(excel_path))
+    logger.info(f"合同结果已导出至: {excel_path}")
+    return excel_path
+
+
+async def aaudit_document(pdf_path: str, mode: str, client: AsyncModelClient = None, concurrency: int = None,
+                          export_excel: bool = True, on_event=None) -> dict:
+    """对单个文件执行指定模式的审核并导出 Excel（export_excel=False 时不生成单文档工作簿）。
+
+    返回 {"outcome": 结论摘要, "seal_report": 盖章报告或 None, "contract_report": 合同报告或 None}；
+    报告结构与 detect_seal_compliance / validate_contract 的返回一致。
+    校验与 Excel 导出为阻塞操作，放到线程中执行，不占用事件循环。
+    每个文档（含处理失败的）在审核台账中追加一条记录。
+    on_event 接收逐页结果与提前结论（见 common.page_stream.PageStream）；未给出时按 Config.STREAM_JSONL 写出 JSONL。
+    """
+    if mode not in MODES:
+        raise ValueError(f"未知审核模式: {mode}")
+    start = time.perf_counter()
+    with document_scope() as counters, get_metrics().timer("document"):
+        try:
+            result = await _aaudit_document(pdf_path, mode, client, concurrency, export_excel,
+                                            on_event or get_event_writer())
+        except Exception as e:
+            failed = {"file": pdf_path, "mode": mode, "status": "error", "error_type": type(e).__name__}
+            await asyncio.to_thread(_record_run, failed, time.perf_counter() - start, counters, [])
+            raise
+    await asyncio.to_thread(_record_run, result["outcome"], time.perf_counter() - start, counters,
+                            _issue_categories(result))
+    return result
+
+
+def _issue_categories(result: dict) -> list:
+    """汇总两份报告中的问题类别，供台账按错误类型统计。"""
+    issues = []
+    for key in ("seal_report", "contract_report"):
+        report = result.get(key) or {}
+        issues += [("error", issue_category(msg)) for msg in report.get("errors", [])]
+        issues += [("warning", issue_category(msg)) for msg in report.get("warnings", [])]
+    return issues
+
+
+def _emit_results(outcome: dict, seal_report: dict, contract_report: dict):
+    """追加到分析用结果数据集（JSONL / Parquet）。"""
+    emit_results(outcome, seal_report, contract_report, file_sha256(outcome["file"]))
+
+
+def _record_run(outcome: dict, duration_s: float, counters: dict, issues: list):
+    """写入审核台账；台账不可用时仅告警，不影响审核结果。"""
+    try:
+        get_run_ledger().record(outcome, duration_s, dict(counters), issues)
+    except Exception as e:
+        logger.warning(f"写入审核台账失败: {e}")
+
+
+async def _aaudit_document(pdf_path: str, mode: str, client: AsyncModelClient, concurrency: int,
+                           export_excel: bool, on_event=None) -> dict:
+    pdf_stem = Path(pdf_path).stem
+    outcome = {"file": pdf_path, "mode": mode, "errors": 0, "warnings": 0, "outputs": [], "excel": {}, "raw": {}}
+
+    seal_report = contract_report = page_results = None
+    journal = None
+    if Config.JOURNAL_ENABLED and Path(pdf_path).is_file():
+        journal = await asyncio.to_thread(PageJournal.open, pdf_path, mode)
+    try:
+        if mode == "seal":
+            seal_report = await adetect_seal_compliance(pdf_path, concurrency, client, journal=journal,
+                                                        on_event=on_event)
+        elif mode == "contract":
+            page_results = await acheck_contract_compliance(pdf_path, concurrency, client=client, journal=journal,
+                                                            on_event=on_event)
+        else:
+            seal_report, page_results = await acheck_combined_compliance(pdf_path, concurrency, client,
+                                                                         journal=journal, on_event=on_event)
+    finally:
+        if journal is not None:
+            journal.close()
+
+    if seal_report is not None:
+        excel_path = await asyncio.to_thread(report_seal, seal_report, pdf_path, export_excel)
+        outcome["errors"] += len(seal_report.get("errors", []))
+        outcome["warnings"] += len(seal_report.get("warnings", []))
+        outcome["raw"]["seal"] = str(Config.OUTPUT_DIR / f"{pdf_stem}_seal_raw.json")
+        outcome["outputs"].append(outcome["raw"]["seal"])
+        if excel_path is not None:
+            outcome["outputs"].append(str(excel_path))
+            outcome["excel"]["seal"] = str(excel_path)
+        outcome["pages"] = len(seal_report.get("raw_data", []))
+
+    if page_results is not None:
+        contract_report = await asyncio.to_thread(validate_contract, page_results, pdf_path)
+        excel_path = await asyncio.to_thread(report_contract, contract_report, pdf_path, export_excel)
+        outcome["errors"] += len(contract_report.get("errors", []))
+        outcome["warnings"] += len(contract_report.get("warnings", []))
+        outcome["raw"]["contract"] = str(Config.OUTPUT_DIR / f"{pdf_stem}_raw.json")
+        outcome["outputs"].append(outcome["raw"]["contract"])
+        if excel_path is not None:
+            outcome["outputs"].append(str(excel_path))
+            outcome["excel"]["contract"] = str(excel_path)
+        outcome["pages"] = max(outcome.get("pages", 0), len(page_results))
+        # 合并后的合同字段随结论保存（含增量索引），供批量模式的跨文档规则使用
+        outcome["contract"] = contract_report["summary"]["merged_contract"]
+
+    outcome["status"] = "fail" if outcome["errors"] else "pass"
+    counters = document_counters()
+    outcome["requests"] = {k: int(counters.get(k, 0)) for k in ("retries", "throttled", "failed_pages")}
+    if Config.RESULT_SINKS:
+        await asyncio.to_thread(_emit_results, outcome, seal_report, contract_report)
+    if journal is not None:
+        # 报告与导出均已完成，页面日志不再需要
+        journal.complete()
+    return {"outcome": outcome, "seal_report": seal_report, "contract_report": contract_report}
@@ -0,0 +1,259 @@
+# audit_service/server.py
+import asyncio
+import itertools
+import re
+import time
+import uuid
+from urllib.parse import unquote
+from dataclasses import dataclass, field
+from pathlib import Path
+from aiohttp import web
+from common.async_client import AsyncModelClient
+from common.config import Config
+from common.logger import setup_logger
+from common.metrics import get_metrics
+from .pipeline import MODES, aaudit_document
+
+logger = setup_logger("AuditService")
+
+
+@dataclass
+class Job:
+    """一次审核任务：状态依次为 queued → running → done / error。"""
+    id: str
+    file: str
+    mode: str
+    seq: int
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: float = None
+    finished_at: float = None
+    error: str = None
+    result: dict = None
+    upload: bool = False
+
+    def to_dict(self) -> dict:
+        data = {
+            "id": self.id, "file": self.file, "mode": self.mode, "status": self.status,
+            "created_at": self.created_at, "started_at": self.started_at,
+            "finished_at": self.finished_at, "error": self.error
+        }
+        if self.result is not None:
+            data["outcome"] = self.result["outcome"]
+        return data
+
+
+class AuditService:
+    """常驻审核服务：进程保持热启动，任务进入队列后由固定数量的工作协程处理，
+    所有任务共享同一个异步模型客户端（连接池与总并发上限）。"""
+
+    def __init__(self, workers: int = None, max_jobs: int = None):
+        self.workers = max(1, workers or Config.SERVE_WORKERS)
+        self.max_jobs = max_jobs or Config.SERVE_MAX_JOBS
+        self.jobs = {}
+        self._seq = itertools.count(1)
+        self._queue = None
+        self._client = None
+        self._tasks = []
+
+    async def start(self, app=None):
+        self._queue = asyncio.Queue()
+        self._client = AsyncModelClient(Config.MAX_WORKERS * self.workers)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"审核服务已启动：{self.workers} 个工作协程")
+
+    async def stop(self, app=None):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._client.close()
+        if Config.RESULT_SINKS:
+            from common.result_sink import close_result_sinks
+            close_result_sinks()
+
+    def submit(self, pdf_path: str, mode: str, upload: bool = False) -> Job:
+        """upload 为真表示文件由 multipart 上传保存在 UPLOAD_DIR 中，任务结束后删除。"""
+        job = Job(id=uuid.uuid4().hex, file=pdf_path, mode=mode, seq=next(self._seq), upload=upload)
+        self.jobs[job.id] = job
+        self._queue.put_nowait(job)
+        self._prune()
+        return job
+
+    def _prune(self):
+        """仅保留最近 max_jobs 个任务；排队或执行中的任务不会被清除。"""
+        finished = [j for j in self.jobs.values() if j.status in ("done", "error")]
+        excess = len(self.jobs) - self.max_jobs
+        for job in sorted(finished, key=lambda j: j.seq)[:max(0, excess)]:
+            del self.jobs[job.id]
+
+    async def _worker(self, idx: int):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            logger.info(f"[worker {idx}] 开始任务 {job.id}: {Path(job.file).name}（{job.mode}）")
+            try:
+                job.result = await aaudit_document(job.file, job.mode, client=self._client)
+                job.status = "done"
+            except Exception as e:
+                logger.error(f"任务 {job.id} 失败: {e}")
+                job.error = str(e)
+                job.status = "error"
+            finally:
+                job.finished_at = time.time()
+                if job.upload:
+                    # 报告已写入输出目录，上传的原文件不再保留
+                    Path(job.file).unlink(missing_ok=True)
+                self._queue.task_done()
+
+
+routes = web.RouteTableDef()
+
+
+def _get_job(request) -> Job:
+    job = request.app["service"].jobs.get(request.match_info["job_id"])
+    if job is None:
+        raise web.HTTPNotFound(text="任务不存在")
+    return job
+
+
+@routes.get("/health")
+async def health(request):
+    service = request.app["service"]
+    return web.json_response({"status": "ok", "queued": service._queue.qsize(), "jobs": len(service.jobs)})
+
+
+@routes.get("/metrics")
+async def metrics(request):
+    """以 Prometheus 文本格式返回服务启动以来的分阶段耗时与计数器。"""
+    return web.Response(text=get_metrics().to_prometheus(), content_type="text/plain", charset="utf-8")
+
+
+async def _save_upload(part) -> Path:
+    """将上传文件流式写入 UPLOAD_DIR；超过 SERVE_MAX_UPLOAD_MB 时删除已写入部分并返回 413。
+
+    client_max_size 只限制一次性读入内存的请求体，不限制 multipart 流式读取，因此在此逐块计数。
+    """
+    limit = Config.SERVE_MAX_UPLOAD_MB * 1024 * 1024
+    name = re.sub(r"[^\w.\-]", "_", Path(unquote(part.filename or "upload.pdf")).name)
+    upload_dir = Config.UPLOAD_DIR
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    dest = (upload_dir / f"{uuid.uuid4().hex[:8]}_{name}").resolve()
+    size = 0
+    try:
+        with open(dest, "wb") as f:
+            while chunk := await part.read_chunk():
+                size += len(chunk)
+                if size > limit:
+                    raise web.HTTPRequestEntityTooLarge(max_size=limit, actual_size=size)
+                f.write(chunk)
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return dest
+
+
+@routes.post("/jobs")
+async def create_job(request):
+    """提交任务：multipart 上传（字段 file，可选 mode），或 JSON {"path": ..., "mode": ...}。
+
+    上传的文件在任务结束（完成或失败）后删除，报告保存在输出目录中；按路径提交的文件不会被删除。
+    """
+    mode = request.query.get("mode", "combined")
+    upload = request.content_type.startswith("multipart/")
+    if upload:
+        pdf_path = None
+        try:
+            async for part in await request.multipart():
+                if part.name == "mode":
+                    mode = (await part.text()).strip()
+                elif part.name == "file":
+                    if pdf_path is not None:
+                        Path(pdf_path).unlink(missing_ok=True)
+                    pdf_path = str(await _save_upload(part))
+        except web.HTTPException:
+            if pdf_path is not None:
+                Path(pdf_path).unlink(missing_ok=True)
+            raise
+        if pdf_path is None:
+            raise web.HTTPBadRequest(text="缺少上传文件字段 file")
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            # json.JSONDecodeError / UnicodeDecodeError：请求体为空、非 UTF-8 或不是合法 JSON
+            raise web.HTTPBadRequest(text="请求体不是有效的 JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="请求体必须为 JSON 对象")
+        mode = body.get("mode", mode)
+        if not body.get("path") or not isinstance(body["path"], str):
+            raise web.HTTPBadRequest(text="缺少 path")
+        pdf_path = str(Path(body["path"]).resolve())
+        if not Path(pdf_path).is_file():
+            raise web.HTTPBadRequest(text=f"文件不存在: {pdf_path}")
+
+    error = None
+    if mode not in MODES:
+        error = f"mode 必须为 {', '.join(MODES)} 之一"
+    elif Path(pdf_path).suffix.lower() != ".pdf":
+        error = "仅支持 .pdf 文件"
+    if error:
+        if upload:
+            Path(pdf_path).unlink(missing_ok=True)
+        raise web.HTTPBadRequest(text=error)
+
+    job = request.app["service"].submit(pdf_path, mode, upload=upload)
+    return web.json_response(job.to_dict(), status=202)
+
+
+@routes.get("/jobs")
+async def list_jobs(request):
+    jobs = sorted(request.app["service"].jobs.values(), key=lambda j: j.seq)
+    return web.json_response([j.to_dict() for j in jobs])
+
+
+@routes.get("/jobs/{job_id}")
+async def job_status(request):
+    return web.json_response(_get_job(request).to_dict())
+
+
+@routes.get("/jobs/{job_id}/result")
+async def job_result(request):
+    """返回与 detect_seal_compliance / validate_contract 相同结构的报告。"""
+    job = _get_job(request)
+    if job.status != "done":
+        return web.json_response(job.to_dict(), status=409)
+    return web.json_response({
+        "outcome": job.result["outcome"],
+        "seal_report": job.result["seal_report"],
+        "contract_report": job.result["contract_report"]
+    })
+
+
+@routes.get("/jobs/{job_id}/excel/{kind}")
+async def job_excel(request):
+    """下载 Excel 报告，kind 为 seal 或 contract。"""
+    job = _get_job(request)
+    if job.status != "done":
+        return web.json_response(job.to_dict(), status=409)
+    path = job.result["outcome"]["excel"].get(request.match_info["kind"])
+    if not path or not Path(path).exists():
+        raise web.HTTPNotFound(text="该任务没有此类报告")
+    return web.FileResponse(path, headers={"Content-Disposition": f'attachment; filename="{Path(path).name}"'})
+
+
+def create_app(workers: int = None) -> web.Application:
+    service = AuditService(workers)
+    app = web.Application(client_max_size=Config.SERVE_MAX_UPLOAD_MB * 1024 * 1024)
+    app["service"] = service
+    app.add_routes(routes)
+    app.on_startup.append(service.start)
+    app.on_cleanup.append(service.stop)
+    return app
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, workers: int = None):
+    """启动本地审核服务（阻塞直到退出）。"""
+    Config.init_dirs()
+    logger.info(f"审核服务监听 http://{host}:{port}")
+    web.run_app(create_app(workers), host=host, port=port, print=None)
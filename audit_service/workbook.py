@@ -0,0 +1,83 @@
+# audit_service/workbook.py
+import json
+from pathlib import Path
+from common.config import Config
+from common.excel_writer import StreamingWorkbook
+from common.logger import setup_logger
+from common.metrics import get_metrics
+from contract_checker.validator import build_contract_report, contract_sheets
+from seal_detector.detector import summarize_seal_pages
+from seal_detector.exporter import seal_sheets
+
+logger = setup_logger("BatchWorkbook")
+
+SUMMARY_SHEET = "文档汇总"
+MODE_KINDS = {"seal": ("seal",), "contract": ("contract",), "combined": ("seal", "contract")}
+SHEET_PREFIX = {"seal": "盖章-", "contract": "合同-"}
+SUMMARY_COLUMNS = ("Document", "Path", "Mode", "Status", "Errors", "Warnings", "Skipped", "Message")
+BATCH_ISSUES_SHEET = "跨文档校验"
+BATCH_ISSUE_COLUMNS = ("Document", "Type", "Rule", "Message")
+
+
+def raw_result_path(outcome: dict, kind: str):
+    """定位文档的逐页原始结果文件；旧版索引记录没有 raw 字段时按命名规则推断。"""
+    path = outcome.get("raw", {}).get(kind)
+    if path:
+        return Path(path)
+    suffix = "_seal_raw.json" if kind == "seal" else "_raw.json"
+    for p in outcome.get("outputs", []):
+        if p.endswith(suffix) and (kind == "seal" or not p.endswith("_seal_raw.json")):
+            return Path(p)
+    return Config.OUTPUT_DIR / f"{Path(outcome['file']).stem}{suffix}"
+
+
+class BatchWorkbook:
+    """整批合并工作簿：每个文档的原始、合并与判定行追加到同一组工作表，首列为文档名。
+
+    报告由各文档的原始结果 JSON 逐个重建后立即写出并释放，内存占用与批量大小无关；
+    增量跳过的文档同样收录。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._wb = StreamingWorkbook(self.path)
+        self._wb.sheet(SUMMARY_SHEET, SUMMARY_COLUMNS)
+
+    def add(self, outcome: dict):
+        """追加一个文档（处理失败的文档仅写入汇总表）。"""
+        name = Path(outcome["file"]).name
+        self._wb.append(SUMMARY_SHEET, {
+            "Document": name, "Path": outcome["file"], "Mode": outcome["mode"], "Status": outcome["status"],
+            "Errors": outcome.get("errors", ""), "Warnings": outcome.get("warnings", ""),
+            "Skipped": bool(outcome.get("skipped")), "Message": outcome.get("message", "")
+        })
+        for issue in outcome.get("batch_issues", []):
+            self._wb.append(BATCH_ISSUES_SHEET, self._with_document(name, BATCH_ISSUE_COLUMNS[1:], issue),
+                            BATCH_ISSUE_COLUMNS)
+        if outcome["status"] == "error":
+            return
+
+        with get_metrics().timer("export"):
+            for kind in MODE_KINDS[outcome["mode"]]:
+                raw_path = raw_result_path(outcome, kind)
+                try:
+                    with open(raw_path, "r", encoding="utf-8") as f:
+                        pages = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"无法读取原始结果 {raw_path}，合并工作簿中缺少该文档明细: {e}")
+                    continue
+                if kind == "seal":
+                    sheets = seal_sheets(summarize_seal_pages(pages))
+                else:
+                    sheets = contract_sheets(build_contract_report(pages))
+                for sheet, columns, rows in sheets:
+                    self._wb.write_rows(SHEET_PREFIX[kind] + sheet, ("Document",) + columns,
+                                        (self._with_document(name, columns, row) for row in rows))
+
+    @staticmethod
+    def _with_document(name: str, columns: tuple, row: dict) -> dict:
+        return {"Document": name, **{c: row.get(c) for c in columns}}
+
+    def save(self):
+        self._wb.save()
+        logger.info(f"批量合并工作簿已导出至: {self.path}")
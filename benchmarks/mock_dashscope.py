@@ -0,0 +1,237 @@
+# benchmarks/mock_dashscope.py
+"""本地 DashScope 替身：模拟多模态 / 文本生成接口的延迟、错误率与 429 限流，返回符合 schema 的固定响应。
+
+审核流程把 Config.DASHSCOPE_BASE_URL（或环境变量 DASHSCOPE_HTTP_BASE_URL）指向本服务即可离线运行。
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import uuid
+from dataclasses import dataclass, field
+
+from aiohttp import web
+
+VISION_PATH = "/api/v1/services/aigc/multimodal-generation/generation"
+TEXT_PATH = "/api/v1/services/aigc/text-generation/generation"
+
+# 按字段名给出的固定取值（其余字符串字段返回空串，表示“未识别到”）
+CANNED_STRINGS = {
+    "contract_name": "采购合同",
+    "contract_id": "HT-2024-0001",
+    "party_a_name": "示例贸易有限公司",
+    "party_b_name": "样例制造有限公司",
+    "effective_start": "2024-01-01",
+    "effective_end": "2025-12-31",
+    "seal_party_a": "示例贸易有限公司合同专用章",
+    "seal_party_b": "样例制造有限公司合同专用章",
+    "sign_party_a": "张三",
+    "sign_party_b": "李四",
+    "settlement_method": "银行转账",
+    "bank_account_name": "样例制造有限公司",
+    "bank_name": "兴业银行示例支行",
+    "bank_account_number": "6222000011112222",
+    "payment_terms": "验收合格后30日内付款",
+    "goods_name": "工业传感器",
+    "quantity": "1200",
+    "total_amount_incl_tax": "356000.00",
+    "related_entities": "",
+    "seal_text": "样例制造有限公司合同专用章",
+}
+
+
+@dataclass
+class MockSettings:
+    """延迟（毫秒，均值 ± 抖动）、错误率与 429 比例（0-1）、单页带章概率、随机种子。"""
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    seal_rate: float = 0.5
+    seed: int = 0
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    ok: int = 0
+    errors: int = 0
+    throttled: int = 0
+    request_bytes: int = 0
+    by_path: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {"requests": self.requests, "ok": self.ok, "errors": self.errors, "throttled": self.throttled,
+                "request_bytes": self.request_bytes, "by_path": dict(self.by_path)}
+
+
+def canned_value(schema: dict, name: str, rng: random.Random, settings: MockSettings):
+    """按 JSON schema 生成一个符合类型约束的取值。"""
+    kind = schema.get("type")
+    if kind == "object":
+        props = schema.get("properties", {})
+        value = {k: canned_value(v, k, rng, settings) for k, v in props.items()}
+        if "requires_seal" in value and "seals" in value:
+            has_seal = rng.random() < settings.seal_rate
+            value["requires_seal"] = has_seal
+            if not has_seal:
+                value["seals"] = []
+        return value
+    if kind == "array":
+        return [canned_value(schema.get("items", {}), name, rng, settings)]
+    if kind == "boolean":
+        return True
+    if kind in ("integer", "number"):
+        return 1
+    return CANNED_STRINGS.get(name, "")
+
+
+def _contract_fields() -> dict:
+    """文本接口不带 schema，按合同字段返回。"""
+    return {k: v for k, v in CANNED_STRINGS.items() if k != "seal_text"}
+
+
+def _requested_pages(payload: dict) -> list:
+    content = payload["input"]["messages"][0]["content"]
+    pages = []
+    for part in content:
+        m = re.match(r"第 (\d+) 页：$", part.get("text", "")) if isinstance(part, dict) else None
+        if m:
+            pages.append(int(m.group(1)))
+    return pages
+
+
+def create_app(settings: MockSettings = None) -> web.Application:
+    settings = settings or MockSettings()
+    rng = random.Random(settings.seed)
+    stats = MockStats()
+
+    async def generate(request: web.Request):
+        body = await request.read()
+        stats.requests += 1
+        stats.request_bytes += len(body)
+        stats.by_path[request.path] = stats.by_path.get(request.path, 0) + 1
+        request_id = uuid.uuid4().hex
+
+        delay = max(0.0, rng.gauss(settings.latency_ms, settings.jitter_ms / 2)) / 1000
+        roll = rng.random()
+        if roll < settings.throttle_rate:
+            stats.throttled += 1
+            await asyncio.sleep(delay * 0.1)
+            return web.json_response({"code": "Throttling.RateQuota", "message": "Requests rate limit exceeded",
+                                      "request_id": request_id}, status=429)
+        if roll < settings.throttle_rate + settings.error_rate:
+            stats.errors += 1
+            await asyncio.sleep(delay)
+            return web.json_response({"code": "InternalError", "message": "mock internal error",
+                                      "request_id": request_id}, status=500)
+
+        payload = json.loads(body)
+        schema = (payload.get("parameters", {}).get("response_format") or {}).get("schema")
+        if schema and "pages" in schema.get("properties", {}):
+            # 多页合并请求：按图像前的页码说明逐页返回
+            item_schema = schema["properties"]["pages"]["items"]
+            pages = _requested_pages(payload)
+            value = {"pages": [{**canned_value(item_schema, "", rng, settings), "page": n} for n in pages]}
+        elif schema:
+            value = canned_value(schema, "", rng, settings)
+        else:
+            value = _contract_fields()
+        text = json.dumps(value, ensure_ascii=False)
+        await asyncio.sleep(delay)
+
+        message_content = [{"text": text}] if request.path == VISION_PATH else text
+        stats.ok += 1
+        return web.json_response({
+            "output": {"choices": [{"finish_reason": "stop",
+                                    "message": {"role": "assistant", "content": message_content}}]},
+            "usage": {"input_tokens": len(body) // 4, "output_tokens": len(text) // 2},
+            "request_id": request_id,
+        })
+
+    async def get_stats(request):
+        return web.json_response(stats.to_dict())
+
+    app = web.Application(client_max_size=256 * 1024 * 1024)
+    app["stats"] = stats
+    app.router.add_post(VISION_PATH, generate)
+    app.router.add_post(TEXT_PATH, generate)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+class MockServer:
+    """在后台线程中运行替身服务；with 块结束时停止。base_url 可直接赋给 Config.DASHSCOPE_BASE_URL。"""
+
+    def __init__(self, settings: MockSettings = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings or MockSettings()
+        self.host = host
+        self.port = port
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v1"
+
+    @property
+    def stats(self) -> dict:
+        return self._runner.app["stats"].to_dict()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if not self._ready.wait(10):
+            raise RuntimeError("替身服务启动超时")
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(create_app(self.settings))
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+        self._loop = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 DashScope 替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="平均响应延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="延迟抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回 429 的比例")
+    parser.add_argument("--seal-rate", type=float, default=0.5, help="单页判定为需盖章的比例")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate,
+                            args.seal_rate, args.seed)
+    print(f"DashScope 替身服务: http://{args.host}:{args.port}/api/v1（统计: /stats）")
+    web.run_app(create_app(settings), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
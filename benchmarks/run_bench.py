@@ -0,0 +1,236 @@
+# benchmarks/run_bench.py
+"""离线吞吐基准：本地 DashScope 替身 + 合成 PDF，按场景测量 pages/sec、峰值 RSS、上传字节与分阶段耗时。
+
+每个场景在独立子进程中运行（峰值 RSS 互不影响），结果写为 JSON，可用 --compare 与其他提交的结果对比。
+不消耗真实 API 额度；需要 poppler（pdf2image 光栅化）。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from mock_dashscope import MockServer, MockSettings  # noqa: E402
+from synthetic_pdf import generate_corpus  # noqa: E402
+
+# 场景：审核模式、语料类型与 Config 覆盖项
+SCENARIOS = {
+    "seal": {"mode": "seal", "corpus": "scan", "config": {}},
+    "seal-triage": {"mode": "seal", "corpus": "scan", "config": {"SEAL_TRIAGE": True}},
+    "contract": {"mode": "contract", "corpus": "scan", "config": {}},
+    "contract-text": {"mode": "contract", "corpus": "text", "config": {"TEXT_FAST_PATH": True}},
+    "combined": {"mode": "combined", "corpus": "mixed", "config": {}},
+    "seal-batch": {"mode": "seal", "corpus": "scan", "config": {"SEAL_BATCH_PAGES": 4}},
+    "seal-crop": {"mode": "seal", "corpus": "scan", "config": {"SEAL_CROP": True}},
+    "combined-batch": {"mode": "combined", "corpus": "mixed", "config": {"COMBINED_BATCH_PAGES": 4}},
+}
+
+_RESULT_MARKER = "__BENCH_RESULT__"
+
+
+def _peak_rss_bytes() -> int:
+    import resource
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 计，macOS 以字节计
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_worker(spec: dict) -> dict:
+    """子进程入口：在替身服务上依次审核语料中的文档，返回本场景的测量结果。"""
+    import asyncio
+
+    sys.path.insert(0, str(ROOT))
+    from audit_service.pipeline import aaudit_document
+    from common.async_client import AsyncModelClient
+    from common.config import Config
+    from common.metrics import get_metrics
+
+    Config.apply(spec["config"])
+    Config.OUTPUT_DIR = Path(spec["output_dir"])
+    metrics = get_metrics()
+    metrics.reset()
+    outcomes, failures = [], 0
+
+    async def run():
+        nonlocal failures
+        async with AsyncModelClient() as client:
+            for pdf in spec["pdfs"]:
+                try:
+                    result = await aaudit_document(pdf, spec["mode"], client=client)
+                    outcomes.append(result["outcome"])
+                except Exception as e:
+                    failures += 1
+                    print(f"文档审核失败 {pdf}: {e}", file=sys.stderr)
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    pages = sum(o.get("pages", 0) for o in outcomes)
+    counters = metrics.export()["counters"]
+    return {
+        "documents": len(spec["pdfs"]),
+        "failed_documents": failures,
+        "pages": pages,
+        "elapsed_s": round(elapsed, 4),
+        "pages_per_sec": round(pages / elapsed, 3) if elapsed > 0 else 0.0,
+        "peak_rss_mb": round(_peak_rss_bytes() / 1024 / 1024, 1),
+        "upload_bytes": int(counters.get("upload_bytes", 0)),
+        "requests": int(counters.get("requests", 0)),
+        "request_errors": int(counters.get("request_errors", 0)),
+        "retries": int(counters.get("retries", 0)),
+        "throttled": int(counters.get("throttled", 0)),
+        "failed_pages": int(counters.get("failed_pages", 0)),
+        "input_tokens": int(counters.get("input_tokens", 0)),
+        "output_tokens": int(counters.get("output_tokens", 0)),
+        "stages": metrics.summary(),
+    }
+
+
+def run_scenario(name: str, pdfs: list, base_url: str, workdir: Path, workers: int) -> dict:
+    """在独立子进程中运行一个场景，返回其测量结果。"""
+    scenario = SCENARIOS[name]
+    out_dir = workdir / "out" / name
+    out_dir.mkdir(parents=True, exist_ok=True)
+    spec = {
+        "mode": scenario["mode"],
+        "pdfs": [str(p) for p in pdfs],
+        "output_dir": str(out_dir),
+        "config": {
+            **scenario["config"],
+            "DASHSCOPE_BASE_URL": base_url,
+            "MAX_WORKERS": workers,
+            "CACHE_ENABLED": False,
+        },
+    }
+    env = {
+        **os.environ,
+        "DASHSCOPE_API_KEY": os.environ.get("DASHSCOPE_API_KEY", "mock-key"),
+        "DASHSCOPE_HTTP_BASE_URL": base_url,
+        "AUDIT_LEDGER_PATH": str(workdir / "ledger.sqlite3"),
+        "AUDIT_METRICS": "0",
+        "AUDIT_RESULT_SINK": "",
+    }
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--worker", json.dumps(spec)],
+        cwd=workdir, env=env, capture_output=True, text=True,
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith(_RESULT_MARKER):
+            return json.loads(line[len(_RESULT_MARKER):])
+    raise RuntimeError(f"场景 {name} 运行失败（退出码 {proc.returncode}）:\n{proc.stderr[-2000:]}")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict):
+    """逐场景打印与基线结果的差异（吞吐越高越好，RSS / 上传字节越低越好）。"""
+    base = {s["scenario"]: s for s in baseline.get("scenarios", [])}
+    print(f"\n对比基线 {baseline.get('commit', '?')} -> {current.get('commit', '?')}")
+    for s in current["scenarios"]:
+        b = base.get(s["scenario"])
+        if not b:
+            print(f"  {s['scenario']:<14} （基线中无此场景）")
+            continue
+        parts = []
+        for key, label in (("pages_per_sec", "pages/s"), ("peak_rss_mb", "RSS MB"), ("upload_bytes", "上传")):
+            old, new = b.get(key) or 0, s.get(key) or 0
+            delta = (new - old) / old * 100 if old else 0.0
+            parts.append(f"{label} {old} -> {new} ({delta:+.1f}%)")
+        print(f"  {s['scenario']:<14} " + "，".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线吞吐基准（本地 DashScope 替身 + 合成 PDF）")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), default=None,
+                        help="要运行的场景（可重复指定，默认全部）")
+    parser.add_argument("--docs", type=int, default=4, help="每个场景的文档数")
+    parser.add_argument("--pages", type=int, default=8, help="每份文档页数")
+    parser.add_argument("--seal-ratio", type=float, default=0.3, help="合成页面带红章的概率")
+    parser.add_argument("--workers", type=int, default=4, help="单文档并发页数（Config.MAX_WORKERS）")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="替身服务平均延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="替身服务延迟抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="替身服务返回 500 的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="替身服务返回 429 的比例")
+    parser.add_argument("--seed", type=int, default=0, help="语料与替身服务的随机种子")
+    parser.add_argument("--workdir", help="语料与输出目录（默认临时目录）")
+    parser.add_argument("--output", "-o", help="结果 JSON 路径（默认 bench_<提交>_<时间>.json）")
+    parser.add_argument("--compare", metavar="BASELINE", help="与之前的结果 JSON 对比")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(json.loads(args.worker))
+        print(_RESULT_MARKER + json.dumps(result, ensure_ascii=False))
+        return
+
+    names = args.scenario or list(SCENARIOS)
+    tmp = None
+    if args.workdir:
+        workdir = Path(args.workdir).resolve()
+        workdir.mkdir(parents=True, exist_ok=True)
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="audit_bench_")
+        workdir = Path(tmp.name)
+
+    settings = MockSettings(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate,
+                            seed=args.seed)
+    corpora = {}
+    results = []
+    try:
+        with MockServer(settings) as server:
+            for name in names:
+                kind = SCENARIOS[name]["corpus"]
+                if kind not in corpora:
+                    corpora[kind] = generate_corpus(workdir / "corpus" / kind, args.docs, args.pages, kind,
+                                                    args.seal_ratio, args.seed)
+                before = server.stats
+                print(f"运行场景 {name}（{args.docs} 份 × {args.pages} 页）...", flush=True)
+                result = run_scenario(name, corpora[kind], server.base_url, workdir, args.workers)
+                after = server.stats
+                result["mock"] = {k: after[k] - before[k] for k in ("requests", "ok", "errors", "throttled")}
+                results.append({"scenario": name, "mode": SCENARIOS[name]["mode"], **result})
+                print(f"  {result['pages_per_sec']} pages/s，峰值 RSS {result['peak_rss_mb']} MB，"
+                      f"上传 {result['upload_bytes'] / 1024 / 1024:.2f} MB，请求 {result['requests']} 次"
+                      f"（失败 {result['request_errors']}，重试 {result['retries']}，限流 {result['throttled']}）", flush=True)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "docs": args.docs, "pages": args.pages, "seal_ratio": args.seal_ratio, "workers": args.workers,
+            "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+            "throttle_rate": args.throttle_rate, "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+    output = Path(args.output or f"bench_{report['commit']}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"基准结果已保存至: {output}")
+
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
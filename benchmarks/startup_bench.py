@@ -0,0 +1,123 @@
+# benchmarks/startup_bench.py
+"""CLI 冷启动基准：--count / --help / 参数校验三条路径须在时间预算内完成，且不加载重依赖。"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MAIN = ROOT / "main.py"
+
+# 仅在导出 / 模型调用 / 光栅化子系统中才应加载的模块
+HEAVY_MODULES = ("pandas", "openpyxl", "dashscope", "pdf2image", "numpy", "PIL", "aiohttp")
+
+# (名称, 命令行参数, 期望退出码)
+SCENARIOS = [
+    ("count", ["--count"], 0),
+    ("help", ["--help"], 0),
+    ("missing_file", ["/nonexistent/__startup_bench__.pdf"], 1),
+    ("bad_args", ["--jobs", "0", "x.pdf"], 2),
+]
+
+# 在子进程中运行 main()，结束后报告已加载的重依赖
+_PROBE = """
+import json, runpy, sys
+sys.argv = [{main!r}] + {args!r}
+code = 0
+try:
+    runpy.run_path({main!r}, run_name="__main__")
+except SystemExit as e:
+    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+loaded = [m for m in {heavy!r} if m in sys.modules]
+sys.stderr.write("\\n__PROBE__" + json.dumps({{"code": code, "loaded": loaded}}) + "\\n")
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # 冷启动不应依赖 API Key
+    env.pop("DASHSCOPE_API_KEY", None)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def time_scenario(args: list, runs: int) -> list:
+    """多次冷启动执行 main.py，返回每次墙钟耗时（秒）及退出码。"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, str(MAIN)] + args,
+            cwd=ROOT, env=_env(), capture_output=True,
+        )
+        samples.append((time.perf_counter() - start, proc.returncode))
+    return samples
+
+
+def probe_imports(args: list) -> dict:
+    """在子进程中执行一次，返回退出码与已加载的重依赖列表。"""
+    code = _PROBE.format(main=str(MAIN), args=args, heavy=HEAVY_MODULES)
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=_env(), capture_output=True, text=True,
+    )
+    for line in proc.stderr.splitlines():
+        if line.startswith("__PROBE__"):
+            return json.loads(line[len("__PROBE__"):])
+    return {"code": proc.returncode, "loaded": None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI 冷启动基准")
+    parser.add_argument("--runs", type=int, default=5, help="每个场景的执行次数（取中位数）")
+    parser.add_argument("--budget", type=float, default=0.5, help="单场景中位耗时预算（秒）")
+    parser.add_argument("--json", dest="json_out", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    results, failures = [], []
+    for name, cli_args, expected in SCENARIOS:
+        samples = time_scenario(cli_args, max(1, args.runs))
+        median = statistics.median(t for t, _ in samples)
+        codes = sorted({c for _, c in samples})
+        probe = probe_imports(cli_args)
+        loaded = probe["loaded"]
+
+        problems = []
+        if median > args.budget:
+            problems.append(f"中位耗时 {median:.3f}s 超出预算 {args.budget:.3f}s")
+        if codes != [expected]:
+            problems.append(f"退出码 {codes}，期望 {expected}")
+        if loaded is None:
+            problems.append("无法获取模块加载情况")
+        elif loaded:
+            problems.append(f"加载了重依赖: {', '.join(loaded)}")
+
+        status = "FAIL" if problems else "OK"
+        print(f"[{status}] {name:<14} median={median:.3f}s min={min(t for t, _ in samples):.3f}s")
+        for p in problems:
+            print(f"       - {p}")
+        results.append({
+            "scenario": name, "args": cli_args, "median_s": round(median, 4),
+            "samples_s": [round(t, 4) for t, _ in samples], "exit_codes": codes,
+            "heavy_modules_loaded": loaded, "problems": problems,
+        })
+        if problems:
+            failures.append(name)
+
+    if args.json_out:
+        Path(args.json_out).write_text(
+            json.dumps({"budget_s": args.budget, "results": results}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+
+    if failures:
+        print(f"❌ 冷启动基准未通过: {', '.join(failures)}")
+        sys.exit(1)
+    print("✅ 冷启动基准全部通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# benchmarks/synthetic_pdf.py
+"""合成 PDF 生成器：按页指定扫描页（JPEG 图像）或文本页（内嵌文本层），可带红色印章。
+
+仅依赖 Pillow（绘制扫描页），PDF 结构直接手写，不需要额外的 PDF 库。
+"""
+import argparse
+import io
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+# A4，单位为 pt（1/72 英寸）
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+SCAN_DPI = 150
+
+_CONTRACT_LINES = [
+    "PURCHASE CONTRACT",
+    "Contract No.: HT-{doc:04d}-{page:03d}",
+    "Party A (Buyer): Example Trading Co., Ltd.",
+    "Party B (Seller): Sample Manufacturing Co., Ltd.",
+    "Effective from 2024-01-01 to 2025-12-31.",
+    "Goods: industrial sensors, quantity 1200 units, total amount 356,000.00 incl. tax.",
+    "Settlement: bank transfer within 30 days after acceptance.",
+    "Account name: Sample Manufacturing Co., Ltd.",
+    "Bank: Industrial Bank, Example Branch   Account: 6222 0000 1111 2222",
+    "Both parties shall perform their obligations in accordance with this contract.",
+    "Disputes shall be settled through negotiation or submitted to arbitration.",
+    "This contract is made in duplicate, each party holding one copy.",
+]
+
+
+@dataclass
+class PageSpec:
+    """单页规格：kind 为 scan（扫描图像）或 text（文本层），seal 表示是否加盖红章。"""
+    kind: str = "scan"
+    seal: bool = False
+
+
+def _page_lines(doc: int, page: int, repeat: int = 3) -> list:
+    return [line.format(doc=doc, page=page) for line in _CONTRACT_LINES] * repeat
+
+
+def _scan_image(doc: int, page: int, seal: bool, rng: random.Random):
+    """绘制一页“扫描件”：黑色文字行、轻微噪点，按需加盖红色圆形印章。"""
+    from PIL import Image, ImageDraw
+
+    w, h = PAGE_WIDTH * SCAN_DPI // 72, PAGE_HEIGHT * SCAN_DPI // 72
+    img = Image.new("RGB", (w, h), (250, 250, 246))
+    draw = ImageDraw.Draw(img)
+    y = 120
+    for line in _page_lines(doc, page):
+        draw.text((110, y), line, fill=(25, 25, 25))
+        y += 42
+    for _ in range(400):
+        x, yy = rng.randrange(w), rng.randrange(h)
+        draw.point((x, yy), fill=(200, 200, 200))
+    if seal:
+        cx, cy, r = int(w * 0.72), int(h * 0.78), int(w * 0.09)
+        draw.ellipse((cx - r, cy - r, cx + r, cy + r), outline=(210, 30, 35), width=10)
+        draw.regular_polygon((cx, cy, r // 4), 5, fill=(210, 30, 35))
+        draw.text((cx - r // 2, cy + r // 3), "SEAL", fill=(210, 30, 35))
+    return img
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _circle_path(cx: float, cy: float, r: float) -> str:
+    """用四段贝塞尔曲线近似圆。"""
+    k = 0.5523 * r
+    return (
+        f"{cx + r:.1f} {cy:.1f} m "
+        f"{cx + r:.1f} {cy + k:.1f} {cx + k:.1f} {cy + r:.1f} {cx:.1f} {cy + r:.1f} c "
+        f"{cx - k:.1f} {cy + r:.1f} {cx - r:.1f} {cy + k:.1f} {cx - r:.1f} {cy:.1f} c "
+        f"{cx - r:.1f} {cy - k:.1f} {cx - k:.1f} {cy - r:.1f} {cx:.1f} {cy - r:.1f} c "
+        f"{cx + k:.1f} {cy - r:.1f} {cx + r:.1f} {cy - k:.1f} {cx + r:.1f} {cy:.1f} c S"
+    )
+
+
+def _text_content(doc: int, page: int, seal: bool) -> bytes:
+    ops = ["BT /F1 11 Tf 14 TL 60 780 Td"]
+    for line in _page_lines(doc, page):
+        ops.append(f"({_escape(line)}) Tj T*")
+    ops.append("ET")
+    if seal:
+        ops.append(f"q 1 0 0 RG 0.82 0.12 0.14 rg 3 w {_circle_path(430, 170, 52)} Q")
+        ops.append("BT 0.82 0.12 0.14 rg /F1 10 Tf 408 166 Td (SEAL) Tj ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+class _PdfBuilder:
+    def __init__(self):
+        self.objects = []
+
+    def add(self, body: bytes) -> int:
+        self.objects.append(body)
+        return len(self.objects)
+
+    def reserve(self) -> int:
+        return self.add(b"")
+
+    def set(self, num: int, body: bytes):
+        self.objects[num - 1] = body
+
+    @staticmethod
+    def stream(header: str, data: bytes) -> bytes:
+        return f"<< {header} /Length {len(data)} >>\nstream\n".encode("latin-1") + data + b"\nendstream"
+
+    def render(self, root: int) -> bytes:
+        out = io.BytesIO()
+        out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for i, body in enumerate(self.objects, 1):
+            offsets.append(out.tell())
+            out.write(f"{i} 0 obj\n".encode("latin-1") + body + b"\nendobj\n")
+        xref = out.tell()
+        out.write(f"xref\n0 {len(self.objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+        for off in offsets:
+            out.write(f"{off:010d} 00000 n \n".encode("latin-1"))
+        out.write(f"trailer\n<< /Size {len(self.objects) + 1} /Root {root} 0 R >>\n"
+                  f"startxref\n{xref}\n%%EOF\n".encode("latin-1"))
+        return out.getvalue()
+
+
+def write_pdf(path, pages: list, doc: int = 0, seed: int = 0, jpeg_quality: int = 70) -> Path:
+    """按页规格写出 PDF，返回路径。"""
+    rng = random.Random(seed)
+    pdf = _PdfBuilder()
+    catalog = pdf.reserve()
+    pages_obj = pdf.reserve()
+    font = pdf.add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    kids = []
+    for n, spec in enumerate(pages, 1):
+        if spec.kind == "scan":
+            img = _scan_image(doc, n, spec.seal, rng)
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=jpeg_quality)
+            image = pdf.add(pdf.stream(
+                f"/Type /XObject /Subtype /Image /Width {img.width} /Height {img.height}"
+                " /ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode", buf.getvalue()))
+            content = pdf.add(pdf.stream("", f"q {PAGE_WIDTH} 0 0 {PAGE_HEIGHT} 0 0 cm /Im0 Do Q".encode("latin-1")))
+            resources = f"<< /XObject << /Im0 {image} 0 R >> >>"
+        else:
+            content = pdf.add(pdf.stream("", _text_content(doc, n, spec.seal)))
+            resources = f"<< /Font << /F1 {font} 0 R >> >>"
+        kids.append(pdf.add(
+            f"<< /Type /Page /Parent {pages_obj} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}]"
+            f" /Resources {resources} /Contents {content} 0 R >>".encode("latin-1")))
+
+    pdf.set(pages_obj, f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>"
+            .encode("latin-1"))
+    pdf.set(catalog, f"<< /Type /Catalog /Pages {pages_obj} 0 R >>".encode("latin-1"))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(pdf.render(catalog))
+    return path
+
+
+def page_specs(pages: int, kind: str, seal_ratio: float, rng: random.Random) -> list:
+    """生成一份文档的页规格：kind 为 scan / text / mixed；末页（签章页）总是带章的概率更高。"""
+    specs = []
+    for n in range(1, pages + 1):
+        page_kind = kind if kind != "mixed" else ("text" if rng.random() < 0.5 else "scan")
+        seal = rng.random() < (max(seal_ratio, 0.8) if n == pages and seal_ratio > 0 else seal_ratio)
+        specs.append(PageSpec(page_kind, seal))
+    return specs
+
+
+def generate_corpus(out_dir, docs: int, pages: int, kind: str = "scan", seal_ratio: float = 0.3,
+                    seed: int = 0) -> list:
+    """生成 docs 份、每份 pages 页的合成 PDF，返回路径列表；同参数重复调用得到相同文件。"""
+    out_dir = Path(out_dir)
+    rng = random.Random(seed)
+    paths = []
+    for d in range(docs):
+        specs = page_specs(pages, kind, seal_ratio, rng)
+        path = out_dir / f"synthetic_{kind}_{d:03d}.pdf"
+        write_pdf(path, specs, doc=d, seed=seed * 1000 + d)
+        paths.append(path)
+    manifest = {
+        "docs": docs, "pages": pages, "kind": kind, "seal_ratio": seal_ratio, "seed": seed,
+        "files": [str(p) for p in paths],
+    }
+    (out_dir / f"corpus_{kind}.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成 PDF 测试语料")
+    parser.add_argument("out_dir", help="输出目录")
+    parser.add_argument("--docs", type=int, default=4, help="文档数")
+    parser.add_argument("--pages", type=int, default=8, help="每份文档页数")
+    parser.add_argument("--kind", choices=("scan", "text", "mixed"), default="scan", help="页面类型")
+    parser.add_argument("--seal-ratio", type=float, default=0.3, help="页面带红章的概率")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.out_dir, args.docs, args.pages, args.kind, args.seal_ratio, args.seed)
+    print(f"已生成 {len(paths)} 份 PDF 至 {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# combined_checker/__init__.py
+from .checker import acheck_combined_compliance, check_combined_compliance
@@ -0,0 +1,150 @@
+# combined_checker/checker.py
+import asyncio
+import json
+from functools import partial
+from pathlib import Path
+from common.async_client import AsyncModelClient, client_scope
+from common.concurrency import arun_batches
+from common.config import Config
+from common.image_encoder import format_upload_stats
+from common.logger import setup_logger
+from common.metrics import get_metrics
+from common.page_batch import analyze_pages, with_single_fallback
+from common.page_dedup import get_page_index, page_screen
+from common.page_journal import PageJournal, merge_pages, resume_state
+from common.page_stream import open_stream
+from common.path_validator import is_allowed_path
+from common.pdf_to_images import RenderedPage, iter_pdf_images, page_workspace
+from contract_checker.checker import JSON_SCHEMA, normalize_contract_result
+from contract_checker.validator import build_contract_report, contract_page_issues
+from seal_detector.detector import SEAL_SCHEMA, build_seal_report, normalize_seal_result, seal_page_issues
+
+logger = setup_logger("CombinedChecker")
+
+# 合并 schema：合同字段与印章字段位于同一层级，互不重名
+COMBINED_SCHEMA = {
+    "type": "object",
+    "properties": {**JSON_SCHEMA["properties"], **SEAL_SCHEMA["properties"]},
+    "required": list(SEAL_SCHEMA["required"])
+}
+
+SEAL_KEYS = list(SEAL_SCHEMA["properties"])
+
+
+def check_combined_compliance(pdf_path: str, max_workers: int = None):
+    """合并模式同步入口（acheck_combined_compliance 的薄包装）。"""
+    return asyncio.run(acheck_combined_compliance(pdf_path, concurrency=max_workers))
+
+
+async def acheck_combined_compliance(pdf_path: str, concurrency: int = None, client: AsyncModelClient = None,
+                                     journal: PageJournal = None, on_event=None):
+    """单次光栅化、每页单次模型调用（或按 Config.COMBINED_BATCH_PAGES 每组页面一次），同时完成盖章识别与合同字段提取。
+
+    返回 (seal_report, contract_page_results)：前者与 detect_seal_compliance 的返回一致，
+    后者与 check_contract_compliance 的返回一致，可直接交给 validate_contract。
+    给定 journal 时每页结果写入页面日志，日志中已完成的页面不再光栅化与分析。
+    Config.PAGE_DEDUP 为真时与批次内已分析的纯文字页近似重复的页面沿用其结果。
+    给定 on_event 时每页结果与问题在分析完成后立即回调（见 PageStream）。
+    """
+    Config.init_dirs()
+    pdf_p = Path(pdf_path).resolve()
+
+    if not is_allowed_path(str(pdf_p)):
+        raise ValueError("路径不安全")
+    if not pdf_p.exists():
+        raise FileNotFoundError(f"文件不存在: {pdf_path}")
+
+    resumed, todo = await resume_state(pdf_p, journal)
+    stream = open_stream(on_event, pdf_path, "combined", _page_issues)
+    if stream is not None:
+        stream.pages(resumed, resumed=True)
+    async with client_scope(client, concurrency) as client:
+        worker = partial(_process_combined_batch, client=client)
+        index = get_page_index()
+        if index is not None:
+            from seal_detector.triage import no_seal_candidate
+
+            screen = await asyncio.to_thread(page_screen, pdf_p, no_seal_candidate)
+            worker = index.wrap(worker, "combined", pdf_p.name, screen=screen)
+        if journal is not None:
+            worker = journal.wrap(worker)
+        if stream is not None:
+            worker = stream.wrap(worker)
+        with page_workspace() as workspace:
+            fresh = await arun_batches(worker, iter_pdf_images(pdf_p, workspace, pages=todo),
+                                       Config.COMBINED_BATCH_PAGES, concurrency)
+    pages = merge_pages(resumed, fresh)
+    logger.info(f"页面上传统计：{format_upload_stats(pages)}")
+
+    seal_pages = [_split_entry(p, "seal") for p in pages]
+    contract_pages = [_split_entry(p, "contract") for p in pages]
+    seal_report = build_seal_report(seal_pages, pdf_path)
+    if stream is not None:
+        stream.finish(seal_report, build_contract_report(contract_pages))
+    return seal_report, contract_pages
+
+
+def _page_issues(page: dict) -> list:
+    return seal_page_issues(_split_entry(page, "seal")) + contract_page_issues(_split_entry(page, "contract"))
+
+
+def _split_entry(page: dict, part: str) -> dict:
+    entry = {"page": page["page"], "image_bytes": page["image_bytes"], "result": page[part]}
+    for key in ("error", "dedup_of"):
+        if page.get(key):
+            entry[key] = page[key]
+    return entry
+
+
+async def _process_combined_batch(pages: list, client: AsyncModelClient) -> list:
+    """一组页面合并为一次请求；合并响应不合规时逐页分析（限流、熔断等请求错误直接抛出）。"""
+    async def analyze(batch):
+        from .prompt import COMBINED_PROMPT
+
+        results = await analyze_pages(batch, client, COMBINED_PROMPT, COMBINED_SCHEMA)
+        entries = []
+        for p in batch:
+            seal, contract = split_combined_result(results[p.page])
+            entries.append({"page": p.page, "image_bytes": len(p.data), "seal": seal, "contract": contract})
+        return entries
+
+    return await with_single_fallback(pages, analyze, partial(_process_combined_page, client=client))
+
+
+async def _process_combined_page(page: RenderedPage, client: AsyncModelClient) -> dict:
+    """分析单页，失败时两部分分别使用与单功能模式相同的兜底结果。"""
+    page_num = page.page
+    try:
+        seal, contract = await _analyze_combined_page(page, client)
+        return {"page": page_num, "image_bytes": len(page.data), "seal": seal, "contract": contract}
+    except Exception as e:
+        logger.error(f"第 {page_num} 页合并分析失败: {e}")
+        get_metrics().incr("failed_pages")
+        return {
+            "page": page_num,
+            "image_bytes": len(page.data),
+            "seal": {"requires_seal": False, "seals": []},
+            "contract": {},
+            "error": str(e)
+        }
+
+
+async def _analyze_combined_page(page: RenderedPage, client: AsyncModelClient) -> tuple:
+    """调用多模态大模型一次性分析单页，并拆分为 (印章结果, 合同结果)。"""
+    from .prompt import COMBINED_PROMPT
+
+    raw_text = await client.vision(page, COMBINED_PROMPT, COMBINED_SCHEMA)
+    with get_metrics().timer("parse"):
+        try:
+            data = json.loads(raw_text)
+        except json.JSONDecodeError:
+            logger.warning(f"非JSON响应: {raw_text[:100]}...")
+            return {"requires_seal": False, "seals": []}, {k: "" for k in JSON_SCHEMA["properties"]}
+        return split_combined_result(data)
+
+
+def split_combined_result(data: dict) -> tuple:
+    """将合并 schema 的单页输出拆分为印章结果与合同结果，并分别补齐缺省字段。"""
+    seal = normalize_seal_result({k: data[k] for k in SEAL_KEYS if k in data})
+    contract = normalize_contract_result({k: v for k, v in data.items() if k not in SEAL_KEYS})
+    return seal, contract
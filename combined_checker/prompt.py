@@ -0,0 +1,44 @@
+# combined_checker/prompt.py
+from contract_checker.prompt import CONTRACT_PROMPT
+from seal_detector.prompt import SEAL_PROMPT
+
+# 单次请求同时完成合同字段提取与印章识别：沿用两套提示词的规则说明，输出合并为一个 JSON 对象
+COMBINED_PROMPT = (
+    "本页需同时完成两项任务，请将两项任务的结果合并输出到同一个 JSON 对象中。\n\n"
+
+    "【任务一：合同字段提取】\n"
+    + CONTRACT_PROMPT.split("请严格按以下 JSON 格式输出")[0]
+    + "【任务二：印章识别】\n"
+    + SEAL_PROMPT.split("请严格按以下 JSON 格式输出")[0]
+    + "请严格按以下 JSON 格式输出，不要任何额外文本（合同字段与 requires_seal、seals 位于同一层级）：\n"
+    "{\n"
+    '  "contract_name": "",\n'
+    '  "contract_id": "",\n'
+    '  "party_a_name": "",\n'
+    '  "party_b_name": "",\n'
+    '  "effective_start": "",\n'
+    '  "effective_end": "",\n'
+    '  "seal_party_a": "",\n'
+    '  "seal_party_b": "",\n'
+    '  "sign_party_a": "",\n'
+    '  "sign_party_b": "",\n'
+    '  "settlement_method": "",\n'
+    '  "bank_account_name": "",\n'
+    '  "bank_name": "",\n'
+    '  "bank_account_number": "",\n'
+    '  "payment_terms": "",\n'
+    '  "goods_name": "",\n'
+    '  "quantity": "",\n'
+    '  "total_amount_incl_tax": "",\n'
+    '  "related_entities": "",\n'
+    '  "requires_seal": false,\n'
+    '  "seals": [\n'
+    '    {\n'
+    '      "is_red": true,\n'
+    '      "is_complete": true,\n'
+    '      "is_normal_size": true,\n'
+    '      "seal_text": "中海油（北京）销售有限公司 合同专用章"\n'
+    '    }\n'
+    '  ]\n'
+    "}"
+)
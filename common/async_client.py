@@ -0,0 +1,214 @@
+# common/async_client.py
+import asyncio
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from .config import Config
+from .logger import setup_logger
+from .metrics import get_metrics
+from .model_client import call_vision_model
+from .page_batch import batch_content_bytes
+from .pdf_to_images import RenderedPage
+from .response_cache import ResponseCache, get_response_cache, is_cacheable
+from .scheduler import ModelAPIError, get_request_scheduler
+
+logger = setup_logger("AsyncModelClient")
+
+_VISION_PATH = "/services/aigc/multimodal-generation/generation"
+_TEXT_PATH = "/services/aigc/text-generation/generation"
+
+
+class AsyncModelClient:
+    """基于 aiohttp 的 DashScope 异步客户端。
+
+    所有请求共享一个 keep-alive 连接池，并以信号量限制在途请求总数；同一实例可被
+    多个文档的审核协程同时使用，从而在一个事件循环内复用连接、统一限流。
+    每次请求经进程内共享的 RequestScheduler 限流，限流与临时故障按退避重试。
+    """
+
+    def __init__(self, concurrency: int = None, api_key: str = None, base_url: str = None, timeout: float = None):
+        self.concurrency = max(1, concurrency or Config.MAX_WORKERS)
+        self.api_key = api_key or Config.require_api_key()
+        self.base_url = (base_url or Config.DASHSCOPE_BASE_URL).rstrip("/")
+        self.timeout = timeout or Config.REQUEST_TIMEOUT
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_session(self):
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        """经请求调度发送一次生成请求；重试用尽后抛出 ModelAPIError（RuntimeError 子类）。"""
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return await get_request_scheduler().submit(lambda: self._post_once(path, data), tokens_of=_usage_tokens)
+
+    async def _post_once(self, path: str, data: bytes) -> dict:
+        """单次 HTTP 请求；非 200 响应抛出 ModelAPIError。
+
+        记录请求耗时（含上传与等待模型输出）、请求体字节数与响应中的 token 用量。
+        退避等待不占用并发名额。
+        """
+        metrics = get_metrics()
+        async with self._semaphore:
+            metrics.incr("requests")
+            metrics.incr("upload_bytes", len(data))
+            with metrics.timer("model"):
+                async with self._get_session().post(self.base_url + path, data=data) as resp:
+                    text = await resp.text(errors="replace")
+                    retry_after = resp.headers.get("Retry-After")
+            # 网关返回的 5xx / 429 常为 HTML 或空响应体，先按状态码判断，响应体仅尽力解析
+            body = _parse_body(text)
+            if resp.status != 200:
+                metrics.incr("request_errors")
+                code = body.get("code") if isinstance(body, dict) else None
+                raise ModelAPIError(resp.status, code, _parse_retry_after(retry_after))
+            if not isinstance(body, dict):
+                metrics.incr("request_errors")
+                raise ModelAPIError(resp.status, "InvalidResponseBody")
+            metrics.record_usage(body.get("usage"))
+            return body
+
+    async def _cached(self, content_bytes: bytes, prompt: str, schema: dict, model: str, call) -> str:
+        """缓存包装：与同步接口共用同一份响应缓存，仅缓存成功且可解析为 JSON 的响应。
+
+        SQLite 读写在线程中执行，不阻塞事件循环上其他在途页面。
+        """
+        cache = get_response_cache()
+        if cache is None:
+            return await call()
+        key = ResponseCache.make_key(content_bytes, prompt, schema, model, Config.TEMPERATURE)
+        if not Config.CACHE_REFRESH:
+            cached = await asyncio.to_thread(cache.get, key)
+            if cached is not None:
+                return cached
+        raw_text = await call()
+        if is_cacheable(raw_text):
+            await asyncio.to_thread(cache.put, key, raw_text)
+        return raw_text
+
+    async def vision(self, page: RenderedPage, prompt: str, schema: dict) -> str:
+        """以单页图像 + 提示词调用多模态大模型，返回模型输出的原始文本。"""
+        if page.path is not None:
+            # 落盘模式依赖 SDK 将本地文件上传至 OSS，改在线程中走同步接口
+            async def call_sdk():
+                async with self._semaphore:
+                    return await asyncio.to_thread(call_vision_model, page, prompt, schema)
+
+            return await get_request_scheduler().submit(call_sdk)
+
+        content = [{"image": page.to_data_uri()}, {"text": prompt}]
+        return await self._cached(page.data, prompt, schema, Config.MODEL,
+                                  lambda: self._vision_content(content, schema))
+
+    async def vision_batch(self, pages: list, prompt: str, schema: dict, validate=None) -> str:
+        """以多张页面图像（每张前附页码说明）+ 提示词调用一次多模态大模型，返回模型输出的原始文本。
+
+        仅支持内联图像；prompt 与 schema 应为 common.page_batch 包装后的多页版本。
+        validate(raw_text) 抛出异常时不写入缓存，避免不合规的合并响应被反复读取。
+        """
+        content = []
+        for page in pages:
+            content += [{"text": f"第 {page.page} 页："}, {"image": page.to_data_uri()}]
+        content.append({"text": prompt})
+
+        async def call():
+            get_metrics().incr("batched_pages", len(pages))
+            return await self._vision_content(content, schema, validate)
+
+        return await self._cached(batch_content_bytes(pages), prompt, schema, Config.MODEL, call)
+
+    async def vision_images(self, images: list, prompt: str, schema: dict) -> str:
+        """以多张带文字说明的图像 [(说明, RenderedPage), ...] + 提示词调用一次多模态大模型，返回模型输出的原始文本。
+
+        仅支持内联图像；说明文字位于对应图像之前。
+        """
+        content = []
+        for label, image in images:
+            content += [{"text": label}, {"image": image.to_data_uri()}]
+        content.append({"text": prompt})
+        content_bytes = b"".join(label.encode("utf-8") + hashlib.sha256(image.data).digest() for label, image in images)
+        return await self._cached(content_bytes, prompt, schema, Config.MODEL,
+                                  lambda: self._vision_content(content, schema))
+
+    async def _vision_content(self, content: list, schema: dict, validate=None) -> str:
+        """发送一次多模态生成请求（content 为图像与文本片段列表），返回模型输出的原始文本。"""
+        payload = {
+            "model": Config.MODEL,
+            "input": {"messages": [{"role": "user", "content": content}]},
+            "parameters": {
+                "response_format": {"type": "json_object", "schema": schema},
+                "temperature": Config.TEMPERATURE
+            }
+        }
+        body = await self._post(_VISION_PATH, payload)
+        raw_text = body["output"]["choices"][0]["message"]["content"][0]["text"]
+        if validate is not None:
+            validate(raw_text)
+        return raw_text
+
+    async def text(self, text: str, prompt: str, schema: dict) -> str:
+        """以页面文本 + 提示词调用纯文本大模型（Config.TEXT_MODEL），返回模型输出的原始文本。"""
+        async def call():
+            payload = {
+                "model": Config.TEXT_MODEL,
+                "input": {"messages": [{"role": "user", "content": f"{prompt}\n\n页面文本如下：\n{text}"}]},
+                "parameters": {
+                    "result_format": "message",
+                    "response_format": {"type": "json_object"},
+                    "temperature": Config.TEMPERATURE
+                }
+            }
+            body = await self._post(_TEXT_PATH, payload)
+            return body["output"]["choices"][0]["message"]["content"]
+
+        return await self._cached(text.encode("utf-8"), prompt, schema, Config.TEXT_MODEL, call)
+
+
+def _usage_tokens(body: dict):
+    usage = body.get("usage") or {}
+    tokens = (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
+    return tokens or None
+
+
+def _parse_body(text: str):
+    try:
+        return json.loads(text) if text else None
+    except ValueError:
+        return None
+
+
+def _parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+@asynccontextmanager
+async def client_scope(client: AsyncModelClient = None, concurrency: int = None):
+    """复用调用方传入的客户端；未传入时为本次调用临时创建并在结束时关闭。"""
+    if client is not None:
+        yield client
+        return
+    async with AsyncModelClient(concurrency) as owned:
+        yield owned
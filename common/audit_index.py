@@ -0,0 +1,68 @@
+# common/audit_index.py
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from .config import Config
+
+
+def file_sha256(path: str) -> str:
+    """分块计算文件内容的 SHA-256。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class AuditIndex:
+    """增量审核索引：以（文件路径, 内容哈希, 模式, 模型）为键记录已完成的审核及其输出文件。
+
+    同一文件内容未变、模式与模型相同且输出文件仍然存在时视为最新，可跳过重复审核。
+    （输出文件按文件名命名，因此内容相同但路径不同的文件仍需各自审核。）
+    基于 SQLite（WAL），可供多个进程同时读写。
+    """
+
+    def __init__(self, db_path: Path = None):
+        self.db_path = Path(db_path or Config.INDEX_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS audits ("
+            " content_hash TEXT NOT NULL,"
+            " mode TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " outcome TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (path, content_hash, mode, model))"
+        )
+        self._conn.commit()
+
+    def lookup(self, path: str, content_hash: str, mode: str):
+        """返回最新的审核结果（outcome dict）；无记录或输出文件缺失时返回 None。"""
+        row = self._conn.execute(
+            "SELECT outcome FROM audits WHERE path = ? AND content_hash = ? AND mode = ? AND model = ?",
+            (path, content_hash, mode, Config.MODEL)
+        ).fetchone()
+        if row is None:
+            return None
+        outcome = json.loads(row[0])
+        if not all(Path(p).exists() for p in outcome.get("outputs", [])):
+            return None
+        return outcome
+
+    def record(self, content_hash: str, mode: str, outcome: dict):
+        """记录一次成功完成的审核（仅在输出已写出后调用）。"""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO audits (path, content_hash, mode, model, outcome, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (outcome["file"], content_hash, mode, Config.MODEL,
+             json.dumps(outcome, ensure_ascii=False), time.time())
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,67 @@
+# common/concurrency.py
+import asyncio
+from collections import deque
+from .config import Config
+
+_END = object()
+
+
+async def arun_pages(worker, items, concurrency: int = None, max_in_flight: int = None) -> list:
+    """异步有界流水线：最多 concurrency 个页面同时执行 worker，结果按输入顺序返回。
+
+    items 可以是列表或（同步）生成器；生成器在线程中推进，避免光栅化阻塞事件循环。
+    已产出但未完成的页面不超过 max_in_flight，生成器只在有空位时才被继续消费（背压），
+    从而限制同时驻留内存的页面数。
+    worker 为协程函数，需自行处理单页异常并返回兜底结果，避免一页失败影响整份文档。
+    """
+    limit = max(1, concurrency or Config.MAX_WORKERS)
+    window = max(limit, max_in_flight or Config.MAX_PAGES_IN_FLIGHT or limit * 2)
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return await worker(item)
+
+    iterator = iter(items)
+    results = []
+    pending = deque()
+    while True:
+        if len(pending) >= window:
+            results.append(await pending.popleft())
+        item = await asyncio.to_thread(next, iterator, _END)
+        if item is _END:
+            break
+        pending.append(asyncio.ensure_future(run(item)))
+    while pending:
+        results.append(await pending.popleft())
+    return results
+
+
+def iter_batches(items, size: int, batchable=None):
+    """将页面流按 size 个一组产出列表；batchable(item) 为假的项目单独成组。"""
+    batch = []
+    for item in items:
+        if batchable is not None and not batchable(item):
+            if batch:
+                yield batch
+                batch = []
+            yield [item]
+            continue
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def arun_batches(worker, items, size: int = 1, concurrency: int = None, batchable=None) -> list:
+    """按 size 页一组执行 worker（协程函数，接收页面列表、返回逐页结果列表），结果展平后按输入顺序返回。
+
+    concurrency 限制同时在途的组数（即模型请求数）；驻留内存的页面上限随组大小同比放大。
+    """
+    size = max(1, size)
+    limit = max(1, concurrency or Config.MAX_WORKERS)
+    max_in_flight = max(limit, (Config.MAX_PAGES_IN_FLIGHT or limit * 2 * size) // size)
+    groups = await arun_pages(worker, iter_batches(items, size, batchable), limit, max_in_flight)
+    return [entry for group in groups for entry in group]
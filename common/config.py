@@ -2,17 +2,132 @@
 import os
 from pathlib import Path
 
+# 项目根目录：缓存、索引、日志、台账等内部状态默认存放于此，与运行时的工作目录无关
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+STATE_DIR = PROJECT_DIR / ".audit_cache"
+
 class Config:
+    # 仅在首次调用模型时校验（见 require_api_key），--count / --help 等无需 Key
     DASHSCOPE_API_KEY = os.getenv("DASHSCOPE_API_KEY")
-    if not DASHSCOPE_API_KEY:
-        raise EnvironmentError("❌ 环境变量 DASHSCOPE_API_KEY 未设置！")
+
+    DASHSCOPE_BASE_URL = os.getenv("DASHSCOPE_HTTP_BASE_URL", "https://dashscope.aliyuncs.com/api/v1")
+    REQUEST_TIMEOUT = float(os.getenv("AUDIT_REQUEST_TIMEOUT", "120"))
+    # 请求调度：按账号配额限流（0 表示不限；批量多进程时按进程数均分），可重试错误的退避与熔断
+    RATE_LIMIT_QPS = float(os.getenv("AUDIT_RATE_LIMIT_QPS", "0"))
+    RATE_LIMIT_TPM = float(os.getenv("AUDIT_RATE_LIMIT_TPM", "0"))
+    RATE_LIMIT_EST_TOKENS = int(os.getenv("AUDIT_RATE_LIMIT_EST_TOKENS", "1500"))
+    MAX_RETRIES = int(os.getenv("AUDIT_MAX_RETRIES", "4"))
+    RETRY_BASE_DELAY = float(os.getenv("AUDIT_RETRY_BASE_DELAY", "1.0"))
+    RETRY_MAX_DELAY = float(os.getenv("AUDIT_RETRY_MAX_DELAY", "30"))
+    BREAKER_THRESHOLD = int(os.getenv("AUDIT_BREAKER_THRESHOLD", "5"))
+    BREAKER_COOLDOWN = float(os.getenv("AUDIT_BREAKER_COOLDOWN", "30"))
 
     MODEL = "qwen-vl-max"
+    TEMPERATURE = 0.01
+    # 文本层快速通道（仅合同审核）：原生电子页面改用纯文本模型提取字段
+    TEXT_FAST_PATH = os.getenv("AUDIT_TEXT_FAST_PATH", "0") == "1"
+    TEXT_MODEL = os.getenv("AUDIT_TEXT_MODEL", "qwen-plus")
+    TEXT_MIN_CHARS = int(os.getenv("AUDIT_TEXT_MIN_CHARS", "200"))
+    # 多页合并请求：每次模型调用携带的页数（1 表示逐页调用），按模式分别设置（可由 --batch-pages 覆盖）
+    SEAL_BATCH_PAGES = int(os.getenv("AUDIT_SEAL_BATCH_PAGES", "1"))
+    CONTRACT_BATCH_PAGES = int(os.getenv("AUDIT_CONTRACT_BATCH_PAGES", "1"))
+    COMBINED_BATCH_PAGES = int(os.getenv("AUDIT_COMBINED_BATCH_PAGES", "1"))
+    # 批次内近似重复页复用：感知哈希汉明距离（共 256 位）不超过阈值的纯文字页沿用已分析页面的结果
+    PAGE_DEDUP = os.getenv("AUDIT_PAGE_DEDUP", "0") == "1"
+    PAGE_DEDUP_DISTANCE = int(os.getenv("AUDIT_PAGE_DEDUP_DISTANCE", "6"))
+    PAGE_DEDUP_MAX_PAGES = int(os.getenv("AUDIT_PAGE_DEDUP_MAX_PAGES", "20000"))
+    # 单个文档在途页面请求的并发上限（可由 --workers 覆盖）
+    MAX_WORKERS = int(os.getenv("AUDIT_MAX_WORKERS", "4"))
+    # 流式光栅化：每次渲染的页数，以及同时驻留（已渲染未完成分析）的页数上限（0 表示并发数的 2 倍）
+    RENDER_CHUNK_PAGES = int(os.getenv("AUDIT_RENDER_CHUNK_PAGES", "2"))
+    MAX_PAGES_IN_FLIGHT = int(os.getenv("AUDIT_MAX_PAGES_IN_FLIGHT", "0"))
+    # 合同提取提前结束：按首页→末尾 N 页→其余页的顺序访问，字段齐全后停止调用模型
+    EARLY_STOP = os.getenv("AUDIT_EARLY_STOP", "0") == "1"
+    EARLY_STOP_TAIL_PAGES = int(os.getenv("AUDIT_EARLY_STOP_TAIL_PAGES", "3"))
+    # 本地印章预筛（仅盖章识别）：无候选印章的页面跳过模型调用；阈值为候选区域印泥像素占页面面积的最小比例。
+    # 红色之外，蓝、紫、绿等饱和彩色（最大与最小通道差不低于 INK_DELTA）也视为印泥，以免非红色印章被跳过
+    SEAL_TRIAGE = os.getenv("AUDIT_SEAL_TRIAGE", "0") == "1"
+    SEAL_TRIAGE_THRESHOLD = float(os.getenv("AUDIT_SEAL_TRIAGE_THRESHOLD", "0.0005"))
+    SEAL_TRIAGE_RED_DELTA = int(os.getenv("AUDIT_SEAL_TRIAGE_RED_DELTA", "50"))
+    SEAL_TRIAGE_INK_DELTA = int(os.getenv("AUDIT_SEAL_TRIAGE_INK_DELTA", "80"))
+    SEAL_TRIAGE_DEBUG_DIR = os.getenv("AUDIT_SEAL_TRIAGE_DEBUG_DIR") or None
+    # 印章裁剪模式（仅盖章识别）：只上传整页缩略图 + 候选印章区域的高 DPI 裁剪图；
+    # 外扩比例为每边相对候选框尺寸，候选区域超过上限的页面改传整页
+    SEAL_CROP = os.getenv("AUDIT_SEAL_CROP", "0") == "1"
+    SEAL_CROP_DPI = int(os.getenv("AUDIT_SEAL_CROP_DPI", "300"))
+    SEAL_CROP_PADDING = float(os.getenv("AUDIT_SEAL_CROP_PADDING", "0.3"))
+    SEAL_CROP_MAX_REGIONS = int(os.getenv("AUDIT_SEAL_CROP_MAX_REGIONS", "4"))
+    SEAL_CROP_THUMB_PX = int(os.getenv("AUDIT_SEAL_CROP_THUMB_PX", "1024"))
+    # 页面默认以 data URI 内联上传；设为 0 时改为写入 TEMP_DIR 下每个文档独立的临时目录
+    INLINE_IMAGES = os.getenv("AUDIT_INLINE_IMAGES", "1") != "0"
     TEMP_DIR = Path("temp_audit_images")
+    # 页面上传编码：格式（png/jpeg/webp）、有损质量、像素预算（0 表示不缩放）、合同单独模式下是否转灰度
+    IMAGE_FORMAT = os.getenv("AUDIT_IMAGE_FORMAT", "png")
+    IMAGE_QUALITY = int(os.getenv("AUDIT_IMAGE_QUALITY", "85"))
+    IMAGE_MAX_PIXELS = int(os.getenv("AUDIT_IMAGE_MAX_PIXELS", "0"))
+    GRAYSCALE_CONTRACT = os.getenv("AUDIT_GRAYSCALE_CONTRACT", "0") == "1"
     OUTPUT_DIR = Path("output")
     ALLOWED_BASE_DIR = Path.cwd()
 
+    # 模型响应缓存（--no-cache 关闭；--refresh-cache 跳过读取但仍写入新结果）
+    CACHE_ENABLED = os.getenv("AUDIT_CACHE", "1") != "0"
+    CACHE_REFRESH = False
+    CACHE_PATH = Path(os.getenv("AUDIT_CACHE_PATH") or STATE_DIR / "responses.sqlite3")
+    CACHE_MAX_MB = int(os.getenv("AUDIT_CACHE_MAX_MB", "512"))
+    CACHE_MAX_AGE_DAYS = int(os.getenv("AUDIT_CACHE_MAX_AGE_DAYS", "30"))
+
+    # 常驻服务模式（--serve）：工作协程数、保留任务数、上传目录与大小上限
+    SERVE_WORKERS = int(os.getenv("AUDIT_SERVE_WORKERS", "2"))
+    SERVE_MAX_JOBS = int(os.getenv("AUDIT_SERVE_MAX_JOBS", "1000"))
+    SERVE_MAX_UPLOAD_MB = int(os.getenv("AUDIT_SERVE_MAX_UPLOAD_MB", "200"))
+    UPLOAD_DIR = Path(os.getenv("AUDIT_UPLOAD_DIR") or PROJECT_DIR / "uploads")
+
+    # 批量模式的增量审核索引
+    INDEX_PATH = Path(os.getenv("AUDIT_INDEX_PATH") or STATE_DIR / "audit_index.sqlite3")
+    # 批量模式的 Excel 输出：per-document / consolidated（整批一个合并工作簿）/ both
+    EXCEL_MODE = os.getenv("AUDIT_EXCEL_MODE", "per-document")
+    # 批量模式的跨文档规则（合同 / 合并模式；--no-batch-rules 关闭）
+    BATCH_RULES = os.getenv("AUDIT_BATCH_RULES", "1") != "0"
+
+    # 逐页结果日志：审核中断后以 --resume 续跑，只分析缺少的页面
+    JOURNAL_ENABLED = os.getenv("AUDIT_JOURNAL", "1") != "0"
+    JOURNAL_DIR = Path(os.getenv("AUDIT_JOURNAL_DIR") or STATE_DIR / "journal")
+    RESUME = False
+
+    # 审核台账（每个文档一条记录，--count 据此统计）
+    LEDGER_PATH = Path(os.getenv("AUDIT_LEDGER_PATH") or STATE_DIR / "run_ledger.sqlite3")
+
+    # 分阶段耗时与吞吐指标（--no-metrics 关闭）；目录默认为 OUTPUT_DIR/metrics
+    METRICS_ENABLED = os.getenv("AUDIT_METRICS", "1") != "0"
+    METRICS_DIR = Path(os.environ["AUDIT_METRICS_DIR"]) if os.getenv("AUDIT_METRICS_DIR") else None
+
+    # 分析用结果数据集（--result-sink jsonl/parquet，可多选）；目录默认为 OUTPUT_DIR/results
+    RESULT_SINKS = [s.strip() for s in os.getenv("AUDIT_RESULT_SINK", "").split(",") if s.strip()]
+    RESULT_DIR = Path(os.environ["AUDIT_RESULT_DIR"]) if os.getenv("AUDIT_RESULT_DIR") else None
+    RESULT_PARQUET_ROWS = int(os.getenv("AUDIT_RESULT_PARQUET_ROWS", "50000"))
+    # 逐页结果事件流（--stream-jsonl）：每页结果、问题与提前结论一完成即追加一行；"-" 表示标准输出
+    STREAM_JSONL = os.getenv("AUDIT_STREAM_JSONL") or None
+
+    @classmethod
+    def require_api_key(cls) -> str:
+        """按需校验 API Key，未设置时抛出 EnvironmentError。"""
+        key = cls.DASHSCOPE_API_KEY or os.getenv("DASHSCOPE_API_KEY")
+        if not key:
+            raise EnvironmentError("❌ 环境变量 DASHSCOPE_API_KEY 未设置！")
+        cls.DASHSCOPE_API_KEY = key
+        return key
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """导出当前配置（含命令行覆盖），用于在子进程中还原。"""
+        return {k: v for k, v in vars(cls).items() if k.isupper()}
+
+    @classmethod
+    def apply(cls, values: dict):
+        """用 snapshot() 的结果覆盖当前配置。"""
+        for key, value in values.items():
+            setattr(cls, key, value)
+
     @classmethod
     def init_dirs(cls):
-        cls.TEMP_DIR.mkdir(exist_ok=True)
         cls.OUTPUT_DIR.mkdir(exist_ok=True)
\ No newline at end of file
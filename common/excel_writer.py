@@ -0,0 +1,73 @@
+# common/excel_writer.py
+from pathlib import Path
+from .logger import setup_logger
+
+logger = setup_logger("ExcelWriter")
+
+
+def _cell_value(value):
+    """转换为 Excel 单元格可接受的值：基本类型原样保留，其余转字符串，并去除 XML 非法控制字符。"""
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    if value is None:
+        return ""
+    if isinstance(value, (bool, int, float)):
+        return value
+    return ILLEGAL_CHARACTERS_RE.sub("", str(value))
+
+
+class StreamingWorkbook:
+    """基于 openpyxl write-only 模式的流式工作簿（不依赖 pandas）。
+
+    各工作表逐行写入底层临时文件，内存占用与总行数无关；行可为 dict（按表头取值，
+    缺失列留空）或与表头等长的序列。工作表按首次写入的顺序创建。
+    """
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+
+        self.path = Path(path)
+        self._wb = Workbook(write_only=True)
+        self._sheets = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.save()
+
+    def sheet(self, name: str, columns: tuple):
+        """获取（不存在时创建并写入加粗表头）工作表。"""
+        if name not in self._sheets:
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+
+            ws = self._wb.create_sheet(title=name)
+            header = []
+            for col in columns:
+                cell = WriteOnlyCell(ws, value=col)
+                cell.font = Font(bold=True)
+                header.append(cell)
+            ws.append(header)
+            self._sheets[name] = (ws, tuple(columns))
+        return self._sheets[name]
+
+    def append(self, name: str, row, columns: tuple = None):
+        """向工作表追加一行；首次写入该表时需给出 columns。"""
+        ws, cols = self._sheets[name] if columns is None else self.sheet(name, columns)
+        if isinstance(row, dict):
+            values = [row.get(c) for c in cols]
+        else:
+            values = list(row)
+        ws.append([_cell_value(v) for v in values])
+
+    def write_rows(self, name: str, columns: tuple, rows):
+        """将可迭代的行依次写入工作表。"""
+        self.sheet(name, columns)
+        for row in rows:
+            self.append(name, row)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._wb.save(str(self.path))
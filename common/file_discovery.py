@@ -0,0 +1,56 @@
+# common/file_discovery.py
+import glob
+from pathlib import Path
+from .logger import setup_logger
+
+logger = setup_logger("FileDiscovery")
+
+
+def discover_pdfs(dirs: list = (), patterns: list = (), manifests: list = ()) -> list[str]:
+    """从目录（递归）、glob 模式与清单文件中收集待审核的 PDF，返回去重后的绝对路径列表。
+
+    不存在或非 PDF 的条目仅记录警告并跳过，不中断整批任务。
+    """
+    found = []
+
+    for d in dirs:
+        root = Path(d)
+        if not root.is_dir():
+            logger.warning(f"目录不存在，已跳过: {root}")
+            continue
+        found.extend(p for p in root.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf")
+
+    for pattern in patterns:
+        matches = [Path(p) for p in glob.glob(pattern, recursive=True)]
+        if not matches:
+            logger.warning(f"glob 未匹配到文件: {pattern}")
+        found.extend(matches)
+
+    for manifest in manifests:
+        try:
+            lines = Path(manifest).read_text(encoding="utf-8").splitlines()
+        except Exception as e:
+            logger.warning(f"无法读取清单文件 {manifest}: {e}")
+            continue
+        base = Path(manifest).parent
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            p = Path(line)
+            found.append(p if p.is_absolute() else base / p)
+
+    resolved = []
+    seen = set()
+    for p in found:
+        p = p.resolve()
+        if str(p) in seen:
+            continue
+        seen.add(str(p))
+        if not p.is_file():
+            logger.warning(f"文件不存在，已跳过: {p}")
+        elif p.suffix.lower() != ".pdf":
+            logger.warning(f"非 PDF 文件，已跳过: {p}")
+        else:
+            resolved.append(str(p))
+    return sorted(resolved)
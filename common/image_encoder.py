@@ -0,0 +1,69 @@
+# common/image_encoder.py
+import io
+import math
+from dataclasses import dataclass
+from .config import Config
+
+_MIME = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+_EXT = {"PNG": "png", "JPEG": "jpg", "WEBP": "webp"}
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    """页面上传前的编码参数：格式、有损质量、像素预算（0 表示不缩放）、是否转灰度。"""
+    format: str = "PNG"
+    quality: int = 85
+    max_pixels: int = 0
+    grayscale: bool = False
+
+    @classmethod
+    def from_config(cls, grayscale: bool = False) -> "EncodeOptions":
+        return cls(
+            format=Config.IMAGE_FORMAT.upper(),
+            quality=Config.IMAGE_QUALITY,
+            max_pixels=Config.IMAGE_MAX_PIXELS,
+            grayscale=grayscale
+        )
+
+    @property
+    def mime(self) -> str:
+        return _MIME[self.format]
+
+    @property
+    def extension(self) -> str:
+        return _EXT[self.format]
+
+
+def encode_image(img, options: EncodeOptions) -> bytes:
+    """按像素预算缩放、按需转灰度后编码为目标格式（img 为 PIL 图像），返回编码字节。"""
+    from PIL import Image
+
+    if options.format not in _MIME:
+        raise ValueError(f"不支持的图像格式: {options.format}")
+
+    if options.max_pixels and img.width * img.height > options.max_pixels:
+        scale = math.sqrt(options.max_pixels / (img.width * img.height))
+        size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+        img = img.resize(size, Image.LANCZOS)
+
+    if options.grayscale:
+        img = img.convert("L")
+    elif img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    buf = io.BytesIO()
+    if options.format == "PNG":
+        img.save(buf, "PNG", optimize=False)
+    elif options.format == "JPEG":
+        img.save(buf, "JPEG", quality=options.quality, optimize=True)
+    else:
+        img.save(buf, "WEBP", quality=options.quality, method=4)
+    return buf.getvalue()
+
+
+def format_upload_stats(page_results: list) -> str:
+    """汇总逐页结果中的 image_bytes，生成“共 N 页 / 总大小 / 平均每页”描述。"""
+    sizes = [r.get("image_bytes", 0) for r in page_results]
+    total = sum(sizes)
+    avg = total / len(sizes) if sizes else 0
+    return f"共 {len(sizes)} 页，页面图像总计 {total / 1024:.1f} KB，平均 {avg / 1024:.1f} KB/页"
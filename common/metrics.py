@@ -0,0 +1,256 @@
+# common/metrics.py
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("Metrics")
+
+# 阶段名 -> 汇总表中的中文标题（未列出的阶段按原名显示）
+STAGE_TITLES = {
+    "render": "PDF 光栅化（每页）",
+    "encode": "图像编码（每页）",
+    "crop": "印章区域高清渲染与裁剪（每页）",
+    "model": "模型调用（每次请求）",
+    "parse": "JSON 解析（每页）",
+    "validate": "合同校验",
+    "batch_rules": "跨文档规则校验（整批）",
+    "export": "Excel 导出",
+    "document": "单文档总耗时",
+}
+
+# 计数器名 -> Prometheus 指标说明
+COUNTER_HELP = {
+    "requests": "模型请求次数（不含缓存命中）",
+    "request_errors": "失败的模型请求次数",
+    "retries": "模型请求重试次数",
+    "throttled": "被限流（429）的模型请求次数",
+    "rate_limited_waits": "因本地限流而等待的请求次数",
+    "breaker_opens": "熔断器打开次数",
+    "failed_pages": "重试后仍调用失败的页数",
+    "batched_pages": "以多页合并请求发送的页数",
+    "batch_fallbacks": "多页合并请求失败后改为逐页调用的次数",
+    "dedup_pages": "沿用近似重复页结果、未调用模型的页数",
+    "upload_bytes": "上传的请求体字节数",
+    "input_tokens": "API 返回的输入 token 数",
+    "output_tokens": "API 返回的输出 token 数",
+    "cache_hits": "响应缓存命中次数",
+    "cache_misses": "响应缓存未命中次数",
+}
+
+_PROM_PREFIX = "pdf_audit"
+
+# 当前文档的计数器（document_scope 内有效）；子任务与 to_thread 继承同一个 dict
+_document_counters = contextvars.ContextVar("document_counters", default=None)
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """对已排序序列做线性插值取分位数（q 取 0-1）。"""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+class RunMetrics:
+    """单次运行的分阶段耗时样本与计数器（线程安全）。
+
+    各阶段记录每次观测的墙钟耗时，结束时汇总为 p50/p95；批量模式下各工作进程的
+    样本通过 export()/merge() 汇总到主进程。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.timings = {}
+        self.counters = {}
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.timings = {}
+            self.counters = {}
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self.timings.setdefault(stage, []).append(seconds)
+
+    def incr(self, name: str, value: float = 1):
+        scoped = _document_counters.get()
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            if scoped is not None:
+                scoped[name] = scoped.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, stage: str):
+        """记录 with 块的墙钟耗时（异常时同样记录）。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def record_usage(self, usage):
+        """累计 API 响应中 usage 字段报告的 token 数。"""
+        if not usage:
+            return
+        for key in ("input_tokens", "output_tokens"):
+            value = usage.get(key) if hasattr(usage, "get") else None
+            if isinstance(value, (int, float)):
+                self.incr(key, value)
+
+    def export(self) -> dict:
+        """导出原始样本（可跨进程传递并 merge）。"""
+        with self._lock:
+            return {"timings": {k: list(v) for k, v in self.timings.items()}, "counters": dict(self.counters)}
+
+    def merge(self, data: dict):
+        """并入另一份 export() 的结果。"""
+        if not data:
+            return
+        with self._lock:
+            for stage, samples in data.get("timings", {}).items():
+                self.timings.setdefault(stage, []).extend(samples)
+            for name, value in data.get("counters", {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> dict:
+        """按阶段汇总：次数、总耗时、均值、p50、p95、最大值（秒）。"""
+        with self._lock:
+            timings = {k: sorted(v) for k, v in self.timings.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "total_s": round(sum(values), 4),
+                "mean_s": round(sum(values) / len(values), 4),
+                "p50_s": round(percentile(values, 0.5), 4),
+                "p95_s": round(percentile(values, 0.95), 4),
+                "max_s": round(values[-1], 4),
+            }
+            for stage, values in timings.items() if values
+        }
+
+    def to_prometheus(self) -> str:
+        """生成 Prometheus textfile 格式文本。"""
+        summary = self.summary()
+        with self._lock:
+            counters = dict(self.counters)
+        lines = [
+            f"# HELP {_PROM_PREFIX}_stage_seconds 各阶段墙钟耗时",
+            f"# TYPE {_PROM_PREFIX}_stage_seconds summary",
+        ]
+        for stage, s in summary.items():
+            lines += [
+                f'{_PROM_PREFIX}_stage_seconds{{stage="{stage}",quantile="0.5"}} {s["p50_s"]}',
+                f'{_PROM_PREFIX}_stage_seconds{{stage="{stage}",quantile="0.95"}} {s["p95_s"]}',
+                f'{_PROM_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {s["total_s"]}',
+                f'{_PROM_PREFIX}_stage_seconds_count{{stage="{stage}"}} {s["count"]}',
+            ]
+        for name in sorted(set(COUNTER_HELP) | set(counters)):
+            metric = f"{_PROM_PREFIX}_{name}_total"
+            lines += [
+                f"# HELP {metric} {COUNTER_HELP.get(name, name)}",
+                f"# TYPE {metric} counter",
+                f"{metric} {counters.get(name, 0)}",
+            ]
+        lines += [
+            f"# HELP {_PROM_PREFIX}_run_timestamp_seconds 本次运行开始时间",
+            f"# TYPE {_PROM_PREFIX}_run_timestamp_seconds gauge",
+            f"{_PROM_PREFIX}_run_timestamp_seconds {int(self.started_at)}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, extra: dict = None, metrics_dir: Path = None) -> tuple:
+        """写出本次运行的指标文件：metrics_<时间戳>.json 与 pdf_audit.prom（原子替换）。"""
+        metrics_dir = Path(metrics_dir or Config.METRICS_DIR or Config.OUTPUT_DIR / "metrics")
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(self.started_at))
+
+        with self._lock:
+            counters = dict(self.counters)
+        payload = {
+            "started_at": self.started_at,
+            "elapsed_s": round(time.time() - self.started_at, 4),
+            **(extra or {}),
+            "stages": self.summary(),
+            "counters": counters,
+        }
+        json_path = metrics_dir / f"metrics_{stamp}.json"
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+
+        prom_path = metrics_dir / f"{_PROM_PREFIX}.prom"
+        tmp_path = prom_path.with_suffix(".prom.tmp")
+        tmp_path.write_text(self.to_prometheus(), encoding="utf-8")
+        os.replace(tmp_path, prom_path)
+        return json_path, prom_path
+
+    def log_summary(self):
+        """在运行结束时输出分阶段 p50/p95 汇总。"""
+        summary = self.summary()
+        if not summary:
+            return
+        logger.info("========== 分阶段耗时（秒） ==========")
+        logger.info(f"{_pad('阶段', 22)}{'次数':>4}{'p50':>9}{'p95':>9}{'总计':>8}")
+        for stage, s in summary.items():
+            title = STAGE_TITLES.get(stage, stage)
+            logger.info(f"{_pad(title, 22)}{s['count']:>6}{s['p50_s']:>9.3f}{s['p95_s']:>9.3f}{s['total_s']:>10.2f}")
+        c = self.counters
+        logger.info(
+            f"模型请求 {int(c.get('requests', 0))} 次（失败 {int(c.get('request_errors', 0))}，"
+            f"重试 {int(c.get('retries', 0))}，限流 {int(c.get('throttled', 0))}），上传 {c.get('upload_bytes', 0) / 1024 / 1024:.2f} MB，"
+            f"token 输入 {int(c.get('input_tokens', 0))} / 输出 {int(c.get('output_tokens', 0))}"
+        )
+
+
+def _pad(text: str, width: int) -> str:
+    """按显示宽度（中文占两列）右侧补空格。"""
+    shown = sum(2 if ord(ch) > 0x2E80 else 1 for ch in text)
+    return text + " " * max(0, width - shown)
+
+
+_metrics = RunMetrics()
+
+
+def get_metrics() -> RunMetrics:
+    """返回进程内共享的指标记录器。"""
+    return _metrics
+
+
+@contextmanager
+def document_scope():
+    """在 with 块内额外按文档累计计数器，yield 该文档的计数器 dict。
+
+    并发审核多个文档时（服务模式），各文档的请求数、缓存命中与 token 互不混淆。
+    """
+    counters = {}
+    token = _document_counters.set(counters)
+    try:
+        yield counters
+    finally:
+        _document_counters.reset(token)
+
+
+def document_counters() -> dict:
+    """当前文档（document_scope 内）已累计的计数器副本；不在文档范围内时返回空 dict。"""
+    return dict(_document_counters.get() or {})
+
+
+def timed(stage: str):
+    """装饰器：将函数调用的墙钟耗时记入指定阶段。"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _metrics.timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
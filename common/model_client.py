@@ -0,0 +1,62 @@
+# common/model_client.py
+from .config import Config
+from .metrics import get_metrics
+from .pdf_to_images import RenderedPage
+from .response_cache import ResponseCache, get_response_cache, is_cacheable
+from .scheduler import ModelAPIError
+
+
+def _cached(content_bytes: bytes, prompt: str, schema: dict, model: str, call) -> str:
+    """缓存包装：命中则直接返回，否则执行 call() 并写入缓存（仅缓存成功且可解析为 JSON 的响应）。"""
+    cache = get_response_cache()
+    if cache is None:
+        return call()
+    key = ResponseCache.make_key(content_bytes, prompt, schema, model, Config.TEMPERATURE)
+    if not Config.CACHE_REFRESH:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    raw_text = call()
+    if is_cacheable(raw_text):
+        cache.put(key, raw_text)
+    return raw_text
+
+
+def call_vision_model(page: RenderedPage, prompt: str, schema: dict) -> str:
+    """以单页图像 + 提示词调用多模态大模型，返回模型输出的原始文本。
+
+    相同图像内容、提示词、schema、模型与温度的请求优先读取本地缓存；仅缓存成功响应。
+    """
+    Config.require_api_key()
+
+    def call():
+        from dashscope import MultiModalConversation
+
+        messages = [{
+            "role": "user",
+            "content": [
+                {"image": str(page.path) if page.path else page.to_data_uri()},
+                {"text": prompt}
+            ]
+        }]
+
+        metrics = get_metrics()
+        metrics.incr("requests")
+        metrics.incr("upload_bytes", len(page.data))
+        with metrics.timer("model"):
+            response = MultiModalConversation.call(
+                model=Config.MODEL,
+                messages=messages,
+                response_format={"type": "json_object", "schema": schema},
+                temperature=Config.TEMPERATURE
+            )
+
+        if response.status_code != 200:
+            metrics.incr("request_errors")
+            raise ModelAPIError(response.status_code, response.code)
+        metrics.record_usage(getattr(response, "usage", None))
+
+        return response.output.choices[0].message.content[0]["text"]
+
+    return _cached(page.data, prompt, schema, Config.MODEL, call)
+
@@ -0,0 +1,106 @@
+# common/page_batch.py
+import asyncio
+import hashlib
+import json
+from functools import partial
+from .logger import setup_logger
+from .metrics import get_metrics
+from .pdf_to_images import RenderedPage
+
+logger = setup_logger("PageBatch")
+
+
+class BatchResponseError(ValueError):
+    """多页合并请求的响应不合规：非 JSON、缺页、重复页或含未请求的页码。"""
+
+
+def batch_schema(schema: dict) -> dict:
+    """将单页 schema 包装为多页 schema：{"pages": [{"page": 页码, ...单页字段}, ...]}。"""
+    item = {
+        **schema,
+        "properties": {"page": {"type": "integer"}, **schema.get("properties", {})},
+        "required": ["page"] + list(schema.get("required", [])),
+    }
+    return {
+        "type": "object",
+        "properties": {"pages": {"type": "array", "items": item}},
+        "required": ["pages"],
+    }
+
+
+def batch_prompt(prompt: str, page_numbers: list) -> str:
+    """在单页提示词前后加上多页说明：逐页独立分析，结果按页码放入 pages 数组。"""
+    pages = "、".join(f"第 {n} 页" for n in page_numbers)
+    return (
+        f"本次共提供 {len(page_numbers)} 张页面图像，依次为{pages}，每张图像前的文字标明了其页码。\n"
+        "请对每一页分别、独立地按以下要求分析，不要把其他页面的信息合并到本页结果中。\n\n"
+        f"{prompt}\n\n"
+        "【多页输出要求】以上为单页结果格式。请输出一个 JSON 对象 {\"pages\": [...]}，数组中每页一个对象，"
+        "包含 page 字段（即图像前标明的页码）与上述单页格式的全部字段；每个页码恰好出现一次，不要任何额外文本。"
+    )
+
+
+def batch_content_bytes(pages: list) -> bytes:
+    """多页请求的缓存键内容：各页页码与图像摘要按顺序拼接。"""
+    return b"".join(f"{p.page}:".encode("ascii") + hashlib.sha256(p.data).digest() for p in pages)
+
+
+def parse_batch_response(raw_text: str, page_numbers: list) -> dict:
+    """解析多页响应，返回 {页码: 单页结果}；任何不合规都抛出 BatchResponseError。"""
+    try:
+        data = json.loads(raw_text)
+    except json.JSONDecodeError as e:
+        raise BatchResponseError(f"非JSON响应: {raw_text[:100]}...") from e
+    items = data.get("pages") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise BatchResponseError("响应中缺少 pages 数组")
+
+    expected = set(page_numbers)
+    results = {}
+    for item in items:
+        if not isinstance(item, dict):
+            raise BatchResponseError("pages 数组元素不是对象")
+        try:
+            page = int(item.get("page"))
+        except (TypeError, ValueError):
+            raise BatchResponseError(f"页码无效: {item.get('page')!r}") from None
+        if page not in expected:
+            raise BatchResponseError(f"响应含未请求的页码: {page}")
+        if page in results:
+            raise BatchResponseError(f"页码重复: {page}")
+        results[page] = {k: v for k, v in item.items() if k != "page"}
+    missing = expected - set(results)
+    if missing:
+        raise BatchResponseError(f"响应缺少页码: {sorted(missing)}")
+    return results
+
+
+async def analyze_pages(pages: list, client, prompt: str, schema: dict) -> dict:
+    """一次请求分析多页，返回 {页码: 单页原始结果}；响应不合规时抛出 BatchResponseError。"""
+    numbers = [p.page for p in pages]
+    validate = partial(parse_batch_response, page_numbers=numbers)
+    raw_text = await client.vision_batch(pages, batch_prompt(prompt, numbers), batch_schema(schema), validate)
+    with get_metrics().timer("parse"):
+        return parse_batch_response(raw_text, numbers)
+
+
+def can_batch(pages: list) -> bool:
+    """仅内联图像（未落盘）的页面可合并为一次请求。"""
+    return len(pages) > 1 and all(isinstance(p, RenderedPage) and p.path is None for p in pages)
+
+
+async def with_single_fallback(pages: list, analyze_batch, process_single) -> list:
+    """K 页合并为一次请求；响应不合规（非 JSON、缺页、重复页等）时逐页重新请求，保证每页都有结果。
+
+    analyze_batch(pages) 返回逐页结果列表；process_single(page) 返回单页结果（自行兜底异常）。
+    限流重试耗尽、熔断、连接失败等调度层错误原样抛出：此时逐页重试只会向已在限流的服务再发 K 个请求。
+    """
+    if not can_batch(pages):
+        return list(await asyncio.gather(*(process_single(p) for p in pages)))
+    try:
+        return await analyze_batch(pages)
+    except ValueError as e:
+        # BatchResponseError 及 JSON 解析错误均为 ValueError
+        get_metrics().incr("batch_fallbacks")
+        logger.warning(f"第 {', '.join(str(p.page) for p in pages)} 页合并请求失败，改为逐页调用: {e}")
+        return list(await asyncio.gather(*(process_single(p) for p in pages)))
@@ -0,0 +1,187 @@
+# common/page_dedup.py
+import asyncio
+import copy
+import io
+import os
+import shutil
+import threading
+import numpy as np
+from .config import Config
+from .logger import setup_logger
+from .metrics import get_metrics
+from .pdf_to_images import RenderedPage
+
+logger = setup_logger("PageDedup")
+
+# 感知哈希：页面缩放为 64x64 灰度图后做二维 DCT，取左上 16x16 低频系数与中位数比较，得到 256 位指纹
+_HASH_SIZE = 64
+_LOW_FREQ = 16
+_HASH_BYTES = _LOW_FREQ * _LOW_FREQ // 8
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+
+_DCT = _dct_matrix(_HASH_SIZE)
+
+
+def perceptual_hash(data: bytes) -> tuple:
+    """计算页面图像的感知哈希，返回 (256 位指纹 bytes, 原图尺寸 (宽, 高))。"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as src:
+        size = src.size
+        img = src.convert("L").resize((_HASH_SIZE, _HASH_SIZE), Image.LANCZOS)
+    pixels = np.asarray(img, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:_LOW_FREQ, :_LOW_FREQ].flatten()
+    # 直流分量只反映整体亮度，不参与中位数
+    bits = low > np.median(low[1:])
+    return np.packbits(bits).tobytes(), size
+
+
+class PageIndex:
+    """批次内已分析页面的感知哈希索引（线程安全），按审核模式与模型分区。
+
+    只收录纯文字页（见 is_plain_page）的模型结果；新页面与某个已收录页面尺寸相同且哈希汉明距离不超过阈值时直接沿用其结果，不再调用模型。
+    每个分区最多保留 max_pages 页，超出后覆盖最早收录的页面。
+    """
+
+    def __init__(self, max_pages: int = None):
+        self.max_pages = max(1, max_pages or Config.PAGE_DEDUP_MAX_PAGES)
+        self._parts = {}
+        self._lock = threading.Lock()
+
+    def _part(self, key: tuple) -> dict:
+        part = self._parts.get(key)
+        if part is None:
+            part = {"hashes": np.zeros((self.max_pages, _HASH_BYTES), np.uint8), "meta": [None] * self.max_pages,
+                    "count": 0, "next": 0}
+            self._parts[key] = part
+        return part
+
+    def add(self, key: tuple, digest: bytes, size: tuple, source: dict, entry: dict):
+        with self._lock:
+            part = self._part(key)
+            slot = part["next"]
+            part["hashes"][slot] = np.frombuffer(digest, np.uint8)
+            part["meta"][slot] = (size, source, copy.deepcopy(entry))
+            part["next"] = (slot + 1) % self.max_pages
+            part["count"] = min(part["count"] + 1, self.max_pages)
+
+    def lookup(self, key: tuple, digest: bytes, size: tuple, max_distance: int):
+        """返回 (距离, 来源, 结果副本)；无足够相近的页面时返回 None。"""
+        with self._lock:
+            part = self._parts.get(key)
+            if not part or not part["count"]:
+                return None
+            hashes = part["hashes"][:part["count"]]
+            distances = np.unpackbits(np.bitwise_xor(hashes, np.frombuffer(digest, np.uint8)), axis=1).sum(axis=1)
+            for slot in np.argsort(distances, kind="stable"):
+                if distances[slot] > max_distance:
+                    return None
+                page_size, source, entry = part["meta"][slot]
+                if page_size == size:
+                    return int(distances[slot]), source, copy.deepcopy(entry)
+            return None
+
+    def wrap(self, worker, mode: str, doc_name: str, screen=None, max_distance: int = None):
+        """包装 arun_batches 的 worker：近似重复页直接沿用已收录结果，其余页面交给 worker 后收录纯文字页的结果。
+
+        screen(page) 为假的页面（签署页、本地检出候选印章等，见 page_screen）既不沿用也不收录结果。
+        """
+        key = (mode, Config.MODEL)
+        max_distance = Config.PAGE_DEDUP_DISTANCE if max_distance is None else max_distance
+
+        async def deduped(pages):
+            hashes, reused = {}, {}
+            for page in pages:
+                if not isinstance(page, RenderedPage):
+                    continue
+                try:
+                    hashes[page.page] = await asyncio.to_thread(perceptual_hash, page.data)
+                except Exception as e:
+                    logger.warning(f"第 {page.page} 页感知哈希计算失败，跳过近似重复检测: {e}")
+                    continue
+                hit = self.lookup(key, *hashes[page.page], max_distance)
+                if hit is None or (screen is not None and not await asyncio.to_thread(screen, page)):
+                    continue
+                distance, source, entry = hit
+                get_metrics().incr("dedup_pages")
+                logger.info(f"{doc_name} 第 {page.page} 页与 {source['file']} 第 {source['page']} 页近似重复"
+                            f"（汉明距离 {distance}），沿用其结果")
+                reused[page.page] = {**entry, "page": page.page, "image_bytes": 0,
+                                     "dedup_of": {**source, "distance": distance}}
+
+            todo = [page for page in pages if page.page not in reused]
+            analyzed = iter(await worker(todo) if todo else [])
+            entries = []
+            for page in pages:
+                if page.page in reused:
+                    entries.append(reused[page.page])
+                    continue
+                entry = next(analyzed)
+                if page.page in hashes and is_plain_page(entry) and \
+                        (screen is None or await asyncio.to_thread(screen, page)):
+                    self.add(key, *hashes[page.page], {"file": doc_name, "page": page.page}, entry)
+                entries.append(entry)
+            return entries
+        return deduped
+
+
+def page_screen(pdf_path, image_screen=None):
+    """近似重复检测的页面筛查，返回 screen(page)：为假的页面既不沿用也不收录结果。
+
+    文本层含签章字样（见 text_layer.needs_vision）的签署页一律排除：空白签署页上的手写签名只改变极少的哈希位，
+    已签署的副本会沿用未签署模板页的结果。无文本层的扫描页（或 pdftotext 不可用时）只做 image_screen(data) 检查。
+    """
+    from .text_layer import extract_page_texts, needs_vision
+
+    texts = extract_page_texts(pdf_path) if shutil.which("pdftotext") else []
+    signature_pages = {n for n, text in enumerate(texts, start=1) if needs_vision(text)}
+
+    def screen(page) -> bool:
+        if page.page in signature_pages:
+            return False
+        return image_screen is None or image_screen(page.data)
+    return screen
+
+
+def is_plain_page(entry: dict) -> bool:
+    """纯文字页：模型调用成功，且未识别到印章、盖章需求、签字或任何合同字段值。
+
+    合同字段（编号、当事人、金额、账号等）在同一模板的不同合同间只差几个字，感知哈希无法区分，
+    因此提取到任意字段值的页面都不收录。
+    """
+    if entry.get("error") or entry.get("skipped") or entry.get("triage") or entry.get("dedup_of"):
+        return False
+    parts = [entry[k] for k in ("result", "seal", "contract") if isinstance(entry.get(k), dict)]
+    for part in parts:
+        for key, value in part.items():
+            if key in ("requires_seal", "seals"):
+                if value:
+                    return False
+            elif isinstance(value, str) and value.strip():
+                return False
+    return bool(parts)
+
+
+_index = None
+_index_pid = None
+_index_lock = threading.Lock()
+
+
+def get_page_index():
+    """返回进程内共享的页面索引；未启用近似重复检测（Config.PAGE_DEDUP）时返回 None。"""
+    global _index, _index_pid
+    if not Config.PAGE_DEDUP:
+        return None
+    with _index_lock:
+        if _index is None or _index_pid != os.getpid():
+            _index = PageIndex()
+            _index_pid = os.getpid()
+        return _index
@@ -0,0 +1,144 @@
+# common/page_journal.py
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from .audit_index import file_sha256
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("PageJournal")
+
+# 影响单页结果的配置；与日志首行记录的取值不一致时不沿用旧日志
+RESULT_SETTINGS = (
+    "MODEL", "TEMPERATURE", "TEXT_FAST_PATH", "TEXT_MODEL", "TEXT_MIN_CHARS",
+    "SEAL_BATCH_PAGES", "CONTRACT_BATCH_PAGES", "COMBINED_BATCH_PAGES",
+    "PAGE_DEDUP", "PAGE_DEDUP_DISTANCE",
+    "SEAL_TRIAGE", "SEAL_TRIAGE_THRESHOLD", "SEAL_TRIAGE_RED_DELTA", "SEAL_TRIAGE_INK_DELTA",
+    "SEAL_CROP", "SEAL_CROP_DPI", "SEAL_CROP_PADDING", "SEAL_CROP_MAX_REGIONS", "SEAL_CROP_THUMB_PX",
+    "IMAGE_FORMAT", "IMAGE_QUALITY", "IMAGE_MAX_PIXELS", "GRAYSCALE_CONTRACT",
+)
+
+
+def result_settings() -> dict:
+    return {name: getattr(Config, name) for name in RESULT_SETTINGS}
+
+
+class PageJournal:
+    """单文档逐页结果日志（JSON Lines）：每页结果返回时立即追加一行，以文档内容哈希 + 路径 + 模式命名。
+
+    审核中断（网络中断、Ctrl-C、OOM）后以 --resume 重新运行，只需光栅化、分析日志中缺少的页面；
+    文档审核完成后删除日志。首行为文档信息，内容或 RESULT_SETTINGS 中任一配置不一致的旧日志不会被沿用。
+    内容相同、路径不同的文档（如批量中的副本）各用一份日志，可并发审核。
+    调用失败（带 error）的页面不写入，续跑时重新分析。
+    """
+
+    def __init__(self, path: Path, meta: dict, resume: bool = False):
+        self.path = Path(path)
+        self.meta = meta
+        self.completed = self._load() if resume else {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 续跑时重写一份去重后的日志，丢弃可能被截断的末行
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+            for entry in self.completed.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    @classmethod
+    def open(cls, pdf_path: str, mode: str, resume: bool = None) -> "PageJournal":
+        """为文档打开日志；resume 为真（默认 Config.RESUME）时载入已完成页面，否则从头开始。"""
+        resume = Config.RESUME if resume is None else resume
+        content_hash = file_sha256(pdf_path)
+        resolved = str(Path(pdf_path).resolve())
+        meta = {"file": resolved, "sha256": content_hash, "mode": mode, "model": Config.MODEL,
+                "settings": result_settings(), "created_at": time.time()}
+        path_hash = hashlib.sha256(resolved.encode("utf-8")).hexdigest()[:12]
+        path = Path(Config.JOURNAL_DIR) / f"{content_hash[:32]}_{path_hash}_{mode}.jsonl"
+        journal = cls(path, meta, resume)
+        if journal.completed:
+            logger.info(f"从页面日志续跑：{Path(pdf_path).name} 已完成 {len(journal.completed)} 页")
+        return journal
+
+    def _load(self) -> dict:
+        if not self.path.exists():
+            return {}
+        completed = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        for i, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 进程被强制结束时末行可能不完整
+                logger.warning(f"页面日志第 {i + 1} 行不完整，已忽略: {self.path}")
+                continue
+            if i == 0:
+                if any(record.get(k) != self.meta[k] for k in ("sha256", "mode", "model", "settings")):
+                    logger.info(f"页面日志与当前文档或配置不一致，重新开始: {self.path}")
+                    return {}
+                continue
+            completed[record["page"]] = record
+        return completed
+
+    def done_pages(self) -> set:
+        return set(self.completed)
+
+    def entries(self) -> list:
+        """已完成页面的结果（按页码排序）。"""
+        return [self.completed[n] for n in sorted(self.completed)]
+
+    def record(self, entries: list):
+        """追加页面结果并立即刷新到磁盘；后写入的同页结果覆盖先前的。"""
+        with self._lock:
+            if self._file.closed:
+                return
+            for entry in entries:
+                if entry.get("error") or entry.get("skipped"):
+                    continue
+                self.completed[entry["page"]] = entry
+                self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def wrap(self, worker):
+        """包装 arun_batches 的 worker：每组页面结果返回后写入日志。"""
+        async def journaled(pages):
+            entries = await worker(pages)
+            self.record(entries)
+            return entries
+        return journaled
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def complete(self):
+        """文档审核完成：关闭并删除日志。"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+async def resume_state(pdf_path: Path, journal: PageJournal = None) -> tuple:
+    """返回 (日志中已完成的页面结果, 仍需分析的页码列表)；无可续跑内容时页码列表为 None（即全部页面）。"""
+    if journal is None or not journal.completed:
+        return [], None
+    from .pdf_to_images import get_page_count
+
+    total = await asyncio.to_thread(get_page_count, pdf_path)
+    done = journal.done_pages()
+    return journal.entries(), [n for n in range(1, total + 1) if n not in done]
+
+
+def merge_pages(journaled: list, fresh: list) -> list:
+    """合并日志中已完成的页面与本次新分析的页面，按页码排序（同页以本次结果为准）。"""
+    by_page = {item["page"]: item for item in journaled}
+    by_page.update({item["page"]: item for item in fresh})
+    return [by_page[n] for n in sorted(by_page)]
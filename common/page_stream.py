@@ -0,0 +1,147 @@
+# common/page_stream.py
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("PageStream")
+
+_END = object()
+
+
+class PageStream:
+    """逐页结果推送：每组页面分析完成后立即以事件形式回调，无需等待整份文档。
+
+    事件均为 dict，含 event / file / mode / time 字段：
+      page     单页结果（entry 与最终报告 raw_data 中的条目一致；同一页可能因复核再次推送，以后者为准）
+      issue    问题（level / message / page），单页即可确定的问题随该页推送，跨页规则的问题在 done 之前推送
+      verdict  提前结论：出现第一个严重问题（ERROR）即可确定不通过，此后的结果不会改变这一结论
+      done     最终结论（status / errors / warnings）
+    page_issues(entry) 返回该页即可确定的问题 [{"Page", "Type", "Message"}, ...]。
+    回调异常只记录警告，不影响审核。
+    """
+
+    def __init__(self, callback, file: str, mode: str, page_issues=None):
+        self.callback = callback
+        self.file = str(file)
+        self.mode = mode
+        self.page_issues = page_issues
+        self.verdict = None
+        self._emitted = set()
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **data):
+        try:
+            self.callback({"event": event, "file": self.file, "mode": self.mode, "time": round(time.time(), 3), **data})
+        except Exception as e:
+            logger.warning(f"结果推送回调出错（已忽略）: {e}")
+
+    def _issue(self, issue: dict):
+        key = (issue.get("Page"), issue["Message"])
+        with self._lock:
+            if key in self._emitted:
+                return
+            self._emitted.add(key)
+            first_error = issue["Type"] == "ERROR" and self.verdict is None
+            if first_error:
+                self.verdict = "fail"
+        self.emit("issue", level=issue["Type"], message=issue["Message"], page=issue.get("Page"))
+        if first_error:
+            self.emit("verdict", status="fail", reason=issue["Message"])
+
+    def pages(self, entries: list, **extra):
+        """推送一组页面结果及其单页问题。"""
+        for entry in entries:
+            self.emit("page", page=entry["page"], entry=entry, **extra)
+            for issue in self.page_issues(entry) if self.page_issues else []:
+                self._issue(issue)
+
+    def wrap(self, worker):
+        """包装 arun_batches 的 worker：每组页面结果返回后立即推送。"""
+        async def streamed(pages):
+            entries = await worker(pages)
+            self.pages(entries)
+            return entries
+        return streamed
+
+    def finish(self, *reports):
+        """推送报告中尚未推送的问题（跨页规则）与最终结论。"""
+        errors = warnings = 0
+        for report in reports:
+            for issue in report.get("issues_detail", []):
+                self._issue(issue)
+            errors += len(report.get("errors", []))
+            warnings += len(report.get("warnings", []))
+        self.emit("done", status="fail" if errors else "pass", errors=errors, warnings=warnings)
+
+
+def open_stream(on_event, file: str, mode: str, page_issues=None):
+    """on_event 为空时返回 None（不推送）。"""
+    return PageStream(on_event, file, mode, page_issues) if on_event is not None else None
+
+
+async def astream(run):
+    """将回调式接口转为异步迭代器：run(on_event) 为协程函数，逐个产出其推送的事件，
+    最后产出 {"event": "result", "result": run 的返回值}；run 抛出的异常在迭代时重新抛出。"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def on_event(event):
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    task = asyncio.ensure_future(run(on_event))
+    task.add_done_callback(lambda _: loop.call_soon_threadsafe(queue.put_nowait, _END))
+    try:
+        while True:
+            event = await queue.get()
+            if event is _END:
+                break
+            yield event
+        yield {"event": "result", "result": task.result()}
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+class JsonlEventWriter:
+    """--stream-jsonl：每个事件一行 JSON，写入后立即刷新；"-" 表示标准输出。
+
+    多个进程可追加写同一文件（每行一次写入）。
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+        self._lock = threading.Lock()
+        if target == "-":
+            self._file = sys.stdout
+        else:
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(target, "a", encoding="utf-8")
+
+    def __call__(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_event_writer():
+    """按 Config.STREAM_JSONL 返回进程内共享的事件写入端；未启用时返回 None。"""
+    global _writer, _writer_pid
+    if not Config.STREAM_JSONL:
+        return None
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid() or _writer.target != Config.STREAM_JSONL:
+            _writer = JsonlEventWriter(Config.STREAM_JSONL)
+            _writer_pid = os.getpid()
+        return _writer
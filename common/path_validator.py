@@ -1,5 +1,6 @@
 # common/path_validator.py
 from pathlib import Path
+from .config import Config
 from .logger import setup_logger
 
 logger = setup_logger("PathValidator")
@@ -10,7 +11,12 @@ def is_safe_path(base_dir: Path, user_path: str) -> bool:
     try:
         resolved = Path(user_path).resolve()
         base_resolved = base_dir.resolve()
-        return str(resolved).startswith(str(base_resolved))
+        return resolved == base_resolved or base_resolved in resolved.parents
     except Exception as e:
         logger.error(f"路径解析失败: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def is_allowed_path(user_path: str) -> bool:
+    """检查路径是否位于允许的目录内：ALLOWED_BASE_DIR（启动时的工作目录），或常驻服务的上传目录 UPLOAD_DIR。"""
+    return any(is_safe_path(Path(base), user_path) for base in (Config.ALLOWED_BASE_DIR, Config.UPLOAD_DIR))
@@ -1,23 +1,172 @@
 # common/pdf_to_images.py
+import base64
+import io
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from pdf2image import convert_from_path
+from .config import Config
+from .image_encoder import EncodeOptions, encode_image
 from .logger import setup_logger
+from .metrics import get_metrics
 
 logger = setup_logger("PDFConverter")
 
 
+@dataclass
+class RenderedPage:
+    """单页渲染结果：页码 + 内存中的编码图像；仅在落盘模式下带有文件路径。"""
+    page: int
+    data: bytes
+    mime: str = "image/png"
+    path: Path = None
+
+    def to_data_uri(self) -> str:
+        return f"data:{self.mime};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+
+@contextmanager
+def page_workspace():
+    """为单个文档创建独立的临时工作目录，退出时（含异常）必定删除。
+
+    内联模式（Config.INLINE_IMAGES）下页面不落盘，直接返回 None。
+    """
+    if Config.INLINE_IMAGES:
+        yield None
+        return
+    Config.TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="doc_", dir=Config.TEMP_DIR) as d:
+        yield Path(d)
+
+
 def pdf_to_images(pdf_path: Path, output_dir: Path, dpi: int = 150) -> list[Path]:
     """将 PDF 文件转换为 PNG 图像序列，每页一张图。"""
-    logger.debug(f"将 PDF 转为图像 (DPI={dpi})...")
+    return [p.path for p in iter_pdf_images(pdf_path, output_dir, dpi=dpi, encode=EncodeOptions())]
+
+
+def get_page_count(pdf_path: Path) -> int:
+    """读取 PDF 总页数（不做光栅化）。"""
+    from pdf2image import pdfinfo_from_path
+
+    try:
+        return int(pdfinfo_from_path(str(pdf_path))["Pages"])
+    except Exception as e:
+        logger.error(f"读取 PDF 页数失败: {e}")
+        raise RuntimeError(f"读取 PDF 页数失败: {e}")
+
+
+def _page_ranges(pages: list[int], chunk: int):
+    """将页码序列中相邻递增的页切分为不超过 chunk 页的 (first, last) 区间，保持原有顺序。"""
+    start = prev = None
+    for n in pages:
+        if start is not None and (n != prev + 1 or n - start >= chunk):
+            yield start, prev
+            start = None
+        if start is None:
+            start = n
+        prev = n
+    if start is not None:
+        yield start, prev
+
+
+def iter_pdf_images(pdf_path: Path, workspace: Path = None, dpi: int = 150, chunk_pages: int = None,
+                    encode: EncodeOptions = None, pages=None):
+    """按小段页码范围流式光栅化 PDF，逐页生成 RenderedPage（编码后的图像字节）。
+
+    每次只渲染 chunk_pages 页，编码后立即释放 PIL 图像，峰值内存与文档总页数无关；
+    与 run_pages 配合时，生成器仅在下游有空位时才继续渲染。
+    encode 控制上传前的缩放与编码（默认读取 Config）；pages 为需渲染的页码序列（默认全部，按给定顺序）；
+    给定 workspace 时同时将页面写入该目录（供不支持内联图像的调用方使用）。
+    """
+    from pdf2image import convert_from_path
+
+    chunk = max(1, chunk_pages or Config.RENDER_CHUNK_PAGES)
+    encode = encode or EncodeOptions.from_config()
+    total = get_page_count(pdf_path)
+    # 按调用方给定的顺序渲染（默认全部页面顺序渲染）
+    wanted = [n for n in (range(1, total + 1) if pages is None else pages) if 1 <= n <= total]
+    logger.debug(f"将 PDF 转为图像 (DPI={dpi}, 共 {total} 页, 渲染 {len(wanted)} 页, 每段 {chunk} 页)...")
+
+    metrics = get_metrics()
+    for first, last in _page_ranges(wanted, chunk):
+        start = time.perf_counter()
+        try:
+            images = convert_from_path(str(pdf_path), dpi=dpi, first_page=first, last_page=last)
+        except Exception as e:
+            logger.error(f"PDF 转图像失败（第 {first}-{last} 页）: {e}")
+            raise RuntimeError(f"PDF 转图像失败: {e}")
+        # 按页摊分本段渲染耗时，便于与其他逐页阶段对比
+        per_page = (time.perf_counter() - start) / max(1, len(images))
+        for _ in images:
+            metrics.observe("render", per_page)
+
+        for i, img in enumerate(images, start=first):
+            with metrics.timer("encode"):
+                data = encode_image(img, encode)
+            page = RenderedPage(page=i, data=data, mime=encode.mime)
+            logger.debug(f"第 {i} 页编码完成: {img.width}x{img.height} -> {len(page.data) / 1024:.1f} KB")
+            img.close()
+            if workspace is not None:
+                page.path = Path(workspace) / f"page_{i:03d}.{encode.extension}"
+                page.path.write_bytes(page.data)
+            yield page
+        del images
+
+
+def get_page_size(pdf_path: Path, page: int) -> tuple[float, float]:
+    """读取单页渲染后的宽高（单位 pt，已按页面旋转角度交换宽高），不做光栅化。"""
+    from pdf2image import pdfinfo_from_path
+
     try:
-        images = convert_from_path(str(pdf_path), dpi=dpi)
+        info = pdfinfo_from_path(str(pdf_path), first_page=page, last_page=page)
+        # 指定页码范围时 pdfinfo 输出 "Page    N size: 595.28 x 841.89 pts (A4)"，否则为 "Page size: ..."
+        size = next(v for k, v in info.items() if re.fullmatch(r"Page\s+(\d+\s+)?size", k))
+        rot = next((v for k, v in info.items() if re.fullmatch(r"Page\s+(\d+\s+)?rot", k)), "0")
+        width, height = (float(v) for v in re.match(r"([\d.]+)\s*x\s*([\d.]+)", size).groups())
     except Exception as e:
-        logger.error(f"PDF 转图像失败: {e}")
-        raise RuntimeError(f"PDF 转图像失败: {e}")
-
-    image_paths = []
-    for i, img in enumerate(images, start=1):
-        img_path = output_dir / f"page_{i:03d}.png"
-        img.save(img_path, "PNG")
-        image_paths.append(img_path)
-    return image_paths
\ No newline at end of file
+        raise RuntimeError(f"读取第 {page} 页尺寸失败: {e}")
+    return (height, width) if int(float(rot)) % 180 == 90 else (width, height)
+
+
+def _render_box(pdf_path: Path, page: int, dpi: int, x: int, y: int, w: int, h: int):
+    """调用 pdftoppm 只光栅化单页中 (x, y, w, h) 像素区域（dpi 下的坐标），返回 PIL 图像。"""
+    from PIL import Image
+
+    exe = shutil.which("pdftoppm")
+    if not exe:
+        raise RuntimeError("未找到 pdftoppm（poppler-utils）")
+    proc = subprocess.run(
+        [exe, "-f", str(page), "-l", str(page), "-r", str(dpi),
+         "-x", str(x), "-y", str(y), "-W", str(w), "-H", str(h), "-png", str(pdf_path)],
+        capture_output=True, timeout=120, check=True
+    )
+    img = Image.open(io.BytesIO(proc.stdout))
+    img.load()
+    return img
+
+
+def render_regions(pdf_path: Path, page: int, boxes: list, dpi: int, encode: EncodeOptions = None) -> list[RenderedPage]:
+    """以 dpi 只渲染单页中的各区域（比例坐标 boxes [(x0, y0, x1, y1), ...]），返回各区域的编码图像。
+
+    各区域经 pdftoppm 的 -x/-y/-W/-H 参数分别光栅化，不在高 DPI 下渲染整页。
+    """
+    encode = encode or EncodeOptions.from_config()
+    metrics = get_metrics()
+    with metrics.timer("crop"):
+        width, height = get_page_size(pdf_path, page)
+        page_w, page_h = round(width * dpi / 72), round(height * dpi / 72)
+        regions = []
+        for x0, y0, x1, y1 in boxes:
+            x, y = int(x0 * page_w), int(y0 * page_h)
+            w, h = max(int(x1 * page_w) - x, 1), max(int(y1 * page_h) - y, 1)
+            try:
+                crop = _render_box(pdf_path, page, dpi, x, y, w, h)
+            except Exception as e:
+                raise RuntimeError(f"PDF 转图像失败（第 {page} 页）: {e}")
+            regions.append(RenderedPage(page=page, data=encode_image(crop, encode), mime=encode.mime))
+            crop.close()
+    return regions
@@ -0,0 +1,148 @@
+# common/response_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from .config import Config
+from .logger import setup_logger
+from .metrics import get_metrics
+
+logger = setup_logger("ResponseCache")
+
+# 每写入多少条执行一次淘汰检查
+_EVICT_EVERY = 100
+
+
+class ResponseCache:
+    """基于 SQLite 的模型响应缓存，以页面内容（图像或文本）、提示词、schema、模型与温度为键。
+
+    支持按总大小与存活时间淘汰，并记录命中/未命中次数。多线程共享同一连接（加锁），
+    多进程通过 SQLite WAL 模式并发读写。
+    """
+
+    def __init__(self, db_path: Path, max_bytes: int, max_age_seconds: float):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @staticmethod
+    def make_key(content_bytes: bytes, prompt: str, schema: dict, model: str, temperature: float) -> str:
+        """生成内容寻址的缓存键：任一输入变化都会得到不同的键。"""
+        h = hashlib.sha256()
+        h.update(hashlib.sha256(content_bytes).digest())
+        for part in (prompt, json.dumps(schema, sort_keys=True, ensure_ascii=False), model, repr(temperature)):
+            h.update(b"\0")
+            h.update(part.encode("utf-8"))
+        return h.hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            conn.commit()
+            self._conn = conn
+            self._evict_locked()
+        return self._conn
+
+    def get(self, key: str):
+        """读取缓存，未命中或已过期时返回 None。"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                get_metrics().incr("cache_misses")
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            get_metrics().incr("cache_hits")
+            return row[0]
+
+    def put(self, key: str, value: str):
+        """写入（或覆盖）一条缓存，并定期执行淘汰。"""
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now)
+            )
+            conn.commit()
+            self.writes += 1
+            if self.writes % _EVICT_EVERY == 0:
+                self._evict_locked()
+
+    def _evict_locked(self):
+        """删除过期条目；总大小超限时按最近访问时间从旧到新删除。"""
+        conn = self._conn
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            freed = 0
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+                victims.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+            logger.debug(f"缓存超出上限，淘汰 {len(victims)} 条")
+        conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def is_cacheable(raw_text) -> bool:
+    """仅缓存可解析为 JSON 对象的响应：被截断或非 JSON 的输出不写入，避免在缓存有效期内被反复读取。"""
+    if not isinstance(raw_text, str):
+        return False
+    try:
+        return isinstance(json.loads(raw_text), dict)
+    except ValueError:
+        return False
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """返回进程内共享的缓存实例；缓存被禁用时返回 None。"""
+    global _cache
+    if not Config.CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                Config.CACHE_PATH,
+                max_bytes=Config.CACHE_MAX_MB * 1024 * 1024,
+                max_age_seconds=Config.CACHE_MAX_AGE_DAYS * 86400
+            )
+        return _cache
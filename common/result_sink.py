@@ -0,0 +1,221 @@
+# common/result_sink.py
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from multiprocessing import util as mp_util
+from pathlib import Path
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("ResultSink")
+
+# 固定 schema：表名 -> ((列名, 类型), ...)；类型为 string / int / bool，JSON 列以字符串存放
+SCHEMA = {
+    "documents": (
+        ("document_id", "string"), ("content_hash", "string"), ("file", "string"), ("mode", "string"),
+        ("model", "string"), ("audited_at", "string"), ("status", "string"), ("errors", "int"),
+        ("warnings", "int"), ("pages", "int"), ("merged_contract", "string"), ("seal_summary", "string"),
+    ),
+    "pages": (
+        ("document_id", "string"), ("file", "string"), ("mode", "string"), ("kind", "string"),
+        ("model", "string"), ("audited_at", "string"), ("page", "int"), ("source", "string"),
+        ("skipped", "bool"), ("requires_seal", "bool"), ("seal_count", "int"), ("result", "string"),
+    ),
+    "issues": (
+        ("document_id", "string"), ("file", "string"), ("mode", "string"), ("kind", "string"),
+        ("audited_at", "string"), ("level", "string"), ("page", "int"), ("category", "string"),
+        ("message", "string"),
+    ),
+}
+
+SINK_TYPES = ("jsonl", "parquet")
+
+
+def _json(value) -> str:
+    return json.dumps(value, ensure_ascii=False) if value is not None else None
+
+
+def _page_source(item: dict):
+    """页面结果来源：text / vision，本地预筛跳过为 triage，提前停止未处理的页为 None。"""
+    if item.get("source"):
+        return item["source"]
+    if item.get("triage") == "no_candidate":
+        return "triage"
+    return None if item.get("skipped") else "vision"
+
+
+def report_records(outcome: dict, seal_report: dict = None, contract_report: dict = None,
+                   content_hash: str = None) -> dict:
+    """将一次文档审核的结论摘要与报告映射为固定 schema 的行：{表名: [行, ...]}。"""
+    from .run_ledger import issue_category
+
+    now = time.time()
+    base = {
+        "document_id": uuid.uuid4().hex, "file": outcome["file"], "mode": outcome["mode"],
+        "audited_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now)),
+    }
+    records = {"documents": [], "pages": [], "issues": []}
+    records["documents"].append({
+        **base, "content_hash": content_hash, "model": Config.MODEL, "status": outcome.get("status"),
+        "errors": outcome.get("errors", 0), "warnings": outcome.get("warnings", 0),
+        "pages": outcome.get("pages", 0),
+        "merged_contract": _json(contract_report["summary"].get("merged_contract")) if contract_report else None,
+        "seal_summary": _json(seal_report["summary"]) if seal_report else None,
+    })
+
+    for kind, report in (("seal", seal_report), ("contract", contract_report)):
+        if report is None:
+            continue
+        for item in report.get("raw_data", []):
+            result = item.get("result") or {}
+            seals = result.get("seals") if kind == "seal" else None
+            records["pages"].append({
+                **base, "kind": kind, "model": Config.MODEL, "page": item.get("page"),
+                "source": _page_source(item),
+                "skipped": bool(item.get("skipped")),
+                "requires_seal": result.get("requires_seal") if kind == "seal" else None,
+                "seal_count": len(seals) if seals is not None else None,
+                "result": _json(result),
+            })
+        for issue in report.get("issues_detail", []):
+            message = issue.get("Message", "")
+            records["issues"].append({
+                **base, "kind": kind, "level": issue.get("Type", "").lower(), "page": issue.get("Page") or None,
+                "category": issue_category(message), "message": message,
+            })
+    return records
+
+
+class ResultSink:
+    """结果数据集的写入端：按 date=YYYY-MM-DD/mode=<模式> 分区追加固定 schema 的行。"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def partition_dir(self, table: str, row: dict) -> Path:
+        return self.root / table / f"date={row['audited_at'][:10]}" / f"mode={row['mode']}"
+
+    def write(self, table: str, rows: list):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JsonlSink(ResultSink):
+    """JSON Lines：每个进程向各分区内自己的 part 文件追加，多进程同时写入互不干扰。"""
+
+    def write(self, table: str, rows: list):
+        columns = [c for c, _ in SCHEMA[table]]
+        groups = {}
+        for row in rows:
+            groups.setdefault(self.partition_dir(table, row), []).append(row)
+        with self._lock:
+            for part_dir, part_rows in groups.items():
+                part_dir.mkdir(parents=True, exist_ok=True)
+                with open(part_dir / f"part-{os.getpid()}.jsonl", "a", encoding="utf-8") as f:
+                    for row in part_rows:
+                        f.write(json.dumps({c: row.get(c) for c in columns}, ensure_ascii=False) + "\n")
+
+
+class ParquetSink(ResultSink):
+    """Parquet（需要 pyarrow）：按分区缓冲，累计 RESULT_PARQUET_ROWS 行或进程结束时写出一个 part 文件。"""
+
+    _TYPES = {"string": "string", "int": "int64", "bool": "bool_"}
+
+    def __init__(self, root: Path, max_rows: int = None):
+        import pyarrow as pa
+
+        super().__init__(root)
+        self.max_rows = max(1, max_rows or Config.RESULT_PARQUET_ROWS)
+        self._schemas = {
+            table: pa.schema([(c, getattr(pa, self._TYPES[t])()) for c, t in cols])
+            for table, cols in SCHEMA.items()
+        }
+        self._buffers = {}
+        self._seq = 0
+
+    def write(self, table: str, rows: list):
+        with self._lock:
+            for row in rows:
+                key = (table, self.partition_dir(table, row))
+                buffer = self._buffers.setdefault(key, [])
+                buffer.append(row)
+                if len(buffer) >= self.max_rows:
+                    self._flush_locked(key)
+
+    def _flush_locked(self, key):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table, part_dir = key
+        rows = self._buffers.pop(key, [])
+        if not rows:
+            return
+        schema = self._schemas[table]
+        data = pa.Table.from_pylist([{c: row.get(c) for c in schema.names} for row in rows], schema=schema)
+        part_dir.mkdir(parents=True, exist_ok=True)
+        self._seq += 1
+        pq.write_table(data, part_dir / f"part-{os.getpid()}-{int(time.time())}-{self._seq:04d}.parquet")
+
+    def close(self):
+        with self._lock:
+            for key in list(self._buffers):
+                self._flush_locked(key)
+
+
+_sinks = None
+_sinks_pid = None
+_sinks_lock = threading.Lock()
+
+
+def get_result_sinks() -> list:
+    """按 Config.RESULT_SINKS 创建进程内共享的结果写入端（未启用时返回空列表）。"""
+    global _sinks, _sinks_pid
+    with _sinks_lock:
+        if _sinks is None or _sinks_pid != os.getpid():
+            root = Config.RESULT_DIR or Config.OUTPUT_DIR / "results"
+            _sinks = []
+            for name in Config.RESULT_SINKS:
+                if name == "jsonl":
+                    _sinks.append(JsonlSink(root))
+                elif name == "parquet":
+                    _sinks.append(ParquetSink(root))
+                else:
+                    raise ValueError(f"未知结果写入端: {name}")
+            _sinks_pid = os.getpid()
+            if _sinks:
+                # 进程池工作进程退出时不执行 atexit，需通过 multiprocessing 的终结器写出缓冲
+                atexit.register(close_result_sinks)
+                mp_util.Finalize(None, close_result_sinks, exitpriority=10)
+        return _sinks
+
+
+def emit_results(outcome: dict, seal_report: dict = None, contract_report: dict = None, content_hash: str = None):
+    """将一次文档审核写入所有已启用的结果写入端；写入失败仅告警。"""
+    sinks = get_result_sinks()
+    if not sinks:
+        return
+    records = report_records(outcome, seal_report, contract_report, content_hash)
+    for sink in sinks:
+        try:
+            for table, rows in records.items():
+                if rows:
+                    sink.write(table, rows)
+        except Exception as e:
+            logger.warning(f"写入结果数据集失败（{type(sink).__name__}）: {e}")
+
+
+def close_result_sinks():
+    """写出所有缓冲中的结果（可重复调用）。"""
+    with _sinks_lock:
+        sinks = list(_sinks or []) if _sinks_pid == os.getpid() else []
+    for sink in sinks:
+        try:
+            sink.close()
+        except Exception as e:
+            logger.warning(f"写出结果数据集失败（{type(sink).__name__}）: {e}")
@@ -0,0 +1,202 @@
+# common/run_ledger.py
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("RunLedger")
+
+# 旧版计数文件：首次创建台账时导入其计数，之后不再写入
+LEGACY_USAGE_FILE = Path(__file__).parent.parent / "usage_count.json"
+
+# 审核模式 -> 计入的功能（合并模式同时计入两项，与旧版计数口径一致）
+MODE_FEATURES = {"seal": ("seal",), "contract": ("contract",), "combined": ("seal", "contract")}
+
+_CATEGORY_RE = re.compile(r"^【(.+?)】")
+
+
+def issue_category(message: str) -> str:
+    """从问题描述中提取类别（如“【乙方印章】…” -> 乙方印章）。"""
+    m = _CATEGORY_RE.match(message or "")
+    return m.group(1) if m else "其他"
+
+
+def legacy_usage():
+    """读取旧版 usage_count.json 的计数 {"seal": n, "contract": n}；文件不存在或无法读取时返回 None。"""
+    if not LEGACY_USAGE_FILE.exists():
+        return None
+    try:
+        with open(LEGACY_USAGE_FILE, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        return {k: int(legacy.get(k, 0)) for k in ("seal", "contract")}
+    except Exception as e:
+        logger.warning(f"无法读取旧版使用统计 {LEGACY_USAGE_FILE}: {e}")
+        return None
+
+
+class RunLedger:
+    """只追加的审核台账：每审核完一个文档插入一行（模式、页数、耗时、API 调用、缓存命中、token、结论）。
+
+    每次写入是单条 INSERT 事务，基于 SQLite（WAL）可供多进程、多线程同时写入；
+    --count 的统计均为对台账的聚合查询。
+    """
+
+    def __init__(self, db_path: Path = None):
+        self.db_path = Path(db_path or Config.LEDGER_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " ts REAL NOT NULL,"
+                " day TEXT NOT NULL,"
+                " file TEXT NOT NULL,"
+                " mode TEXT NOT NULL,"
+                " model TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " pages INTEGER NOT NULL DEFAULT 0,"
+                " duration_s REAL NOT NULL DEFAULT 0,"
+                " api_calls INTEGER NOT NULL DEFAULT 0,"
+                " cache_hits INTEGER NOT NULL DEFAULT 0,"
+                " input_tokens INTEGER NOT NULL DEFAULT 0,"
+                " output_tokens INTEGER NOT NULL DEFAULT 0,"
+                " upload_bytes INTEGER NOT NULL DEFAULT 0,"
+                " retries INTEGER NOT NULL DEFAULT 0,"
+                " throttled INTEGER NOT NULL DEFAULT 0,"
+                " errors INTEGER NOT NULL DEFAULT 0,"
+                " warnings INTEGER NOT NULL DEFAULT 0,"
+                " error_type TEXT,"
+                " pid INTEGER);"
+                "CREATE INDEX IF NOT EXISTS runs_day ON runs (day);"
+                "CREATE INDEX IF NOT EXISTS runs_mode ON runs (mode);"
+                "CREATE TABLE IF NOT EXISTS run_issues ("
+                " run_id INTEGER NOT NULL REFERENCES runs (id),"
+                " level TEXT NOT NULL,"
+                " category TEXT NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS run_issues_category ON run_issues (category);"
+                "CREATE TABLE IF NOT EXISTS legacy_usage ("
+                " feature TEXT PRIMARY KEY,"
+                " count INTEGER NOT NULL);"
+            )
+        self._migrate()
+        self._import_legacy_usage()
+
+    def _migrate(self):
+        """为旧版台账补齐后来新增的列。"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        with self._conn:
+            for column in ("retries", "throttled"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE runs ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+    def _import_legacy_usage(self):
+        """一次性导入旧版 usage_count.json 的计数（已导入则跳过）。"""
+        legacy = legacy_usage()
+        if legacy is None:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO legacy_usage (feature, count) VALUES (?, ?)",
+                                   legacy.items())
+
+    def record(self, outcome: dict, duration_s: float = 0.0, counters: dict = None, issues: list = None) -> int:
+        """原子地追加一条文档审核记录及其问题类别，返回记录 id。
+
+        outcome 为 aaudit_document 的结论摘要（status 为 pass / fail / error）；
+        counters 为该文档的指标计数器；issues 为 [(level, category), ...]。
+        """
+        counters = counters or {}
+        now = time.time()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (ts, day, file, mode, model, status, pages, duration_s, api_calls, cache_hits,"
+                " input_tokens, output_tokens, upload_bytes, retries, throttled, errors, warnings, error_type, pid)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (now, time.strftime("%Y-%m-%d", time.localtime(now)), outcome["file"], outcome["mode"],
+                 Config.MODEL, outcome["status"], outcome.get("pages", 0), round(duration_s, 4),
+                 int(counters.get("requests", 0)), int(counters.get("cache_hits", 0)),
+                 int(counters.get("input_tokens", 0)), int(counters.get("output_tokens", 0)),
+                 int(counters.get("upload_bytes", 0)), int(counters.get("retries", 0)),
+                 int(counters.get("throttled", 0)), outcome.get("errors", 0), outcome.get("warnings", 0),
+                 outcome.get("error_type"), os.getpid())
+            )
+            run_id = cur.lastrowid
+            if issues:
+                self._conn.executemany(
+                    "INSERT INTO run_issues (run_id, level, category) VALUES (?, ?, ?)",
+                    [(run_id, level, category) for level, category in issues]
+                )
+        return run_id
+
+    def feature_totals(self) -> dict:
+        """按功能统计累计审核次数（含旧版导入的计数），口径与旧版 --count 一致。"""
+        totals = {"seal": 0, "contract": 0}
+        with self._lock:
+            for feature, count in self._conn.execute("SELECT feature, count FROM legacy_usage"):
+                totals[feature] = totals.get(feature, 0) + count
+            rows = self._conn.execute("SELECT mode, COUNT(*) FROM runs WHERE status != 'error' GROUP BY mode")
+            for mode, count in rows:
+                for feature in MODE_FEATURES.get(mode, ()):
+                    totals[feature] += count
+        return totals
+
+    def by_mode(self) -> list:
+        """按模式汇总：文档数、通过/不通过/失败、页数、API 调用、缓存命中、token、重试、限流、平均耗时。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT mode, COUNT(*), SUM(status = 'pass'), SUM(status = 'fail'), SUM(status = 'error'),"
+                " SUM(pages), SUM(api_calls), SUM(cache_hits), SUM(input_tokens), SUM(output_tokens),"
+                " SUM(retries), SUM(throttled), AVG(duration_s) FROM runs GROUP BY mode ORDER BY mode"
+            ).fetchall()
+        keys = ("mode", "documents", "pass", "fail", "error", "pages", "api_calls", "cache_hits",
+                "input_tokens", "output_tokens", "retries", "throttled", "avg_duration_s")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def by_day(self, days: int = 14) -> list:
+        """最近 days 天（有记录的日期）按天汇总。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, COUNT(*), SUM(status = 'fail'), SUM(status = 'error'), SUM(pages), SUM(api_calls),"
+                " SUM(input_tokens + output_tokens) FROM runs GROUP BY day ORDER BY day DESC LIMIT ?",
+                (days,)
+            ).fetchall()
+        keys = ("day", "documents", "fail", "error", "pages", "api_calls", "tokens")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def by_error_type(self, limit: int = 10) -> list:
+        """按问题类别统计出现次数（含处理失败的异常类型），按次数降序。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT level, category, COUNT(*) AS n FROM run_issues GROUP BY level, category"
+                " UNION ALL"
+                " SELECT 'exception', error_type, COUNT(*) FROM runs"
+                " WHERE status = 'error' GROUP BY error_type"
+                " ORDER BY n DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [{"level": level, "category": category or "未知", "count": n} for level, category, n in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+_ledger = None
+_ledger_pid = None
+_ledger_lock = threading.Lock()
+
+
+def get_run_ledger() -> RunLedger:
+    """返回进程内共享的台账连接（首次使用时创建；fork 出的子进程各自重新连接）。"""
+    global _ledger, _ledger_pid
+    with _ledger_lock:
+        if _ledger is None or _ledger_pid != os.getpid():
+            _ledger = RunLedger()
+            _ledger_pid = os.getpid()
+        return _ledger
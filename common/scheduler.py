@@ -0,0 +1,242 @@
+# common/scheduler.py
+import asyncio
+import os
+import random
+import threading
+import time
+from .config import Config
+from .logger import setup_logger
+from .metrics import get_metrics
+
+logger = setup_logger("RequestScheduler")
+
+# 可重试的 HTTP 状态码：限流与服务端临时故障
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ModelAPIError(RuntimeError):
+    """模型接口返回非 200：保留 HTTP 状态码、错误码与服务端建议的等待秒数（Retry-After）。"""
+
+    def __init__(self, status: int, code: str = None, retry_after: float = None):
+        super().__init__(f"API 错误: {code or status}")
+        self.status = status
+        self.code = code
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self) -> bool:
+        return self.status == 429 or str(self.code or "").startswith("Throttling")
+
+    @property
+    def retryable(self) -> bool:
+        return self.throttled or self.status in RETRYABLE_STATUS
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """限流、5xx、连接错误与超时可重试；其余（参数错误、鉴权失败等）直接失败。"""
+    if isinstance(exc, ModelAPIError):
+        return exc.retryable
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    try:
+        import aiohttp
+    except ImportError:
+        return False
+    return isinstance(exc, aiohttp.ClientError)
+
+
+class TokenBucket:
+    """令牌桶（线程安全）：每秒补充 rate 个令牌，最多积累 capacity 个；rate <= 0 表示不限。
+
+    reserve() 立即扣减令牌（可扣成负数）并返回调用方需等待的秒数，由调用方自行 sleep，
+    因此同一个桶可被多个线程、多个事件循环共用。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, n: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= n
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def adjust(self, delta: float):
+        """按实际用量修正先前的预估扣减（delta > 0 表示多扣，< 0 表示返还）。"""
+        if self.rate <= 0 or not delta:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class CircuitBreaker:
+    """熔断器：连续 threshold 次可重试失败后打开，cooldown 秒内暂停提交新请求；
+    到期后进入半开状态，仅放行一个探测请求，成功则关闭，失败则重新打开。threshold <= 0 表示不启用。
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def wait_time(self) -> float:
+        """返回放行前需等待的秒数；0 表示可以立即发送。"""
+        if self.threshold <= 0:
+            return 0.0
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            if self.state == "open":
+                remaining = self._opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    return remaining
+                self.state = "half_open"
+                self._probing = False
+            if not self._probing:
+                self._probing = True
+                return 0.0
+            # 探测请求尚未返回，稍后再查
+            return min(1.0, self.cooldown)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self.state != "closed":
+                self.state = "closed"
+                logger.info("模型接口已恢复，熔断器关闭")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.threshold <= 0:
+                return
+            if self.state == "half_open" or (self.state == "closed" and self._failures >= self.threshold):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                get_metrics().incr("breaker_opens")
+                logger.warning(f"模型接口连续 {self._failures} 次失败，熔断 {self.cooldown:g} 秒后再试")
+
+    def release_probe(self):
+        """探测请求被取消时释放探测名额。"""
+        with self._lock:
+            self._probing = False
+
+
+class RequestScheduler:
+    """所有模型调用共用的请求调度：令牌桶限流（QPS / TPM）、可重试错误的抖动指数退避、熔断。
+
+    TPM 按每次请求的预估 token 数预扣（预估值为近期实际用量的滑动平均），响应返回后按
+    usage 修正；重试与 429 次数记入指标计数器 retries / throttled。
+    """
+
+    def __init__(self, qps: float = None, tpm: float = None, max_retries: int = None,
+                 base_delay: float = None, max_delay: float = None,
+                 breaker_threshold: int = None, breaker_cooldown: float = None):
+        qps = Config.RATE_LIMIT_QPS if qps is None else qps
+        tpm = Config.RATE_LIMIT_TPM if tpm is None else tpm
+        self.max_retries = max(0, Config.MAX_RETRIES if max_retries is None else max_retries)
+        self.base_delay = Config.RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = Config.RETRY_MAX_DELAY if max_delay is None else max_delay
+        # 突发上限：QPS 为 1 秒、TPM 为 10 秒的配额
+        self._qps = TokenBucket(qps, qps)
+        self._tpm = TokenBucket(tpm / 60, tpm / 6)
+        self.breaker = CircuitBreaker(
+            Config.BREAKER_THRESHOLD if breaker_threshold is None else breaker_threshold,
+            Config.BREAKER_COOLDOWN if breaker_cooldown is None else breaker_cooldown
+        )
+        self._estimate = float(Config.RATE_LIMIT_EST_TOKENS)
+        self._lock = threading.Lock()
+
+    async def _admit(self) -> float:
+        """等待熔断器放行并取得限流令牌，返回本次预扣的 token 数。"""
+        while True:
+            wait = self.breaker.wait_time()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        with self._lock:
+            estimate = self._estimate
+        wait = max(self._qps.reserve(1), self._tpm.reserve(estimate))
+        if wait > 0:
+            get_metrics().incr("rate_limited_waits")
+            await asyncio.sleep(wait)
+        return estimate
+
+    def _settle(self, estimate: float, tokens: float):
+        self._tpm.adjust(tokens - estimate)
+        with self._lock:
+            self._estimate = 0.8 * self._estimate + 0.2 * tokens
+
+    def backoff(self, attempt: int, retry_after: float = None) -> float:
+        """第 attempt 次重试前的等待秒数：全抖动指数退避，且不短于服务端给出的 Retry-After。"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+    async def submit(self, call, tokens_of=None):
+        """执行 await call()；可重试错误按退避重试，用尽重试次数后抛出最后一次的异常。
+
+        tokens_of(result) 返回本次请求实际消耗的 token 数（未知时返回 None），用于修正 TPM 预扣。
+        """
+        metrics = get_metrics()
+        attempt = 0
+        while True:
+            estimate = await self._admit()
+            try:
+                result = await call()
+            except Exception as e:
+                if not is_retryable(e):
+                    # 接口有响应（如参数错误），不计入熔断
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if isinstance(e, ModelAPIError) and e.throttled:
+                    metrics.incr("throttled")
+                if attempt >= self.max_retries:
+                    logger.error(f"模型请求重试 {attempt} 次后仍失败: {e}")
+                    raise
+                attempt += 1
+                delay = self.backoff(attempt, getattr(e, "retry_after", None))
+                metrics.incr("retries")
+                logger.warning(f"模型请求失败（{e}），{delay:.1f} 秒后第 {attempt} 次重试")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            tokens = tokens_of(result) if tokens_of else None
+            if tokens:
+                self._settle(estimate, tokens)
+            return result
+
+
+_scheduler = None
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """返回进程内共享的请求调度器（首次使用时按 Config 创建；fork 出的子进程各自创建）。"""
+    global _scheduler, _scheduler_pid
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler_pid != os.getpid():
+            _scheduler = RequestScheduler()
+            _scheduler_pid = os.getpid()
+        return _scheduler
@@ -0,0 +1,66 @@
+# common/text_layer.py
+import re
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger("TextLayer")
+
+# 出现这些词的页面通常含签字/盖章区域，需交由视觉模型判断
+SIGNATURE_KEYWORDS = ("盖章", "签章", "签字", "签名", "（章）", "(章)", "法定代表人", "委托代理人", "授权代表")
+
+
+@dataclass
+class TextPage:
+    """文本层快速通道的单页输入：页码 + PDF 内嵌文本。"""
+    page: int
+    text: str
+
+
+def extract_page_texts(pdf_path: Path) -> list[str]:
+    """用 poppler 的 pdftotext 提取每页内嵌文本，返回按页序排列的列表。
+
+    pdftotext 不可用或提取失败时返回空列表，调用方应退回视觉模型。
+    """
+    exe = shutil.which("pdftotext")
+    if not exe:
+        logger.warning("未找到 pdftotext（poppler-utils），跳过文本层快速通道")
+        return []
+    try:
+        proc = subprocess.run(
+            [exe, "-layout", "-enc", "UTF-8", str(pdf_path), "-"],
+            capture_output=True, timeout=120, check=True
+        )
+    except Exception as e:
+        logger.warning(f"提取 PDF 文本层失败，退回视觉模型: {e}")
+        return []
+    pages = proc.stdout.decode("utf-8", errors="replace").split("\f")
+    # pdftotext 在每页末尾输出换页符，最后一个分段为空
+    if pages and not pages[-1].strip():
+        pages.pop()
+    return pages
+
+
+def is_born_digital(text: str) -> bool:
+    """文本层足够丰富（非空白字符数达到阈值）时视为原生电子页面。"""
+    return len(re.sub(r"\s", "", text)) >= Config.TEXT_MIN_CHARS
+
+
+def needs_vision(text: str) -> bool:
+    """判断文本页是否仍需视觉模型：含签字/盖章区域的页面无法仅凭文本判断。"""
+    return any(k in text for k in SIGNATURE_KEYWORDS)
+
+
+def select_text_pages(pdf_path: Path) -> dict:
+    """返回可走文本快速通道的页面 {页码: 文本}；扫描页与签章页不在其中。"""
+    texts = extract_page_texts(pdf_path)
+    selected = {
+        i: text for i, text in enumerate(texts, start=1)
+        if is_born_digital(text) and not needs_vision(text)
+    }
+    if texts:
+        logger.info(f"文本层检测：共 {len(texts)} 页，其中 {len(selected)} 页走文本快速通道")
+    return selected
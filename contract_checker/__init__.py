@@ -1 +1 @@
-from .checker import check_contract_compliance
\ No newline at end of file
+from .checker import acheck_contract_compliance, check_contract_compliance
\ No newline at end of file
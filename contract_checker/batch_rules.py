@@ -0,0 +1,147 @@
+# contract_checker/batch_rules.py
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from common.metrics import timed
+from .checker import JSON_SCHEMA
+
+# 同一规则在一条问题中最多列出的其他合同数
+MAX_LISTED = 3
+
+
+@dataclass(frozen=True)
+class BatchRule:
+    """跨文档规则：按 key 字段（均非空）将整批合并后的合同分组，组内 distinct 字段出现多个不同取值时，
+    对组内每份合同报告一条问题。distinct 为 "file" 表示“同一 key 不应出现在多份文件中”。
+
+    message 可引用本合同的 key 字段（如 {contract_id}）以及 {others}（冲突的其他合同）。
+    """
+    name: str
+    level: str
+    key: tuple
+    distinct: str
+    message: str
+
+
+BATCH_RULES = (
+    BatchRule("duplicate_contract_id", "error", ("contract_id",), "file",
+              "【合同编号重复】合同编号 {contract_id} 同时出现在其他文件中：{others}"),
+    BatchRule("party_b_bank_conflict", "warning", ("party_b_name",), "bank_account_number",
+              "【乙方账号不一致】乙方 {party_b_name} 在其他合同中使用了不同的银行账号：{others}"),
+    BatchRule("bank_account_shared", "warning", ("bank_account_number",), "party_b_name",
+              "【账号归属不一致】银行账号 {bank_account_number} 在其他合同中对应不同的乙方：{others}"),
+    BatchRule("duplicate_amount_parties", "warning", ("party_a_name", "party_b_name", "total_amount_incl_tax"), "file",
+              "【疑似重复合同】甲方、乙方与含税总金额（{total_amount_incl_tax}）均相同的其他合同：{others}"),
+)
+
+
+def _text(value: str) -> str:
+    """全角转半角、去除所有空白。"""
+    return re.sub(r"\s+", "", unicodedata.normalize("NFKC", value))
+
+
+def _code(value: str) -> str:
+    """编号类字段：另外忽略大小写与常见分隔符。"""
+    return re.sub(r"[-_/.·]", "", _text(value)).upper()
+
+
+def _account(value: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]", "", _text(value)).upper()
+
+
+def _amount(value: str) -> str:
+    """金额：去掉货币符号、单位与千分位后按数值比较（“1,000.00元”与“¥1000”相同），无法解析时按文本比较。"""
+    text = _text(value)
+    number = re.sub(r"[,，¥￥$]|人民币|RMB|元整?$", "", text, flags=re.IGNORECASE)
+    try:
+        return str(Decimal(number).normalize())
+    except InvalidOperation:
+        return text
+
+
+# 字段 -> 分组与比较前的规范化（未列出的字段按 _text 处理）
+NORMALIZERS = {
+    "contract_id": _code,
+    "bank_account_number": _account,
+    "total_amount_incl_tax": _amount,
+}
+
+
+class _CompiledRule:
+    """编译后的规则：预先绑定各字段的规范化函数，运行时为 key 建立哈希索引（key -> distinct 取值 -> 行号）。"""
+
+    def __init__(self, rule: BatchRule):
+        unknown = [f for f in rule.key + (rule.distinct,) if f != "file" and f not in JSON_SCHEMA["properties"]]
+        if unknown:
+            raise ValueError(f"跨文档规则 {rule.name} 引用了未知字段: {unknown}")
+        if rule.level not in ("error", "warning"):
+            raise ValueError(f"跨文档规则 {rule.name} 的级别无效: {rule.level}")
+        self.rule = rule
+        self._key = [(f, NORMALIZERS.get(f, _text)) for f in rule.key]
+        self._distinct = (lambda v: v) if rule.distinct == "file" else NORMALIZERS.get(rule.distinct, _text)
+
+    def run(self, table: list) -> dict:
+        """返回 {行号: [问题, ...]}；整体为 O(行数 + 冲突组大小)。"""
+        index = defaultdict(lambda: defaultdict(list))
+        for i, row in enumerate(table):
+            values = [row.get(f, "") for f, _ in self._key]
+            if not all(v.strip() for v in values):
+                continue
+            distinct = row.get(self.rule.distinct, "")
+            if not distinct.strip():
+                continue
+            key = tuple(norm(v) for (_, norm), v in zip(self._key, values))
+            index[key][self._distinct(distinct)].append(i)
+
+        issues = defaultdict(list)
+        for groups in index.values():
+            if len(groups) < 2:
+                continue
+            total = sum(len(rows) for rows in groups.values())
+            for value, rows in groups.items():
+                # 只取前几份用于展示，避免大组内逐行拼接全部冲突合同
+                listed = []
+                for other, members in groups.items():
+                    if other != value:
+                        listed += members[:MAX_LISTED - len(listed)]
+                        if len(listed) >= MAX_LISTED:
+                            break
+                for i in rows:
+                    issues[i].append(self._issue(table, i, listed, total - len(rows)))
+        return issues
+
+    def _issue(self, table: list, i: int, listed: list, count: int) -> dict:
+        rule = self.rule
+        names = []
+        for j in listed:
+            name = Path(table[j]["file"]).name
+            names.append(name if rule.distinct == "file" else f"{table[j][rule.distinct]}（{name}）")
+        text = "、".join(names) + (f" 等 {count} 份" if count > len(names) else "")
+        message = rule.message.format(others=text, **{f: table[i].get(f, "") for f in rule.key})
+        return {"Type": rule.level.upper(), "Rule": rule.name, "Message": message}
+
+
+def compile_rules(rules=BATCH_RULES) -> list:
+    """编译规则集（校验字段名与级别）；同一规则集只需编译一次。"""
+    return [_CompiledRule(rule) for rule in rules]
+
+
+COMPILED_RULES = compile_rules()
+
+
+@timed("batch_rules")
+def run_batch_rules(table: list, compiled: list = None) -> dict:
+    """对整批合并后的合同表运行跨文档规则。
+
+    table 为 [{"file": 路径, **merged_contract}, ...]；返回 {行号: [{"Type", "Rule", "Message"}, ...]}，
+    未触发任何规则的行不在其中。
+    """
+    compiled = COMPILED_RULES if compiled is None else compiled
+    issues = defaultdict(list)
+    for rule in compiled:
+        for i, items in rule.run(table).items():
+            issues[i].extend(items)
+    return dict(issues)
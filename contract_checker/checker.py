@@ -1,11 +1,23 @@
 # contract_checker/checker.py
+import asyncio
 import json
+import threading
+from functools import partial
 from pathlib import Path
-from dashscope import MultiModalConversation
+from common.async_client import AsyncModelClient, client_scope
+from common.concurrency import arun_batches
 from common.config import Config
+from common.image_encoder import EncodeOptions, format_upload_stats
 from common.logger import setup_logger
-from common.path_validator import is_safe_path
-from common.pdf_to_images import pdf_to_images
+from common.metrics import get_metrics
+from common.page_batch import analyze_pages, with_single_fallback
+from common.page_dedup import get_page_index, page_screen
+from common.page_journal import PageJournal, merge_pages
+from common.page_stream import astream, open_stream
+from common.path_validator import is_allowed_path
+from common.pdf_to_images import RenderedPage, get_page_count, iter_pdf_images, page_workspace
+from common.text_layer import TextPage, select_text_pages
+from .validator import build_contract_report, contract_page_issues
 
 logger = setup_logger("ContractChecker")
 
@@ -37,61 +49,223 @@ JSON_SCHEMA = {
 }
 
 
-def check_contract_compliance(pdf_path: str):
-    """对 PDF 合同逐页调用大模型提取结构化字段。"""
+# 模型用于表示“存在但无法辨认”的占位值，不视为可信字段值
+UNCLEAR_VALUES = ("（签名模糊）", "（印章模糊）")
+
+# 提前结束所需的字段：合规判定（validator）与跨文档规则（batch_rules）依赖的字段；
+# 关联主体、数量等可选字段在多数合同中本就为空，不作为结束条件
+EARLY_STOP_REQUIRED_FIELDS = frozenset({
+    "contract_name", "contract_id", "party_a_name", "party_b_name",
+    "seal_party_a", "seal_party_b", "total_amount_incl_tax",
+})
+
+
+def check_contract_compliance(pdf_path: str, max_workers: int = None, early_stop: bool = None, on_event=None):
+    """对 PDF 合同逐页调用大模型提取结构化字段（同步入口，acheck_contract_compliance 的薄包装）。"""
+    return asyncio.run(acheck_contract_compliance(pdf_path, concurrency=max_workers, early_stop=early_stop,
+                                                  on_event=on_event))
+
+
+def astream_contract_compliance(pdf_path: str, **kwargs):
+    """逐页产出合同提取事件的异步迭代器（见 common.page_stream.PageStream），最后一个事件为 result（逐页结果）。"""
+    return astream(lambda on_event: acheck_contract_compliance(pdf_path, on_event=on_event, **kwargs))
+
+
+async def acheck_contract_compliance(pdf_path: str, concurrency: int = None, early_stop: bool = None,
+                                     client: AsyncModelClient = None, journal: PageJournal = None, on_event=None):
+    """对 PDF 合同逐页调用大模型提取结构化字段（页间并发，结果按页序返回）。
+
+    concurrency 限制本文档同时在途的页面数；传入共享的 client 时可在多个文档间复用连接池与总并发上限。
+    early_stop 为真时按“首页 → 末尾签署页 → 其余页”的顺序访问页面，
+    EARLY_STOP_REQUIRED_FIELDS 均取得可信值后不再调用模型，未分析的页面以 skipped 标记写入结果。
+    Config.CONTRACT_BATCH_PAGES > 1 时图像页每次请求携带多页（合并响应不合规时逐页重试），文本页仍逐页调用。
+    给定 journal 时每页结果写入页面日志，日志中已完成的页面不再光栅化与分析。
+    Config.PAGE_DEDUP 为真时与批次内已分析的纯文字页近似重复的图像页沿用其结果。
+    给定 on_event 时每页结果在分析完成后立即回调，结束时推送合同校验问题与结论（见 PageStream）。
+    """
+    early_stop = Config.EARLY_STOP if early_stop is None else early_stop
     Config.init_dirs()
     pdf_p = Path(pdf_path).resolve()
 
-    if not is_safe_path(Config.ALLOWED_BASE_DIR, str(pdf_p)):
+    if not is_allowed_path(str(pdf_p)):
         raise ValueError("路径不安全")
     if not pdf_p.exists():
         raise FileNotFoundError(f"文件不存在: {pdf_path}")
 
-    image_paths = pdf_to_images(pdf_p, Config.TEMP_DIR)
-    results = []
+    # 原生电子页面（有完整文本层且不含签章区域）走纯文本模型，不做光栅化
+    text_pages = await asyncio.to_thread(select_text_pages, pdf_p) if Config.TEXT_FAST_PATH else {}
+    # 合同字段均为文字信息，可按配置转灰度以减小上传体积
+    encode = EncodeOptions.from_config(grayscale=Config.GRAYSCALE_CONTRACT)
+    total = await asyncio.to_thread(get_page_count, pdf_p)
+    order = heuristic_page_order(total) if early_stop else list(range(1, total + 1))
+    tracker = _FieldTracker() if early_stop else None
+    resumed = journal.entries() if journal is not None else []
+    done = {item["page"] for item in resumed}
+    if tracker is not None:
+        for item in resumed:
+            tracker.update(item["result"])
+    stream = open_stream(on_event, pdf_path, "contract", contract_page_issues)
+    if stream is not None:
+        stream.pages(resumed, resumed=True)
+    async with client_scope(client, concurrency) as client:
+        worker = partial(_process_batch, client=client)
+        index = get_page_index()
+        if index is not None:
+            from seal_detector.triage import no_seal_candidate
 
-    for img in image_paths:
-        page_num = int(img.stem.split('_')[-1])
-        try:
-            res = _analyze_page(img)
-            if not isinstance(res, dict):
-                res = {}
-            results.append({"page": page_num, "result": res})
-        except Exception as e:
-            logger.error(f"第 {page_num} 页合同分析失败: {e}")
-            results.append({"page": page_num, "result": {}})
+            screen = await asyncio.to_thread(page_screen, pdf_p, no_seal_candidate)
+            worker = index.wrap(worker, "contract", pdf_p.name, screen=screen)
+        if journal is not None:
+            worker = journal.wrap(worker)
+        if stream is not None:
+            worker = stream.wrap(worker)
+        if tracker is not None:
+            worker = tracker.wrap(worker)
+        with page_workspace() as workspace:
+            pending = [n for n in order if n not in done]
+            pages = _iter_contract_pages(pdf_p, workspace, encode, text_pages, pending, tracker)
+            fresh = await arun_batches(worker, pages, Config.CONTRACT_BATCH_PAGES, concurrency,
+                                       batchable=lambda page: isinstance(page, RenderedPage))
+    results = merge_pages(resumed, fresh) if resumed else fresh
+    logger.info(f"合同页面上传统计：{format_upload_stats(results)}")
+
+    if early_stop:
+        results = [item for item in results if not item.get("skipped")]
+        visited = {item["page"] for item in results}
+        skipped = [n for n in order if n not in visited]
+        if skipped:
+            logger.info(f"关键字段已提取，提前结束：跳过 {len(skipped)} 页（第 {', '.join(map(str, sorted(skipped)))} 页）")
+        results += [_skipped_entry(n) for n in skipped]
+        results.sort(key=lambda item: item["page"])
+    if stream is not None:
+        stream.finish(build_contract_report(results))
     return results
 
 
-def _analyze_page(image_path: Path):
+def heuristic_page_order(total: int) -> list[int]:
+    """提前结束模式的访问顺序：首页（封面/合同要素）→ 末尾签署页 → 其余页面。"""
+    tail = list(range(max(2, total - Config.EARLY_STOP_TAIL_PAGES + 1), total + 1))
+    middle = list(range(2, tail[0] if tail else total + 1))
+    return ([1] if total else []) + tail + middle
+
+
+def _skipped_entry(page: int) -> dict:
+    return {"page": page, "skipped": True, "image_bytes": 0, "result": {}}
+
+
+class _FieldTracker:
+    """记录 EARLY_STOP_REQUIRED_FIELDS 中已取得可信值的字段（线程安全）；齐全后页面生成器停止派发，
+    已派发但尚未发出请求的页面也直接跳过。"""
+
+    def __init__(self, required=EARLY_STOP_REQUIRED_FIELDS):
+        self._missing = set(required)
+        self._lock = threading.Lock()
+
+    @property
+    def complete(self) -> bool:
+        with self._lock:
+            return not self._missing
+
+    def update(self, result: dict):
+        with self._lock:
+            for field in list(self._missing):
+                val = result.get(field, "")
+                if isinstance(val, str) and val.strip() and val.strip() not in UNCLEAR_VALUES:
+                    self._missing.discard(field)
+
+    def wrap(self, worker):
+        """包装 arun_batches 的 worker（须为最外层）：取得并发名额后再检查一次，
+        预读入队期间字段已齐全的页面不再请求模型，返回 skipped 结果。"""
+        async def tracked(pages):
+            if self.complete:
+                return [_skipped_entry(page.page) for page in pages]
+            entries = await worker(pages)
+            for entry in entries:
+                self.update(entry["result"])
+            return entries
+        return tracked
+
+
+def _iter_contract_pages(pdf_p: Path, workspace: Path, encode: EncodeOptions, text_pages: dict,
+                         order: list[int], tracker: "_FieldTracker" = None):
+    """按 order 产出待分析页面：文本快速通道页面产出 TextPage，其余页面流式光栅化。
+
+    给定 tracker 时，在产出每一页前检查字段是否已全部取得，是则停止（未渲染的页面不再光栅化）。
+    """
+    rendered = iter_pdf_images(pdf_p, workspace, encode=encode, pages=[n for n in order if n not in text_pages])
+    for n in order:
+        if tracker is not None and tracker.complete:
+            return
+        yield TextPage(n, text_pages[n]) if n in text_pages else next(rendered)
+
+
+async def _process_batch(pages: list, client: AsyncModelClient) -> list:
+    """一组图像页合并为一次请求提取字段；合并响应不合规时逐页分析（限流、熔断等请求错误直接抛出）。"""
+    async def analyze(batch):
+        from .prompt import CONTRACT_PROMPT
+
+        results = await analyze_pages(batch, client, CONTRACT_PROMPT, JSON_SCHEMA)
+        return [{"page": p.page, "source": "vision", "image_bytes": len(p.data),
+                 "result": normalize_contract_result(results[p.page])} for p in batch]
+
+    return await with_single_fallback(pages, analyze, partial(_process_page, client=client))
+
+
+async def _process_page(page, client: AsyncModelClient) -> dict:
+    """分析单页（图像或文本层）并在失败时返回空结果，保证每页都有输出。"""
+    page_num = page.page
+    if isinstance(page, TextPage):
+        entry = {"page": page_num, "source": "text", "image_bytes": 0}
+        analyze = _analyze_text_page
+    else:
+        entry = {"page": page_num, "source": "vision", "image_bytes": len(page.data)}
+        analyze = _analyze_page
+    try:
+        res = await analyze(page, client)
+        if not isinstance(res, dict):
+            res = {}
+        return {**entry, "result": res}
+    except Exception as e:
+        logger.error(f"第 {page_num} 页合同分析失败: {e}")
+        get_metrics().incr("failed_pages")
+        return {**entry, "result": {}, "error": str(e)}
+
+
+async def _analyze_page(page: RenderedPage, client: AsyncModelClient):
     """调用多模态大模型分析单页合同图像并返回 JSON 结果。"""
     from .prompt import CONTRACT_PROMPT
 
-    messages = [{
-        "role": "user",
-        "content": [
-            {"image": str(image_path)},
-            {"text": CONTRACT_PROMPT}
-        ]
-    }]
-
-    response = MultiModalConversation.call(
-        model=Config.MODEL,
-        messages=messages,
-        response_format={"type": "json_object", "schema": JSON_SCHEMA},
-        temperature=0.01
-    )
-
-    if response.status_code != 200:
-        raise RuntimeError(f"API 错误: {response.code}")
-
-    raw_text = response.output.choices[0].message.content[0]["text"]
-    try:
-        data = json.loads(raw_text)
-        for key in JSON_SCHEMA["properties"]:
-            if key not in data or data[key] is None:
-                data[key] = ""
-        return data
-    except json.JSONDecodeError:
-        logger.warning(f"非JSON响应: {raw_text[:100]}...")
-        return {k: "" for k in JSON_SCHEMA["properties"]}
\ No newline at end of file
+    raw_text = await client.vision(page, CONTRACT_PROMPT, JSON_SCHEMA)
+    with get_metrics().timer("parse"):
+        try:
+            return normalize_contract_result(json.loads(raw_text))
+        except json.JSONDecodeError:
+            logger.warning(f"非JSON响应: {raw_text[:100]}...")
+            return {k: "" for k in JSON_SCHEMA["properties"]}
+
+
+async def _analyze_text_page(page: TextPage, client: AsyncModelClient):
+    """调用纯文本大模型分析单页合同的内嵌文本并返回 JSON 结果。"""
+    from .prompt import CONTRACT_TEXT_PROMPT
+
+    raw_text = await client.text(page.text, CONTRACT_TEXT_PROMPT, JSON_SCHEMA)
+    with get_metrics().timer("parse"):
+        try:
+            return normalize_contract_result(json.loads(raw_text))
+        except json.JSONDecodeError:
+            logger.warning(f"非JSON响应: {raw_text[:100]}...")
+            return {k: "" for k in JSON_SCHEMA["properties"]}
+
+
+def normalize_contract_result(data: dict) -> dict:
+    """补齐模型输出中缺失或为 null 的合同字段，非字符串取值（如文本通道返回的数字金额）转为字符串。"""
+    if not isinstance(data, dict):
+        logger.warning(f"模型输出不是 JSON 对象: {str(data)[:100]}...")
+        data = {}
+    for key in JSON_SCHEMA["properties"]:
+        value = data.get(key)
+        if value is None:
+            data[key] = ""
+        elif not isinstance(value, str):
+            data[key] = "，".join(str(v) for v in value) if isinstance(value, list) else str(value)
+    return data
@@ -49,4 +49,16 @@ CONTRACT_PROMPT = (
     '  "total_amount_incl_tax": "",\n'
     '  "related_entities": ""\n'
     "}"
-)
\ No newline at end of file
+)
+
+# 文本层快速通道：输入为 PDF 内嵌文本，印章与签字无法从文本判断，一律留空
+CONTRACT_TEXT_PROMPT = (
+    "你是合同审核专家，以下是合同某一页从 PDF 中直接提取的文本（非图像）。请严格遵守以下规则：\n"
+    "1. 仅依据文本内容提取，不要推测；\n"
+    "2. 若某项内容在文本中不存在，请留空字符串 ''；\n"
+    "3. seal_party_a、seal_party_b、sign_party_a、sign_party_b 无法从文本判断，一律留空；\n"
+    "4. 日期格式统一为 YYYY-MM-DD；\n"
+    "5. 关联主体如有多个，用中文逗号分隔；\n"
+    "6. 所有字段取值均为字符串，金额、数量等数字也按原文写成字符串（如 \"12,000.00元\"）。\n\n"
+    + CONTRACT_PROMPT[CONTRACT_PROMPT.index("需提取的字段如下"):]
+)
@@ -1,13 +1,15 @@
 # contract_checker/validator.py
 import json
-import pandas as pd
 from pathlib import Path
 from common.config import Config
+from common.excel_writer import StreamingWorkbook
 from common.logger import setup_logger
+from common.metrics import timed
 
 logger = setup_logger("ContractValidator")
 
 
+@timed("validate")
 def validate_contract(page_results: list, pdf_path: str) -> dict:
     """
     步骤：
@@ -23,6 +25,11 @@ def validate_contract(page_results: list, pdf_path: str) -> dict:
         json.dump(page_results, f, ensure_ascii=False, indent=2)
     logger.info(f"合同原始结果已保存至: {raw_path}")
 
+    return build_contract_report(page_results)
+
+
+def build_contract_report(page_results: list) -> dict:
+    """由逐页识别结果生成合同报告（跨页合并 + 合规判断），不写任何文件。"""
     # === 2. 合并字段：取第一个非空值 ===
     merged = {}
     fields = [
@@ -55,11 +62,18 @@ def validate_contract(page_results: list, pdf_path: str) -> dict:
     warnings = []
     issues_detail = []
 
-    def add_issue(level, msg):
+    def add_issue(level, msg, page=None):
         item = {"Type": level.upper(), "Message": msg}
+        if page is not None:
+            item["Page"] = page
         issues_detail.append(item)
         (errors if level == "error" else warnings).append(msg)
 
+    # 规则 0: 模型调用失败的页面没有结果，缺失类判定可能是误报
+    for page_res in page_results:
+        for issue in contract_page_issues(page_res):
+            add_issue(issue["Type"].lower(), issue["Message"], issue["Page"])
+
     # 规则 1: 必须有合同名称
     if not merged["contract_name"]:
         add_issue("error", "【合同名称】未识别到合同名称")
@@ -116,33 +130,39 @@ def validate_contract(page_results: list, pdf_path: str) -> dict:
     }
 
 
+def contract_page_issues(page_res: dict) -> list:
+    """单页即可确定的合同问题；其余规则基于跨页合并后的字段，需等全部页面完成。"""
+    if not page_res.get("error"):
+        return []
+    return [{"Page": page_res["page"], "Type": "ERROR",
+             "Message": f"【调用失败】第 {page_res['page']} 页模型调用失败（重试后仍未成功），该页结果缺失，判定可能不准确"}]
+
+
+def contract_sheets(report: dict) -> list:
+    """合同报告的三张工作表：[(表名, 列名, 行迭代器), ...]，按需逐行生成。"""
+    def raw_rows():
+        for page_res in report["raw_data"]:
+            for key, value in page_res["result"].items():
+                yield {"Page": page_res["page"], "Field": key, "Value": str(value) if value is not None else ""}
+
+    def merged_rows():
+        for k, v in report["summary"]["merged_contract"].items():
+            yield {"Field": k, "Value": str(v) if v is not None else ""}
+
+    # 文档级问题（缺失字段、跨页规则等）无页码，Page 列留空
+    issues = report["issues_detail"] or [{"Page": "", "Type": "INFO", "Message": "无问题"}]
+    return [
+        ("原始页数据", ("Page", "Field", "Value"), raw_rows()),
+        ("合并后合同信息", ("Field", "Value"), merged_rows()),
+        ("最终判定结果", ("Page", "Type", "Message"), iter(issues)),
+    ]
+
+
+@timed("export")
 def export_to_excel(report: dict, output_path: str):
-    """导出三部分到 Excel"""
-    output_p = Path(output_path)
-    output_p.parent.mkdir(parents=True, exist_ok=True)
-
-    # Sheet 1: 原始每页数据
-    raw_rows = []
-    for page_res in report["raw_data"]:
-        page = page_res["page"]
-        res = page_res["result"]
-        for key, value in res.items():
-            raw_rows.append({"Page": page, "Field": key, "Value": str(value) if value is not None else ""})
-    df_raw = pd.DataFrame(raw_rows)
-
-    # Sheet 2: 合并后的完整合同
-    merged = report["summary"]["merged_contract"]
-    merged_rows = [{"Field": k, "Value": str(v) if v is not None else ""} for k, v in merged.items()]
-    df_merged = pd.DataFrame(merged_rows)
-
-    # Sheet 3: 判定结果
-    issues = report["issues_detail"]
-    df_issues = pd.DataFrame(issues) if issues else pd.DataFrame([{"Type": "INFO", "Message": "无问题"}])
-
-    # 写入
-    with pd.ExcelWriter(output_p, engine='openpyxl') as writer:
-        df_raw.to_excel(writer, sheet_name="原始页数据", index=False)
-        df_merged.to_excel(writer, sheet_name="合并后合同信息", index=False)
-        df_issues.to_excel(writer, sheet_name="最终判定结果", index=False)
-
-    logger.info(f"完整合同审核报告已导出至: {output_path}")
\ No newline at end of file
+    """导出三部分到 Excel（流式写入，不经过 pandas）"""
+    with StreamingWorkbook(output_path) as wb:
+        for name, columns, rows in contract_sheets(report):
+            wb.write_rows(name, columns, rows)
+
+    logger.info(f"完整合同审核报告已导出至: {output_path}")
@@ -2,120 +2,274 @@
 import sys
 import os
 import argparse
+import asyncio
+import importlib.util
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.resolve()))
 
 from common.logger import setup_logger
-from seal_detector import detect_seal_compliance
-from contract_checker import check_contract_compliance
-from contract_checker.validator import validate_contract, export_to_excel
-from seal_detector.exporter import export_seal_to_excel
+from common.audit_index import AuditIndex, file_sha256
 from common.config import Config
+from common.file_discovery import discover_pdfs
+from common.metrics import get_metrics
+from common.response_cache import get_response_cache
+from common.run_ledger import get_run_ledger, legacy_usage
 
 logger = setup_logger("AuditMain")
 
-USAGE_FILE = Path(__file__).parent / "usage_count.json"
-
-
-def load_usage():
-    if USAGE_FILE.exists():
-        try:
-            with open(USAGE_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {"seal": 0, "contract": 0}
-
-
-def save_usage(data):
-    try:
-        with open(USAGE_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        logger.warning(f"无法保存使用统计: {e}")
-
-
-def increment_and_save(feature: str):
-    usage = load_usage()
-    usage[feature] = usage.get(feature, 0) + 1
-    save_usage(usage)
-
 
 def show_usage():
-    usage = load_usage()
+    """基于审核台账的聚合统计：功能累计次数、按模式、按天、按问题类别。
+
+    仅读取统计：台账尚不存在时不创建，只显示旧版 usage_count.json 中的计数。
+    """
+    ledger = get_run_ledger() if Path(Config.LEDGER_PATH).exists() else None
+    usage = ledger.feature_totals() if ledger else legacy_usage() or {"seal": 0, "contract": 0}
     print("功能调用统计:")
     print(f"   盖章识别（--seal）   : {usage['seal']}")
     print(f"   合同审核（--contract）: {usage['contract']}")
     print(f"   总计               : {usage['seal'] + usage['contract']}")
+    if ledger is None:
+        return
 
+    modes = ledger.by_mode()
+    if modes:
+        print("\n按模式（文档 / 通过 / 不通过 / 失败 / 页数 / API 调用 / 缓存命中 / token / 重试 / 限流 / 平均耗时）:")
+        for m in modes:
+            tokens = (m["input_tokens"] or 0) + (m["output_tokens"] or 0)
+            print(f"   {m['mode']:<9}: {m['documents']} / {m['pass']} / {m['fail']} / {m['error']} / "
+                  f"{m['pages']} / {m['api_calls']} / {m['cache_hits']} / {tokens} / "
+                  f"{m['retries']} / {m['throttled']} / {m['avg_duration_s']:.1f}s")
+
+    days = ledger.by_day()
+    if days:
+        print("\n按天（文档 / 不通过 / 失败 / 页数 / API 调用 / token）:")
+        for d in days:
+            print(f"   {d['day']}: {d['documents']} / {d['fail']} / {d['error']} / "
+                  f"{d['pages']} / {d['api_calls']} / {d['tokens']}")
+
+    issue_types = ledger.by_error_type()
+    if issue_types:
+        print("\n按问题类别（出现次数）:")
+        for t in issue_types:
+            print(f"   [{t['level']}] {t['category']}: {t['count']}")
+
+
+# 仅对单一模式生效的选项：dest -> (命令行选项, 适用模式)；合并模式（默认）不支持
+MODE_ONLY_FLAGS = {
+    "seal_triage": ("--seal-triage", "seal"),
+    "seal_crop": ("--seal-crop", "seal"),
+    "early_stop": ("--early-stop", "contract"),
+    "text_fast_path": ("--text-fast-path", "contract"),
+}
+
+MODE_TITLES = {
+    "seal": "【盖章合规性核验】（功能2）",
+    "contract": "【合同合规性核验】（功能6）",
+    "combined": "【盖章合规性核验 + 合同合规性核验】（功能2+6，单次遍历）",
+}
+EXCEL_MODES = ("per-document", "consolidated", "both")
+MODE_FAILURES = {"seal": "盖章识别失败", "contract": "合同审核失败", "combined": "合并审核失败"}
+
+
+def audit_document(pdf_path: str, mode: str, export_excel: bool = True) -> dict:
+    """对单个文件执行指定模式的审核并导出结果，返回结论摘要（供批量汇总与增量索引）。"""
+    # 延迟导入：--count / --help / 参数校验不加载 openpyxl、dashscope、pdf2image 等重依赖
+    from audit_service.pipeline import aaudit_document
+
+    return asyncio.run(aaudit_document(pdf_path, mode, export_excel=export_excel))["outcome"]
+
+
+def _audit_safely(pdf_path: str, mode: str, export_excel: bool = True) -> dict:
+    """audit_document 的容错包装：单个文件失败不影响其余文件。"""
+    try:
+        return audit_document(pdf_path, mode, export_excel)
+    except Exception as e:
+        logger.error(f"{MODE_FAILURES[mode]} ({pdf_path}): {e}")
+        return {"file": pdf_path, "mode": mode, "status": "error", "message": str(e)}
 
-def run_seal(pdf_paths: list):
+
+def run_mode(pdf_paths: list, mode: str, export_excel: bool = True) -> list:
+    """按顺序逐个审核文件。"""
     total = len(pdf_paths)
+    outcomes = []
     for idx, pdf_path in enumerate(pdf_paths, 1):
         logger.info(f"处理第 {idx}/{total} 个文件: {Path(pdf_path).name}")
-        logger.info("正在执行【盖章合规性核验】（功能2）...")
-        try:
-            report = detect_seal_compliance(pdf_path)
-            errors = report.get("errors", [])
-            warnings = report.get("warnings", [])
-
-            if errors:
-                logger.error("❌ 盖章核验不通过，发现以下严重问题：")
-                for err in errors:
-                    logger.error(f"   • {err}")
-            if warnings:
-                logger.warning("⚠️ 盖章核验发现以下注意项：")
-                for warn in warnings:
-                    logger.warning(f"   • {warn}")
-            if not errors and not warnings:
-                logger.info("✅ 盖章合规性核验通过：所有签章符合要求.")
-
-            # 导出 Excel：与 _seal_raw.json 同目录同名（仅扩展名不同）
-            pdf_stem = Path(pdf_path).stem
-            excel_path = Config.OUTPUT_DIR / f"{pdf_stem}_seal.xlsx"
-            export_seal_to_excel(report, str(excel_path))
-            logger.info(f"盖章结果已导出至: {excel_path}")
-
-            increment_and_save("seal")
-        except Exception as e:
-            logger.error(f"盖章识别失败 ({pdf_path}): {e}")
-            continue
+        logger.info(f"正在执行{MODE_TITLES[mode]}...")
+        outcomes.append(_audit_safely(pdf_path, mode, export_excel))
+    return outcomes
+
+
+def run_seal(pdf_paths: list):
+    return run_mode(pdf_paths, "seal")
 
 
 def run_contract(pdf_paths: list):
-    total = len(pdf_paths)
-    for idx, pdf_path in enumerate(pdf_paths, 1):
-        logger.info(f"处理第 {idx}/{total} 个文件: {Path(pdf_path).name}")
-        logger.info("正在执行【合同合规性核验】（功能6）...")
-        try:
-            page_results = check_contract_compliance(pdf_path)
-            report = validate_contract(page_results, pdf_path)
-            errors = report.get("errors", [])
-            warnings = report.get("warnings", [])
-
-            if errors:
-                logger.error("❌ 合同审核不通过，发现以下严重问题：")
-                for err in errors:
-                    logger.error(f"   • {err}")
-            if warnings:
-                logger.warning("⚠️ 合同审核发现以下注意项：")
-                for warn in warnings:
-                    logger.warning(f"   • {warn}")
-            if not errors and not warnings:
-                logger.info("✅ 合同合规性核验通过：所有审核项符合要求.")
-
-            # 导出 Excel：与 _raw.json 同目录同名（仅扩展名不同）
-            pdf_stem = Path(pdf_path).stem
-            excel_path = Config.OUTPUT_DIR / f"{pdf_stem}.xlsx"
-            export_to_excel(report, str(excel_path))
-            logger.info(f"合同结果已导出至: {excel_path}")
-
-            increment_and_save("contract")
-        except Exception as e:
-            logger.error(f"合同审核失败 ({pdf_path}): {e}")
-            continue
+    return run_mode(pdf_paths, "contract")
+
+
+def run_combined(pdf_paths: list):
+    """默认模式：每页只光栅化一次、调用一次模型，再拆分为盖章与合同两份报告。"""
+    return run_mode(pdf_paths, "combined")
+
+
+def _batch_worker(pdf_path: str, mode: str, export_excel: bool) -> tuple:
+    """进程池任务：返回 (结论摘要, 本文档的指标样本)，由主进程汇总指标。"""
+    logger.info(f"[pid {os.getpid()}] 正在执行{MODE_TITLES[mode]}: {Path(pdf_path).name}")
+    metrics = get_metrics()
+    metrics.reset()
+    outcome = _audit_safely(pdf_path, mode, export_excel)
+    return outcome, metrics.export()
+
+
+def run_batch(pdf_paths: list, mode: str, jobs: int = 1, incremental: bool = True, excel_mode: str = None) -> list:
+    """批量审核：增量跳过内容、模式与模型均未变化且输出仍在的文件，其余文件按文档级进程池并行处理。
+
+    excel_mode（默认 Config.EXCEL_MODE）：per-document 每个文档一个工作簿；consolidated 整批一个
+    合并工作簿；both 两者都生成。
+    """
+    excel_mode = excel_mode or Config.EXCEL_MODE
+    per_document_excel = excel_mode != "consolidated"
+    index = AuditIndex() if incremental else None
+    outcomes = []
+    todo = []
+    for pdf_path in pdf_paths:
+        content_hash = file_sha256(pdf_path)
+        previous = index.lookup(pdf_path, content_hash, mode) if index else None
+        if previous:
+            outcomes.append({**previous, "skipped": True})
+        else:
+            todo.append((pdf_path, content_hash))
+
+    stems = [Path(p).stem for p, _ in todo]
+    for stem in sorted({s for s in stems if stems.count(s) > 1}):
+        logger.warning(f"多个待审核文件同名（{stem}.pdf），输出文件将相互覆盖")
+    logger.info(f"批量审核：共 {len(pdf_paths)} 个文件，{len(outcomes)} 个已是最新（跳过），待处理 {len(todo)} 个")
+
+    hashes = dict(todo)
+    done = []
+    if jobs > 1 and len(todo) > 1:
+        # 限流配额为整个账号共享，按进程数均分
+        snapshot = Config.snapshot()
+        snapshot["RATE_LIMIT_QPS"] = Config.RATE_LIMIT_QPS / jobs
+        snapshot["RATE_LIMIT_TPM"] = Config.RATE_LIMIT_TPM / jobs
+        with ProcessPoolExecutor(max_workers=jobs, initializer=Config.apply, initargs=(snapshot,)) as pool:
+            futures = [pool.submit(_batch_worker, pdf_path, mode, per_document_excel) for pdf_path, _ in todo]
+            for idx, future in enumerate(as_completed(futures), 1):
+                outcome, worker_metrics = future.result()
+                get_metrics().merge(worker_metrics)
+                logger.info(f"已完成 {idx}/{len(todo)}: {Path(outcome['file']).name}（{outcome['status']}）")
+                done.append(outcome)
+    else:
+        done = run_mode([p for p, _ in todo], mode, per_document_excel)
+
+    for outcome in done:
+        if index and outcome["status"] != "error":
+            index.record(hashes[outcome["file"]], mode, outcome)
+    if index:
+        index.close()
+
+    outcomes += done
+    outcomes.sort(key=lambda o: o["file"])
+    if Config.BATCH_RULES and mode in ("contract", "combined"):
+        apply_batch_rules(outcomes)
+    workbook_path = write_batch_workbook(outcomes, mode) if excel_mode != "per-document" else None
+    write_batch_summary(outcomes, mode, workbook_path)
+    return outcomes
+
+
+def _merged_contract(outcome: dict) -> dict:
+    """文档的合并合同字段；旧版索引记录中没有时由逐页原始结果重建。"""
+    if "contract" in outcome:
+        return outcome["contract"]
+    from audit_service.workbook import raw_result_path
+    from contract_checker.validator import build_contract_report
+
+    try:
+        with open(raw_result_path(outcome, "contract"), "r", encoding="utf-8") as f:
+            return build_contract_report(json.load(f))["summary"]["merged_contract"]
+    except (OSError, ValueError) as e:
+        logger.warning(f"无法读取 {outcome['file']} 的原始结果，跨文档校验中缺少该文档: {e}")
+        return {}
+
+
+def apply_batch_rules(outcomes: list):
+    """对整批合同运行跨文档规则（合同编号重复、乙方账号不一致等），问题计入各文档的错误/警告数与结论。
+
+    增量跳过的文档同样参与比对；跨文档问题不写入增量索引，每次批量运行时重新计算。
+    """
+    from contract_checker.batch_rules import run_batch_rules
+
+    audited = [o for o in outcomes if o["status"] != "error"]
+    table = [{**_merged_contract(o), "file": o["file"]} for o in audited]
+    issues = run_batch_rules(table)
+    for i, items in sorted(issues.items()):
+        outcome = audited[i]
+        outcome["batch_issues"] = items
+        outcome["errors"] += sum(1 for item in items if item["Type"] == "ERROR")
+        outcome["warnings"] += sum(1 for item in items if item["Type"] == "WARNING")
+        outcome["status"] = "fail" if outcome["errors"] else "pass"
+        logger.warning(f"跨文档校验 {Path(outcome['file']).name}：")
+        for item in items:
+            (logger.error if item["Type"] == "ERROR" else logger.warning)(f"   • {item['Message']}")
+    logger.info(f"跨文档校验：{len(table)} 份合同中 {len(issues)} 份触发 "
+                f"{sum(len(items) for items in issues.values())} 条问题")
+
+
+def write_batch_workbook(outcomes: list, mode: str) -> Path:
+    """将整批文档的原始、合并与判定结果逐个追加到一个合并工作簿（首列为文档名）。"""
+    from audit_service.workbook import BatchWorkbook
+
+    Config.init_dirs()
+    workbook = BatchWorkbook(Config.OUTPUT_DIR / f"batch_{mode}_{time.strftime('%Y%m%d_%H%M%S')}.xlsx")
+    for outcome in outcomes:
+        workbook.add(outcome)
+    workbook.save()
+    return workbook.path
+
+
+def write_batch_summary(outcomes: list, mode: str, workbook_path: Path = None):
+    """输出整批汇总（通过/不通过/失败/跳过），并写入 OUTPUT_DIR 下的 JSON 汇总文件。"""
+    counts = {status: sum(1 for o in outcomes if o["status"] == status) for status in ("pass", "fail", "error")}
+    skipped = sum(1 for o in outcomes if o.get("skipped"))
+
+    # 汇总只写日志（stderr）：--stream-jsonl - 时标准输出只包含事件行
+    logger.info("========== 批量审核汇总 ==========")
+    logger.info(f"文件总数: {len(outcomes)}（其中 {skipped} 个沿用上次结果）")
+    logger.info(f"✅ 通过: {counts['pass']}   ❌ 不通过: {counts['fail']}   ⚠️ 处理失败: {counts['error']}")
+    requests = {k: sum(o.get("requests", {}).get(k, 0) for o in outcomes if not o.get("skipped"))
+                for k in ("retries", "throttled", "failed_pages")}
+    if any(requests.values()):
+        logger.info(f"模型请求重试 {requests['retries']} 次，被限流 {requests['throttled']} 次，"
+                    f"重试后仍失败 {requests['failed_pages']} 页")
+    for o in outcomes:
+        if o["status"] == "fail":
+            logger.error(f"   不通过: {o['file']}（{o['errors']} 个严重问题）")
+        elif o["status"] == "error":
+            logger.error(f"   处理失败: {o['file']}（{o.get('message', '')}）")
+
+    Config.init_dirs()
+    summary_path = Config.OUTPUT_DIR / f"batch_summary_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump({"mode": mode, "counts": {**counts, "skipped": skipped},
+                   "requests": requests, "workbook": str(workbook_path) if workbook_path else None,
+                   "files": outcomes},
+                  f, ensure_ascii=False, indent=2)
+    logger.info(f"批量汇总已保存至: {summary_path}")
+
+
+def write_run_metrics(mode: str, batch_mode: bool):
+    """输出分阶段 p50/p95 汇总，并写出本次运行的 JSON 与 Prometheus 指标文件。"""
+    metrics = get_metrics()
+    metrics.log_summary()
+    if not Config.METRICS_ENABLED:
+        return
+    json_path, prom_path = metrics.write({"mode": mode, "batch": batch_mode, "model": Config.MODEL})
+    logger.info(f"运行指标已保存至: {json_path}（Prometheus: {prom_path}）")
 
 
 def main():
@@ -125,6 +279,8 @@ def main():
                "  python main.py doc1.pdf doc2.pdf              # 同时运行功能2+6\n"
                "  python main.py --seal doc1.pdf doc2.pdf       # 仅执行盖章识别\n"
                "  python main.py --contract doc1.pdf            # 仅执行合同审核\n"
+               "  python main.py --contract --dir archive/ --jobs 4  # 递归审核整个目录（增量跳过已审核文件）\n"
+               "  python main.py --serve --port 8765            # 启动常驻审核服务\n"
                "  python main.py --count                        # 查看功能调用统计",
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
@@ -133,6 +289,85 @@ def main():
     group.add_argument("--seal", action="store_true", help="仅执行盖章识别（功能2）")
     group.add_argument("--contract", action="store_true", help="仅执行合同核验（功能6）")
     group.add_argument("--count", action="store_true", help="显示功能调用统计")
+    group.add_argument("--serve", action="store_true", help="以常驻 HTTP 服务方式运行（任务队列 + 状态/结果接口）")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"逐页模型调用的并发数（默认 {Config.MAX_WORKERS}，可用环境变量 AUDIT_MAX_WORKERS 设置）")
+    parser.add_argument("--batch-pages", type=int, default=None, metavar="K",
+                        help="每次模型调用携带的页数（默认 1 即逐页调用；作用于本次运行的模式，--serve 时作用于所有模式；"
+                             "也可用 AUDIT_SEAL_BATCH_PAGES / AUDIT_CONTRACT_BATCH_PAGES / AUDIT_COMBINED_BATCH_PAGES 分别设置）")
+    parser.add_argument("--page-dedup", action="store_true",
+                        help="批次内近似重复页复用：与已分析的纯文字页（无印章、签字与合同字段值）感知哈希相近的页面沿用其结果；"
+                             "文本层含签章字样的签署页与有候选印章的页面不参与（无文本层的扫描签署页无法据此排除）")
+    parser.add_argument("--dedup-distance", type=int, default=None, metavar="N",
+                        help=f"近似重复判定的感知哈希汉明距离上限（共 256 位，默认 {Config.PAGE_DEDUP_DISTANCE}）")
+    parser.add_argument("--text-fast-path", action="store_true",
+                        help="仅 --contract 模式：原生电子页面（含完整文本层且非签章页）改用纯文本模型提取")
+    parser.add_argument("--early-stop", action="store_true",
+                        help="仅 --contract 模式：按首页→签署页→其余页顺序提取，合同名称、编号、甲乙方、双方印章与含税总金额齐全后提前结束")
+    parser.add_argument("--seal-triage", action="store_true",
+                        help="仅 --seal 模式：本地印章预筛（红色及蓝、紫等彩色印泥），无候选印章的页面跳过模型调用；"
+                             "全文无印章时复核全部跳过页，否则只复核文本层含签章字样的跳过页"
+                             "（扫描页无法据此复核，可能漏报个别页缺章；黑色印章无法按颜色检出，含黑章的文档请勿启用）")
+    parser.add_argument("--seal-triage-threshold", type=float, default=None,
+                        help=f"候选印章区域印泥像素占页面面积的最小比例（默认 {Config.SEAL_TRIAGE_THRESHOLD}）")
+    parser.add_argument("--seal-triage-debug", metavar="DIR", default=None,
+                        help="将每页候选印章区域标注图与 JSON 输出到该目录")
+    parser.add_argument("--seal-crop", action="store_true",
+                        help="仅 --seal 模式：每页只上传整页缩略图与候选印章区域的高 DPI 裁剪图（逐页请求）")
+    parser.add_argument("--seal-crop-dpi", type=int, default=None,
+                        help=f"印章裁剪区域的渲染 DPI（默认 {Config.SEAL_CROP_DPI}）")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument("--no-cache", action="store_true", help="不使用模型响应缓存")
+    cache_group.add_argument("--refresh-cache", action="store_true",
+                             help="忽略已有缓存重新调用模型，并用新结果刷新缓存")
+    limit_group = parser.add_argument_group("请求调度（限流、重试与熔断）")
+    limit_group.add_argument("--qps", type=float, default=None,
+                             help="每秒模型请求数上限，与账号配额一致（默认不限，可用 AUDIT_RATE_LIMIT_QPS 设置）")
+    limit_group.add_argument("--tpm", type=float, default=None,
+                             help="每分钟 token 数上限，与账号配额一致（默认不限，可用 AUDIT_RATE_LIMIT_TPM 设置）")
+    limit_group.add_argument("--max-retries", type=int, default=None,
+                             help=f"限流（429）、5xx 与网络错误的最大重试次数（默认 {Config.MAX_RETRIES}）")
+    parser.add_argument("--resume", action="store_true",
+                        help="续跑中断的审核：沿用页面日志中已完成的页面，只光栅化、分析缺少的页面")
+    parser.add_argument("--no-metrics", action="store_true", help="不写出运行指标文件（仍输出分阶段耗时汇总）")
+    parser.add_argument("--metrics-dir", metavar="DIR", default=None,
+                        help="运行指标（JSON 与 Prometheus textfile）输出目录（默认 output/metrics）")
+    parser.add_argument("--result-sink", action="append", choices=("jsonl", "parquet"), default=None,
+                        help="将逐页与文档级结果追加到按日期/模式分区的分析数据集（可重复指定；parquet 需要 pyarrow）")
+    parser.add_argument("--stream-jsonl", metavar="FILE", default=None,
+                        help="每页结果、问题与提前结论（出现严重问题即判定不通过）一完成即以 JSON Lines 追加到该文件（- 为标准输出）")
+    parser.add_argument("--result-dir", metavar="DIR", default=None,
+                        help="分析数据集根目录（默认 output/results）")
+    batch_group = parser.add_argument_group("批量模式（任一输入参数即启用；可重复指定）")
+    batch_group.add_argument("--dir", action="append", default=[], metavar="DIR",
+                             help="递归查找目录下所有 PDF")
+    batch_group.add_argument("--glob", action="append", default=[], metavar="PATTERN",
+                             help="按 glob 模式匹配 PDF（支持 **）")
+    batch_group.add_argument("--manifest", action="append", default=[], metavar="FILE",
+                             help="清单文件，每行一个 PDF 路径（# 开头为注释）")
+    batch_group.add_argument("--jobs", type=int, default=1,
+                             help="文档级并行进程数（每个进程内仍按 --workers 并发调用模型）")
+    batch_group.add_argument("--force", action="store_true",
+                             help="忽略增量索引，重新审核所有文件")
+    batch_group.add_argument("--no-batch-rules", action="store_true",
+                             help="不运行跨文档规则（合同编号重复、同一乙方银行账号不一致、疑似重复合同等）")
+    batch_group.add_argument("--excel-mode", choices=EXCEL_MODES, default=None,
+                             help="Excel 输出：per-document 每文档一个工作簿；consolidated 整批一个合并工作簿"
+                                  f"（含文档列）；both 两者都生成（默认 {Config.EXCEL_MODE}）")
+    serve_group = parser.add_argument_group("服务模式（--serve）")
+    serve_group.add_argument("--host", default="127.0.0.1", help="监听地址（默认 127.0.0.1）")
+    serve_group.add_argument("--port", type=int, default=8765, help="监听端口（默认 8765）")
+    serve_group.add_argument("--serve-workers", type=int, default=None,
+                             help=f"同时处理的任务数（默认 {Config.SERVE_WORKERS}）")
+    encode_group = parser.add_argument_group("页面编码（上传体积与识别精度的权衡）")
+    encode_group.add_argument("--image-format", choices=["png", "jpeg", "webp"], default=None,
+                              help=f"页面上传格式（默认 {Config.IMAGE_FORMAT}）")
+    encode_group.add_argument("--image-quality", type=int, default=None,
+                              help=f"JPEG/WebP 质量 1-100（默认 {Config.IMAGE_QUALITY}）")
+    encode_group.add_argument("--max-pixels", type=int, default=None,
+                              help="单页像素预算，超出则等比缩小（0 表示不缩放）")
+    encode_group.add_argument("--grayscale-contract", action="store_true",
+                              help="仅执行合同审核时将页面转为灰度上传")
 
     args = parser.parse_args()
 
@@ -140,12 +375,98 @@ def main():
         show_usage()
         return
 
-    if not args.pdf_paths:
-        parser.error("the following arguments are required: pdf_paths (unless using --count)")
-
-    if not os.getenv("DASHSCOPE_API_KEY"):
-        logger.error("请设置环境变量 DASHSCOPE_API_KEY")
-        sys.exit(1)
+    batch_mode = bool(args.dir or args.glob or args.manifest)
+    if not args.pdf_paths and not batch_mode and not args.serve:
+        parser.error("the following arguments are required: pdf_paths (unless using --count or --dir/--glob/--manifest)")
+    if args.jobs < 1:
+        parser.error("--jobs 必须为正整数")
+    mode = "seal" if args.seal else "contract" if args.contract else "combined"
+    for dest, (flag, flag_mode) in MODE_ONLY_FLAGS.items():
+        if not getattr(args, dest) or mode == flag_mode:
+            continue
+        if not args.serve:
+            parser.error(f"{flag} 仅适用于 --{flag_mode} 模式（当前为 {mode} 模式，该选项不会生效）")
+        logger.warning(f"{flag} 仅对 mode={flag_mode} 的任务生效，其他模式的任务忽略该选项")
+
+    if args.workers is not None:
+        if args.workers < 1:
+            parser.error("--workers 必须为正整数")
+        Config.MAX_WORKERS = args.workers
+    if args.batch_pages is not None:
+        if args.batch_pages < 1:
+            parser.error("--batch-pages 必须为正整数")
+        batch_modes = ("seal", "contract", "combined") if args.serve else \
+            ("seal",) if args.seal else ("contract",) if args.contract else ("combined",)
+        for m in batch_modes:
+            setattr(Config, f"{m.upper()}_BATCH_PAGES", args.batch_pages)
+    if args.page_dedup:
+        Config.PAGE_DEDUP = True
+    if args.dedup_distance is not None:
+        if args.dedup_distance < 0:
+            parser.error("--dedup-distance 不能为负数")
+        Config.PAGE_DEDUP_DISTANCE = args.dedup_distance
+    if args.image_format:
+        Config.IMAGE_FORMAT = args.image_format
+    if args.image_quality is not None:
+        if not 1 <= args.image_quality <= 100:
+            parser.error("--image-quality 取值范围为 1-100")
+        Config.IMAGE_QUALITY = args.image_quality
+    if args.max_pixels is not None:
+        if args.max_pixels < 0:
+            parser.error("--max-pixels 不能为负数")
+        Config.IMAGE_MAX_PIXELS = args.max_pixels
+    if args.grayscale_contract:
+        Config.GRAYSCALE_CONTRACT = True
+    if args.text_fast_path:
+        Config.TEXT_FAST_PATH = True
+    if args.early_stop:
+        Config.EARLY_STOP = True
+    if args.seal_triage:
+        Config.SEAL_TRIAGE = True
+    if args.seal_triage_threshold is not None:
+        Config.SEAL_TRIAGE_THRESHOLD = args.seal_triage_threshold
+    if args.seal_triage_debug:
+        Config.SEAL_TRIAGE_DEBUG_DIR = args.seal_triage_debug
+    if args.seal_crop:
+        Config.SEAL_CROP = True
+    if args.seal_crop_dpi is not None:
+        if args.seal_crop_dpi < 72:
+            parser.error("--seal-crop-dpi 不能低于 72")
+        Config.SEAL_CROP_DPI = args.seal_crop_dpi
+    if args.no_cache:
+        Config.CACHE_ENABLED = False
+    if args.refresh_cache:
+        Config.CACHE_REFRESH = True
+    if args.qps is not None:
+        if args.qps < 0:
+            parser.error("--qps 不能为负数")
+        Config.RATE_LIMIT_QPS = args.qps
+    if args.tpm is not None:
+        if args.tpm < 0:
+            parser.error("--tpm 不能为负数")
+        Config.RATE_LIMIT_TPM = args.tpm
+    if args.max_retries is not None:
+        if args.max_retries < 0:
+            parser.error("--max-retries 不能为负数")
+        Config.MAX_RETRIES = args.max_retries
+    if args.resume:
+        if not Config.JOURNAL_ENABLED:
+            parser.error("--resume 需要页面日志（请勿设置 AUDIT_JOURNAL=0）")
+        Config.RESUME = True
+    if args.no_batch_rules:
+        Config.BATCH_RULES = False
+    if args.no_metrics:
+        Config.METRICS_ENABLED = False
+    if args.metrics_dir:
+        Config.METRICS_DIR = Path(args.metrics_dir)
+    if args.result_sink:
+        Config.RESULT_SINKS = list(dict.fromkeys(args.result_sink))
+    if args.stream_jsonl:
+        Config.STREAM_JSONL = args.stream_jsonl
+    if args.result_dir:
+        Config.RESULT_DIR = Path(args.result_dir)
+    if "parquet" in Config.RESULT_SINKS and importlib.util.find_spec("pyarrow") is None:
+        parser.error("--result-sink parquet 需要安装 pyarrow（pip install pyarrow）")
 
     resolved_paths = []
     for p in args.pdf_paths:
@@ -158,15 +479,35 @@ def main():
             sys.exit(1)
         resolved_paths.append(str(pdf_path))
 
-    if args.seal:
-        run_seal(resolved_paths)
-    elif args.contract:
-        run_contract(resolved_paths)
+    try:
+        Config.require_api_key()
+    except EnvironmentError:
+        logger.error("请设置环境变量 DASHSCOPE_API_KEY")
+        sys.exit(1)
+
+    if args.serve:
+        from audit_service.server import serve
+        serve(args.host, args.port, args.serve_workers)
+        return
+
+    # 默认：两者都跑（单次光栅化 + 每页单次模型调用）
+    if batch_mode:
+        discovered = discover_pdfs(args.dir, args.glob, args.manifest)
+        pdf_paths = sorted(set(resolved_paths) | set(discovered))
+        if not pdf_paths:
+            logger.error("未找到任何待审核的 PDF 文件")
+            sys.exit(1)
+        run_batch(pdf_paths, mode, jobs=args.jobs, incremental=not args.force, excel_mode=args.excel_mode)
     else:
-        # 默认：两者都跑
-        run_seal(resolved_paths)
-        print()
-        run_contract(resolved_paths)
+        run_mode(resolved_paths, mode)
+
+    cache = get_response_cache()
+    if cache is not None:
+        logger.info(f"模型响应缓存：命中 {cache.hits} 次，未命中 {cache.misses} 次")
+    if Config.RESULT_SINKS:
+        from common.result_sink import close_result_sinks
+        close_result_sinks()
+    write_run_metrics(mode, batch_mode)
 
 
 if __name__ == "__main__":
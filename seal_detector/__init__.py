@@ -1,2 +1,2 @@
 # seal_detector/__init__.py
-from .detector import detect_seal_compliance
\ No newline at end of file
+from .detector import adetect_seal_compliance, detect_seal_compliance
\ No newline at end of file
@@ -0,0 +1,50 @@
+# seal_detector/crop.py
+import io
+from common.config import Config
+from common.image_encoder import EncodeOptions, encode_image
+from common.pdf_to_images import RenderedPage
+
+
+def seal_regions(candidates: list[dict], padding: float = None) -> list[tuple]:
+    """由印章预筛的候选框生成裁剪区域：每边外扩 padding 倍框宽/框高（印章外圈与周边文字同样重要），
+    裁剪到页面范围内并合并相互重叠的区域，按自上而下、自左而右排序。"""
+    padding = Config.SEAL_CROP_PADDING if padding is None else padding
+    boxes = []
+    for cand in candidates:
+        x0, y0, x1, y1 = cand["bbox"]
+        dx, dy = (x1 - x0) * padding, (y1 - y0) * padding
+        boxes.append([max(0.0, x0 - dx), max(0.0, y0 - dy), min(1.0, x1 + dx), min(1.0, y1 + dy)])
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return sorted((tuple(round(v, 4) for v in box) for box in boxes), key=lambda box: (box[1], box[0]))
+
+
+def make_thumbnail(page: RenderedPage, max_side: int = None) -> RenderedPage:
+    """将整页缩小到最长边 max_side 像素，供模型判断页面是否需要盖章及定位各裁剪区域。"""
+    from PIL import Image
+
+    max_side = max_side or Config.SEAL_CROP_THUMB_PX
+    encode = EncodeOptions.from_config()
+    with Image.open(io.BytesIO(page.data)) as src:
+        img = src.convert("RGB")
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+    return RenderedPage(page=page.page, data=encode_image(img, encode), mime=encode.mime)
+
+
+def region_label(index: int, box: tuple) -> str:
+    """裁剪图前的说明文字：区域序号与其在页面中的位置、大小（百分比）。"""
+    x0, y0, x1, y1 = box
+    return (f"区域 {index} 高清裁剪（位于页面横向 {x0:.0%}–{x1:.0%}、纵向 {y0:.0%}–{y1:.0%}，"
+            f"宽约为页面宽度的 {x1 - x0:.0%}）：")
@@ -1,11 +1,20 @@
 # seal_detector/detector.py
+import asyncio
 import json
+from functools import partial
 from pathlib import Path
-from dashscope import MultiModalConversation
+from common.async_client import AsyncModelClient, client_scope
+from common.concurrency import arun_batches
 from common.config import Config
+from common.image_encoder import format_upload_stats
 from common.logger import setup_logger
-from common.path_validator import is_safe_path
-from common.pdf_to_images import pdf_to_images
+from common.metrics import get_metrics
+from common.page_batch import analyze_pages, with_single_fallback
+from common.page_dedup import get_page_index, page_screen
+from common.page_journal import PageJournal, merge_pages, resume_state
+from common.page_stream import astream, open_stream
+from common.path_validator import is_allowed_path
+from common.pdf_to_images import RenderedPage, iter_pdf_images, page_workspace, render_regions
 
 logger = setup_logger("SealDetector")
 
@@ -31,34 +40,67 @@ SEAL_SCHEMA = {
 }
 
 
-def detect_seal_compliance(pdf_path: str) -> dict:
-    """对 PDF 文档逐页检测印章，并返回完整报告（含原始、汇总、判定）。"""
+def detect_seal_compliance(pdf_path: str, max_workers: int = None, on_event=None) -> dict:
+    """对 PDF 文档逐页检测印章，并返回完整报告（同步入口，adetect_seal_compliance 的薄包装）。"""
+    return asyncio.run(adetect_seal_compliance(pdf_path, concurrency=max_workers, on_event=on_event))
+
+
+def astream_seal_compliance(pdf_path: str, **kwargs):
+    """逐页产出盖章识别事件的异步迭代器（见 common.page_stream.PageStream），最后一个事件为 result（完整报告）。"""
+    return astream(lambda on_event: adetect_seal_compliance(pdf_path, on_event=on_event, **kwargs))
+
+
+async def adetect_seal_compliance(pdf_path: str, concurrency: int = None, client: AsyncModelClient = None,
+                                  journal: PageJournal = None, on_event=None) -> dict:
+    """对 PDF 文档逐页检测印章，并返回完整报告（含原始、汇总、判定）。
+
+    concurrency 限制本文档同时在途的请求数；传入共享的 client 时可在多个文档间复用连接池与总并发上限。
+    Config.SEAL_BATCH_PAGES > 1 时每次请求携带多页（合并响应不合规时逐页重试）。
+    给定 journal 时每页结果写入页面日志，日志中已完成的页面不再光栅化与分析。
+    Config.PAGE_DEDUP 为真时与批次内已分析的纯文字页近似重复的页面沿用其结果。
+    Config.SEAL_CROP 为真时每页只上传缩略图与候选印章区域的高清裁剪图（逐页请求，不做多页合并）。
+    给定 on_event 时每页结果与问题在分析完成后立即回调，出现严重问题即推送提前结论（见 PageStream）。
+    """
     Config.init_dirs()
     pdf_p = Path(pdf_path).resolve()
 
-    if not is_safe_path(Config.ALLOWED_BASE_DIR, str(pdf_p)):
+    if not is_allowed_path(str(pdf_p)):
         raise ValueError("路径不安全")
     if not pdf_p.exists():
         raise FileNotFoundError(f"文件不存在: {pdf_path}")
 
-    image_paths = pdf_to_images(pdf_p, Config.TEMP_DIR)
-    all_pages = []
+    resumed, todo = await resume_state(pdf_p, journal)
+    stream = open_stream(on_event, pdf_path, "seal", seal_page_issues)
+    if stream is not None:
+        stream.pages(resumed, resumed=True)
+    async with client_scope(client, concurrency) as client:
+        worker = partial(_triage_seal_batch if Config.SEAL_TRIAGE else _process_seal_batch, client=client, pdf_p=pdf_p)
+        index = get_page_index()
+        if index is not None:
+            from .triage import no_seal_candidate
+
+            screen = await asyncio.to_thread(page_screen, pdf_p, no_seal_candidate)
+            worker = index.wrap(worker, "seal", pdf_p.name, screen=screen)
+        if journal is not None:
+            worker = journal.wrap(worker)
+        if stream is not None:
+            worker = stream.wrap(worker)
+        with page_workspace() as workspace:
+            fresh = await arun_batches(worker, iter_pdf_images(pdf_p, workspace, pages=todo),
+                                       Config.SEAL_BATCH_PAGES, concurrency)
+            all_pages = merge_pages(resumed, fresh)
+            if Config.SEAL_TRIAGE:
+                all_pages = await _verify_skipped_pages(pdf_p, workspace, all_pages, client, concurrency, journal,
+                                                        stream)
+    logger.info(f"盖章页面上传统计：{format_upload_stats(all_pages)}")
+    report = build_seal_report(all_pages, pdf_path)
+    if stream is not None:
+        stream.finish(report)
+    return report
 
-    for img in image_paths:
-        page_num = int(img.stem.split('_')[-1])
-        try:
-            result = _analyze_seal_page(img)
-            all_pages.append({"page": page_num, "result": result})
-        except Exception as e:
-            logger.error(f"第 {page_num} 页盖章分析失败: {e}")
-            all_pages.append({
-                "page": page_num,
-                "result": {
-                    "requires_seal": False,
-                    "seals": []
-                }
-            })
 
+def build_seal_report(all_pages: list, pdf_path: str) -> dict:
+    """保存逐页原始结果，并据此生成盖章合规报告（含原始、汇总、判定）。"""
     # 保存原始结果
     pdf_stem = Path(pdf_path).stem
     raw_path = Config.OUTPUT_DIR / f"{pdf_stem}_seal_raw.json"
@@ -66,6 +108,11 @@ def detect_seal_compliance(pdf_path: str) -> dict:
         json.dump(all_pages, f, ensure_ascii=False, indent=2)
     logger.info(f"盖章原始结果已保存至: {raw_path}")
 
+    return summarize_seal_pages(all_pages)
+
+
+def summarize_seal_pages(all_pages: list) -> dict:
+    """由逐页印章识别结果生成盖章合规报告，不写任何文件。"""
     # === 全局分析 ===
     errors = []
     warnings = []
@@ -76,37 +123,15 @@ def detect_seal_compliance(pdf_path: str) -> dict:
     page_issues = []
 
     for item in all_pages:
-        page = item["page"]
         res = item["result"]
-        requires = res.get("requires_seal", False)
-        seals = res.get("seals", [])
-
-        if requires:
-            pages_requiring_seal.append(page)
-
-        if seals:
+        if res.get("requires_seal", False):
+            pages_requiring_seal.append(item["page"])
+        if res.get("seals", []):
             any_valid_seal = True
 
-        # 分析每页印章问题
-        for i, seal in enumerate(seals, 1):
-            prefix = f"第 {page} 页印章#{i}"
-            if not seal.get("is_red", True):
-                msg = f"【红章】{prefix} 非红色"
-                errors.append(msg)
-                page_issues.append({"Page": page, "Type": "ERROR", "Message": msg})
-            if not seal.get("is_complete", True):
-                msg = f"【完整性】{prefix} 不完整（被裁剪）"
-                warnings.append(msg)
-                page_issues.append({"Page": page, "Type": "WARNING", "Message": msg})
-            if not seal.get("is_normal_size", True):
-                msg = f"【尺寸】{prefix} 尺寸异常（过小）"
-                warnings.append(msg)
-                page_issues.append({"Page": page, "Type": "WARNING", "Message": msg})
-            text = seal.get("seal_text", "").strip()
-            if text == "（印章模糊）":
-                msg = f"【清晰度】{prefix} 文字无法辨认"
-                warnings.append(msg)
-                page_issues.append({"Page": page, "Type": "WARNING", "Message": msg})
+        for issue in seal_page_issues(item):
+            (errors if issue["Type"] == "ERROR" else warnings).append(issue["Message"])
+            page_issues.append(issue)
 
     # 全局规则
     global_issues = []
@@ -137,42 +162,205 @@ def detect_seal_compliance(pdf_path: str) -> dict:
     }
 
 
-def _analyze_seal_page(image_path: Path) -> dict:
+def seal_page_issues(item: dict) -> list:
+    """单页即可确定的盖章问题（调用失败、非红章、不完整、尺寸异常、文字模糊），与其他页面无关。"""
+    page = item["page"]
+    issues = []
+
+    def add(level, msg):
+        issues.append({"Page": page, "Type": level, "Message": msg})
+
+    if item.get("error"):
+        add("ERROR", f"【调用失败】第 {page} 页模型调用失败（重试后仍未成功），该页结果缺失，判定可能不准确")
+    for i, seal in enumerate(item["result"].get("seals", []), 1):
+        prefix = f"第 {page} 页印章#{i}"
+        if not seal.get("is_red", True):
+            add("ERROR", f"【红章】{prefix} 非红色")
+        if not seal.get("is_complete", True):
+            add("WARNING", f"【完整性】{prefix} 不完整（被裁剪）")
+        if not seal.get("is_normal_size", True):
+            add("WARNING", f"【尺寸】{prefix} 尺寸异常（过小）")
+        if seal.get("seal_text", "").strip() == "（印章模糊）":
+            add("WARNING", f"【清晰度】{prefix} 文字无法辨认")
+    return issues
+
+
+async def _process_seal_page(page: RenderedPage, client: AsyncModelClient, pdf_p: Path = None,
+                             candidates: list = None) -> dict:
+    """分析单页印章并在失败时返回“无需盖章、无印章”的兜底结果；candidates 为预筛已得到的候选印章区域。"""
+    page_num = page.page
+    try:
+        if Config.SEAL_CROP and pdf_p is not None and page.path is None:
+            return await _analyze_seal_crops(page, client, pdf_p, candidates)
+        result = await _analyze_seal_page(page, client)
+        return {"page": page_num, "image_bytes": len(page.data), "result": result}
+    except Exception as e:
+        logger.error(f"第 {page_num} 页盖章分析失败: {e}")
+        get_metrics().incr("failed_pages")
+        return {
+            "page": page_num,
+            "image_bytes": len(page.data),
+            "result": {
+                "requires_seal": False,
+                "seals": []
+            },
+            "error": str(e)
+        }
+
+
+async def _process_seal_batch(pages: list, client: AsyncModelClient, pdf_p: Path = None,
+                              candidates: dict = None) -> list:
+    """一组页面合并为一次请求分析印章；合并响应不合规时逐页分析（限流、熔断等请求错误直接抛出）。
+    裁剪模式下逐页分析，candidates（页码 -> 预筛候选区域）中已有的页面不再重复预筛。"""
+    process_single = partial(_process_seal_page, client=client, pdf_p=pdf_p)
+    if Config.SEAL_CROP and pdf_p is not None:
+        candidates = candidates or {}
+        return list(await asyncio.gather(*(process_single(p, candidates=candidates.get(p.page)) for p in pages)))
+
+    async def analyze(batch):
+        results = await analyze_pages(batch, client, _seal_prompt(), SEAL_SCHEMA)
+        return [{"page": p.page, "image_bytes": len(p.data), "result": normalize_seal_result(results[p.page])}
+                for p in batch]
+
+    return await with_single_fallback(pages, analyze, process_single)
+
+
+async def _find_candidates(page: RenderedPage):
+    """本地印章预筛：返回候选印章区域列表；预筛出错时返回 None（交由模型判断）。"""
+    from .triage import dump_candidates, find_seal_candidates
+
+    try:
+        candidates = await asyncio.to_thread(find_seal_candidates, page.data)
+    except Exception as e:
+        logger.warning(f"第 {page.page} 页印章预筛失败，改为直接调用模型: {e}")
+        return None
+
+    if Config.SEAL_TRIAGE_DEBUG_DIR:
+        await asyncio.to_thread(dump_candidates, page.data, page.page, candidates, Config.SEAL_TRIAGE_DEBUG_DIR)
+    return candidates
+
+
+async def _triage_seal_batch(pages: list, client: AsyncModelClient, pdf_p: Path = None) -> list:
+    """本地印章预筛：无候选印章区域的页面不调用模型，直接记为无印章；其余页面按组分析。"""
+    found = [await _find_candidates(page) for page in pages]
+    todo = [page for page, candidates in zip(pages, found) if candidates != []]
+    by_page = {page.page: candidates for page, candidates in zip(pages, found) if candidates}
+    analyzed = iter(await _process_seal_batch(todo, client, pdf_p, by_page) if todo else [])
+
+    entries = []
+    for page, candidates in zip(pages, found):
+        if candidates is None:
+            entries.append(next(analyzed))
+        elif candidates:
+            entries.append({**next(analyzed), "triage": "candidate"})
+        else:
+            logger.debug(f"第 {page.page} 页未发现候选印章，跳过模型调用")
+            entries.append({
+                "page": page.page,
+                "image_bytes": 0,
+                "triage": "no_candidate",
+                "result": {
+                    "requires_seal": False,
+                    "seals": []
+                }
+            })
+    return entries
+
+
+async def _verify_skipped_pages(pdf_p: Path, workspace: Path, all_pages: list, client: AsyncModelClient,
+                                concurrency: int = None, journal: PageJournal = None, stream=None) -> list:
+    """兜底复核被预筛跳过的页面的 requires_seal，否则“需盖章但缺章”的错误无法触发：
+    全文未检测到任何印章时复核全部被跳过页面；否则只复核文本层含签章字样（见 needs_vision）的页面。
+
+    局限：文档已有印章时，无文本层的扫描页或 pdftotext 不可用时不做复核，
+    这些页面上的“需盖章但缺章”（如缺少一方印章）可能漏报。
+    """
+    from common.text_layer import extract_page_texts, needs_vision
+
+    skipped = [item["page"] for item in all_pages if item.get("triage") == "no_candidate"]
+    logger.info(f"印章预筛：{len(all_pages)} 页中跳过 {len(skipped)} 页模型调用")
+    if not skipped:
+        return all_pages
+
+    if any(item["result"].get("seals") for item in all_pages):
+        texts = await asyncio.to_thread(extract_page_texts, pdf_p)
+        skipped = [n for n in skipped if n <= len(texts) and needs_vision(texts[n - 1])]
+        if not skipped:
+            return all_pages
+        logger.info(f"复核 {len(skipped)} 个含签章字样的被跳过页面的盖章需求...")
+    else:
+        logger.info("全文未检测到印章，复核被跳过页面的盖章需求...")
+    async def recheck(pages):
+        return [{**item, "triage": "rechecked"} for item in await _process_seal_batch(pages, client, pdf_p)]
+
+    worker = journal.wrap(recheck) if journal is not None else recheck
+    if stream is not None:
+        worker = stream.wrap(worker)
+    rechecked = await arun_batches(worker, iter_pdf_images(pdf_p, workspace, pages=skipped),
+                                   Config.SEAL_BATCH_PAGES, concurrency)
+    by_page = {item["page"]: item for item in rechecked}
+    return [by_page.get(item["page"], item) for item in all_pages]
+
+
+async def _analyze_seal_page(page: RenderedPage, client: AsyncModelClient) -> dict:
     """调用多模态大模型分析单页图像中的印章属性（支持多章）。"""
+    raw_text = await client.vision(page, _seal_prompt(), SEAL_SCHEMA)
+    return _parse_seal_response(raw_text)
+
+
+async def _analyze_seal_crops(page: RenderedPage, client: AsyncModelClient, pdf_p: Path,
+                              candidates: list = None) -> dict:
+    """印章裁剪模式：整页缩略图 + 候选印章区域的高 DPI 裁剪图一次请求分析，结果仍为单页 SEAL_SCHEMA 结构。
+
+    candidates 为预筛已得到的候选区域（未给定时在此预筛）。候选区域多于 Config.SEAL_CROP_MAX_REGIONS 时改传整页；
+    无候选区域时只传缩略图（判断盖章需求与非红色印章）。
+    """
+    from .crop import make_thumbnail, region_label, seal_regions
+    from .prompt import SEAL_CROP_PROMPT
+    from .triage import find_seal_candidates
+
+    if candidates is None:
+        candidates = await asyncio.to_thread(find_seal_candidates, page.data)
+    regions = seal_regions(candidates)
+    if len(regions) > Config.SEAL_CROP_MAX_REGIONS:
+        logger.info(f"第 {page.page} 页候选印章区域 {len(regions)} 个，超过上限，改为上传整页")
+        result = await _analyze_seal_page(page, client)
+        return {"page": page.page, "image_bytes": len(page.data), "result": result}
+
+    thumbnail = await asyncio.to_thread(make_thumbnail, page)
+    crops = await asyncio.to_thread(render_regions, pdf_p, page.page, regions, Config.SEAL_CROP_DPI) if regions else []
+    images = [("整页缩略图：", thumbnail)] + [(region_label(i, box), crop)
+                                          for i, (box, crop) in enumerate(zip(regions, crops), start=1)]
+    raw_text = await client.vision_images(images, SEAL_CROP_PROMPT, SEAL_SCHEMA)
+    return {"page": page.page, "image_bytes": sum(len(image.data) for _, image in images),
+            "seal_regions": [list(box) for box in regions], "result": _parse_seal_response(raw_text)}
+
+
+def _parse_seal_response(raw_text: str) -> dict:
+    with get_metrics().timer("parse"):
+        try:
+            return normalize_seal_result(json.loads(raw_text))
+        except json.JSONDecodeError:
+            logger.warning(f"非JSON响应: {raw_text[:100]}...")
+            return {"requires_seal": False, "seals": []}
+
+
+def _seal_prompt() -> str:
     from .prompt import SEAL_PROMPT
 
-    messages = [{
-        "role": "user",
-        "content": [
-            {"image": str(image_path)},
-            {"text": SEAL_PROMPT}
-        ]
-    }]
-
-    response = MultiModalConversation.call(
-        model=Config.MODEL,
-        messages=messages,
-        response_format={"type": "json_object", "schema": SEAL_SCHEMA},
-        temperature=0.01
-    )
-
-    if response.status_code != 200:
-        raise RuntimeError(f"API 错误: {response.code}")
-
-    raw_text = response.output.choices[0].message.content[0]["text"]
-    try:
-        data = json.loads(raw_text)
-        if "requires_seal" not in data:
-            data["requires_seal"] = False
-        if "seals" not in data or not isinstance(data["seals"], list):
-            data["seals"] = []
-        for seal in data["seals"]:
-            for key in ["is_red", "is_complete", "is_normal_size"]:
-                if key not in seal:
-                    seal[key] = True
-            if "seal_text" not in seal:
-                seal["seal_text"] = ""
-        return data
-    except json.JSONDecodeError:
-        logger.warning(f"非JSON响应: {raw_text[:100]}...")
-        return {"requires_seal": False, "seals": []}
\ No newline at end of file
+    return SEAL_PROMPT
+
+
+def normalize_seal_result(data: dict) -> dict:
+    """补齐模型输出中缺失的印章字段，缺省视为合规。"""
+    if "requires_seal" not in data:
+        data["requires_seal"] = False
+    if "seals" not in data or not isinstance(data["seals"], list):
+        data["seals"] = []
+    for seal in data["seals"]:
+        for key in ["is_red", "is_complete", "is_normal_size"]:
+            if key not in seal:
+                seal[key] = True
+        if "seal_text" not in seal:
+            seal["seal_text"] = ""
+    return data
@@ -24,4 +24,31 @@ SEAL_PROMPT = (
     '    }\n'
     '  ]\n'
     "}"
-)
\ No newline at end of file
+)
+# 印章裁剪模式：首张为整页缩略图，其后为本地预筛出的候选印章区域的高清裁剪图
+SEAL_CROP_PROMPT = (
+    "你是印章识别专家。第一张图像为整页缩略图，其后为该页中疑似印章区域的高清裁剪图（可能没有），"
+    "每张裁剪图前标明了其在页面中的位置与大小。请结合缩略图与裁剪图分析该页的所有印章（可能有多个），并按以下规则判断：\n"
+    "1. 若无任何印章，返回空列表 []；同一印章在缩略图与裁剪图中只计一次；\n"
+    "2. 每个印章需判断（以高清裁剪图为准，缩略图中可见但未给出裁剪图的印章按缩略图判断）：\n"
+    "   - 是否红色（is_red）；\n"
+    "   - 是否完整（is_complete），注意裁剪图边缘不代表印章残缺，应以印章本身是否被页面边缘截断、遮挡为准；\n"
+    "   - 尺寸是否正常（is_normal_size），请结合该区域占页面宽度的比例判断；\n"
+    "   - 印章文字（seal_text），无法辨认填「（印章模糊）」；\n"
+    "3. 此外，请根据缩略图判断该页内容是否‘需要盖章’（requires_seal）：\n"
+    "   - 如含‘合同’、‘协议’、‘签字’、‘盖章’等关键词，则 requires_seal = true；\n"
+    "   - 否则为 false。\n\n"
+
+    "请严格按以下 JSON 格式输出，不要任何额外文本：\n"
+    "{\n"
+    '  "requires_seal": false,\n'
+    '  "seals": [\n'
+    '    {\n'
+    '      "is_red": true,\n'
+    '      "is_complete": true,\n'
+    '      "is_normal_size": true,\n'
+    '      "seal_text": "中海油（北京）销售有限公司 合同专用章"\n'
+    '    }\n'
+    '  ]\n'
+    "}"
+)
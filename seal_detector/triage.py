@@ -0,0 +1,118 @@
+# seal_detector/triage.py
+import io
+import json
+import math
+from pathlib import Path
+import numpy as np
+from PIL import Image, ImageDraw
+from common.config import Config
+from common.logger import setup_logger
+
+logger = setup_logger("SealTriage")
+
+# 分析前将页面缩小到的最长边（像素），以及连通域分析的网格单元大小
+_WORK_SIZE = 1000
+_CELL = 6
+
+
+def _ink_masks(img: Image.Image) -> tuple:
+    """向量化印泥掩码，返回 (红色, 其他饱和彩色)。
+
+    红色：红通道足够亮且明显高于绿、蓝通道。其他彩色：最大与最小通道之差不低于 SEAL_TRIAGE_INK_DELTA，
+    覆盖蓝、紫、绿色印章；黑色印章与文字无法按颜色区分，不在其中。
+    """
+    arr = np.asarray(img, dtype=np.int16)
+    r, g, b = arr[..., 0], arr[..., 1], arr[..., 2]
+    red = (r >= 110) & (r - g >= Config.SEAL_TRIAGE_RED_DELTA) & (r - b >= Config.SEAL_TRIAGE_RED_DELTA - 10)
+    spread = arr.max(axis=2) - arr.min(axis=2)
+    return red, (spread >= Config.SEAL_TRIAGE_INK_DELTA) & ~red
+
+
+def _components(active: np.ndarray) -> list[list[tuple]]:
+    """在网格上做 8 邻域连通域标记，返回每个连通域的单元坐标列表。"""
+    seen = np.zeros_like(active, dtype=bool)
+    h, w = active.shape
+    comps = []
+    for y, x in zip(*(idx.tolist() for idx in np.nonzero(active))):
+        if seen[y, x]:
+            continue
+        stack = [(y, x)]
+        seen[y, x] = True
+        comp = []
+        while stack:
+            cy, cx = stack.pop()
+            comp.append((cy, cx))
+            for ny in range(max(cy - 1, 0), min(cy + 2, h)):
+                for nx in range(max(cx - 1, 0), min(cx + 2, w)):
+                    if active[ny, nx] and not seen[ny, nx]:
+                        seen[ny, nx] = True
+                        stack.append((ny, nx))
+        comps.append(comp)
+    return comps
+
+
+def find_seal_candidates(data: bytes, threshold: float = None) -> list[dict]:
+    """在页面图像中查找疑似印章区域（红色及其他饱和彩色，见 _ink_masks）。
+
+    先以颜色掩码找印泥像素，再按网格做连通域分析；印泥像素占页面面积比例不低于
+    threshold 且外接框近似方形（印章多为圆形/椭圆/方形）的区域视为候选。
+    返回的 bbox 为相对页面宽高的比例坐标 (x0, y0, x1, y1)；color 为区域主色（red / other）。
+    """
+    threshold = Config.SEAL_TRIAGE_THRESHOLD if threshold is None else threshold
+    with Image.open(io.BytesIO(data)) as src:
+        img = src.convert("RGB")
+    factor = math.ceil(max(img.size) / _WORK_SIZE)
+    if factor > 1:
+        img = img.reduce(factor)
+
+    red_mask, other_mask = _ink_masks(img)
+    h, w = red_mask.shape
+    hh, ww = h // _CELL * _CELL, w // _CELL * _CELL
+
+    def cell_sums(mask):
+        return mask[:hh, :ww].reshape(hh // _CELL, _CELL, ww // _CELL, _CELL).sum(axis=(1, 3))
+
+    red_cells = cell_sums(red_mask)
+    cells = red_cells + cell_sums(other_mask)
+    active = cells >= max(1, _CELL * _CELL // 20)
+
+    candidates = []
+    for comp in _components(active):
+        ys = [c[0] for c in comp]
+        xs = [c[1] for c in comp]
+        ink = int(sum(cells[c] for c in comp))
+        red = int(sum(red_cells[c] for c in comp))
+        area_ratio = ink / float(h * w)
+        bw, bh = max(xs) - min(xs) + 1, max(ys) - min(ys) + 1
+        aspect = bw / bh
+        if area_ratio < threshold or not (1 / 3 <= aspect <= 3):
+            continue
+        candidates.append({
+            "bbox": (min(xs) * _CELL / w, min(ys) * _CELL / h, (max(xs) + 1) * _CELL / w, (max(ys) + 1) * _CELL / h),
+            "ink_ratio": round(area_ratio, 5),
+            "color": "red" if red * 2 >= ink else "other",
+            # 外接框内印泥像素填充率，圆形印章的环形笔画通常在 0.1–0.6 之间
+            "fill": round(ink / float(bw * bh * _CELL * _CELL), 3)
+        })
+    return candidates
+
+
+def no_seal_candidate(data: bytes) -> bool:
+    """近似重复页复用前的本地筛查：页面中没有候选印章时才允许沿用其他页面的结果。"""
+    return not find_seal_candidates(data)
+
+
+def dump_candidates(data: bytes, page_num: int, candidates: list[dict], debug_dir: Path):
+    """调试输出：保存标注了候选框的页面缩略图与候选区域 JSON。"""
+    debug_dir = Path(debug_dir)
+    debug_dir.mkdir(parents=True, exist_ok=True)
+    with Image.open(io.BytesIO(data)) as src:
+        img = src.convert("RGB")
+    img.thumbnail((_WORK_SIZE, _WORK_SIZE))
+    draw = ImageDraw.Draw(img)
+    for cand in candidates:
+        x0, y0, x1, y1 = cand["bbox"]
+        draw.rectangle((x0 * img.width, y0 * img.height, x1 * img.width, y1 * img.height), outline=(0, 160, 255), width=3)
+    img.save(debug_dir / f"page_{page_num:03d}_triage.png")
+    with open(debug_dir / f"page_{page_num:03d}_triage.json", "w", encoding="utf-8") as f:
+        json.dump(candidates, f, ensure_ascii=False, indent=2)
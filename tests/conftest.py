@@ -0,0 +1,62 @@
+# tests/conftest.py
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+os.environ.setdefault("DASHSCOPE_API_KEY", "test-key")
+
+from common.config import Config  # noqa: E402
+
+# 光栅化依赖 poppler（pdftoppm），未安装时跳过端到端测试
+requires_poppler = pytest.mark.skipif(shutil.which("pdftoppm") is None, reason="需要 poppler（pdf2image 光栅化）")
+
+
+@pytest.fixture(scope="session")
+def state_dir(tmp_path_factory):
+    """整个测试会话共用的内部状态目录（台账、索引等进程级单例只会打开一次）。"""
+    return tmp_path_factory.mktemp("state")
+
+
+@pytest.fixture(autouse=True)
+def config(state_dir, tmp_path):
+    """每个测试使用临时目录与关闭响应缓存的配置，结束后还原。"""
+    saved = Config.snapshot()
+    Config.apply({
+        "ALLOWED_BASE_DIR": tmp_path,
+        "OUTPUT_DIR": tmp_path / "output",
+        "UPLOAD_DIR": tmp_path / "uploads",
+        "JOURNAL_DIR": tmp_path / "journal",
+        "CACHE_ENABLED": False,
+        "CACHE_PATH": state_dir / "responses.sqlite3",
+        "INDEX_PATH": state_dir / "audit_index.sqlite3",
+        "LEDGER_PATH": state_dir / "run_ledger.sqlite3",
+        "RETRY_BASE_DELAY": 0.01,
+    })
+    yield Config
+    Config.apply(saved)
+
+
+@pytest.fixture
+def mock_dashscope():
+    """本地 DashScope 替身（benchmarks/mock_dashscope.py），Config 指向该服务。"""
+    from mock_dashscope import MockServer, MockSettings
+
+    with MockServer(MockSettings(latency_ms=5, jitter_ms=0)) as server:
+        Config.DASHSCOPE_BASE_URL = server.base_url
+        yield server
+
+
+@pytest.fixture
+def synthetic_pdf(tmp_path):
+    """写出合成 PDF：synthetic_pdf(name, [PageSpec, ...]) -> 路径。"""
+    from synthetic_pdf import write_pdf
+
+    def make(name: str, pages: list):
+        return write_pdf(tmp_path / name, pages)
+    return make
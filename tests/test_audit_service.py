@@ -0,0 +1,94 @@
+# tests/test_audit_service.py
+import asyncio
+
+import aiohttp
+from aiohttp import web
+from synthetic_pdf import PageSpec
+
+from audit_service.server import create_app
+from common.config import Config
+from .conftest import requires_poppler
+
+
+async def _with_service(run):
+    runner = web.AppRunner(create_app(workers=1))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        async with aiohttp.ClientSession() as session:
+            return await run(session, f"http://127.0.0.1:{port}")
+    finally:
+        await runner.cleanup()
+
+
+async def _wait_job(session, base: str, job_id: str) -> dict:
+    for _ in range(200):
+        status = await (await session.get(f"{base}/jobs/{job_id}")).json()
+        if status["status"] in ("done", "error"):
+            return status
+        await asyncio.sleep(0.05)
+    raise TimeoutError(job_id)
+
+
+def test_invalid_mode_rejected_and_upload_removed():
+    async def run(session, base):
+        form = aiohttp.FormData()
+        form.add_field("mode", "bogus")
+        form.add_field("file", b"%PDF-1.4", filename="a.pdf")
+        resp = await session.post(f"{base}/jobs", data=form)
+        return resp.status
+
+    assert asyncio.run(_with_service(run)) == 400
+    assert not list(Config.UPLOAD_DIR.glob("*"))
+
+
+def test_malformed_json_body_returns_400():
+    async def run(session, base):
+        results = []
+        for data in (b"{not json", b"", b"\xff\xfe", b'["a.pdf"]', b'{"path": 1}'):
+            resp = await session.post(f"{base}/jobs", data=data, headers={"Content-Type": "application/json"})
+            results.append((resp.status, await resp.text()))
+        return results
+
+    results = asyncio.run(_with_service(run))
+    assert [status for status, _ in results] == [400] * 5
+    assert results[0][1] == "请求体不是有效的 JSON"
+
+
+def test_upload_over_limit_returns_413():
+    Config.SERVE_MAX_UPLOAD_MB = 1
+
+    async def run(session, base):
+        async def body():
+            for _ in range(40):
+                yield b"x" * 65536
+        form = aiohttp.FormData()
+        form.add_field("file", body(), filename="big.pdf")
+        resp = await session.post(f"{base}/jobs", data=form)
+        return resp.status
+
+    assert asyncio.run(_with_service(run)) == 413
+    assert not list(Config.UPLOAD_DIR.glob("*"))
+
+
+@requires_poppler
+def test_upload_from_other_cwd(tmp_path, monkeypatch, mock_dashscope, synthetic_pdf):
+    """服务从仓库以外的目录启动：上传的文件位于 UPLOAD_DIR，不应被判为路径不安全。"""
+    pdf = synthetic_pdf("doc.pdf", [PageSpec("scan", False), PageSpec("scan", True)])
+    cwd = tmp_path / "elsewhere"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    Config.ALLOWED_BASE_DIR = cwd
+
+    async def run(session, base):
+        form = aiohttp.FormData()
+        form.add_field("mode", "seal")
+        form.add_field("file", pdf.read_bytes(), filename="doc.pdf")
+        job = await (await session.post(f"{base}/jobs", data=form)).json()
+        return await _wait_job(session, base, job["id"])
+
+    status = asyncio.run(_with_service(run))
+    assert status["status"] == "done", status["error"]
+    assert not list(Config.UPLOAD_DIR.glob("*"))
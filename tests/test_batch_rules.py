@@ -0,0 +1,62 @@
+# tests/test_batch_rules.py
+import pytest
+
+from contract_checker.batch_rules import MAX_LISTED, BatchRule, compile_rules, run_batch_rules
+
+
+def _row(file: str, **fields) -> dict:
+    return {"file": f"/data/{file}", **fields}
+
+
+def _rules(issues: dict) -> dict:
+    return {i: sorted(item["Rule"] for item in items) for i, items in issues.items()}
+
+
+def test_duplicate_contract_id_ignores_case_and_separators():
+    table = [_row("a.pdf", contract_id="HT-2024/001"), _row("b.pdf", contract_id="ht2024001 "),
+             _row("c.pdf", contract_id="HT-2024-002")]
+    issues = run_batch_rules(table)
+    assert _rules(issues) == {0: ["duplicate_contract_id"], 1: ["duplicate_contract_id"]}
+    assert "b.pdf" in issues[0][0]["Message"] and issues[0][0]["Type"] == "ERROR"
+
+
+def test_same_id_in_one_file_is_not_duplicate():
+    table = [_row("a.pdf", contract_id="HT-1"), _row("a.pdf", contract_id="HT-1")]
+    assert run_batch_rules(table) == {}
+
+
+def test_bank_conflicts_in_both_directions():
+    table = [_row("a.pdf", party_b_name="乙方公司", bank_account_number="6222 0000 1111"),
+             _row("b.pdf", party_b_name="乙方公司", bank_account_number="6222-0000-2222"),
+             _row("c.pdf", party_b_name="另一公司", bank_account_number="622200001111")]
+    assert _rules(run_batch_rules(table)) == {
+        0: ["bank_account_shared", "party_b_bank_conflict"],
+        1: ["party_b_bank_conflict"],
+        2: ["bank_account_shared"],
+    }
+
+
+def test_amounts_compare_by_value():
+    parties = {"party_a_name": "甲方", "party_b_name": "乙方"}
+    table = [_row("a.pdf", total_amount_incl_tax="1,000.00元", **parties),
+             _row("b.pdf", total_amount_incl_tax="¥1000", **parties),
+             _row("c.pdf", total_amount_incl_tax="1000.5", **parties)]
+    assert _rules(run_batch_rules(table)) == {0: ["duplicate_amount_parties"], 1: ["duplicate_amount_parties"]}
+
+
+def test_blank_fields_are_skipped():
+    table = [_row("a.pdf", contract_id=""), _row("b.pdf", contract_id=" "), _row("c.pdf")]
+    assert run_batch_rules(table) == {}
+
+
+def test_large_groups_list_only_a_few_others():
+    table = [_row(f"{i}.pdf", contract_id="HT-1") for i in range(MAX_LISTED + 3)]
+    message = run_batch_rules(table)[0][0]["Message"]
+    assert message.count(".pdf") == MAX_LISTED and f"等 {MAX_LISTED + 2} 份" in message
+
+
+def test_invalid_rules_rejected():
+    with pytest.raises(ValueError, match="未知字段"):
+        compile_rules((BatchRule("bad", "error", ("no_such_field",), "file", ""),))
+    with pytest.raises(ValueError, match="级别无效"):
+        compile_rules((BatchRule("bad", "fatal", ("contract_id",), "file", ""),))
@@ -0,0 +1,24 @@
+# tests/test_cli.py
+import subprocess
+import sys
+
+import pytest
+
+from .conftest import ROOT
+
+
+def _run(*args):
+    return subprocess.run([sys.executable, str(ROOT / "main.py"), *args], capture_output=True, text=True, timeout=60)
+
+
+@pytest.mark.parametrize("flag", ["--seal-triage", "--seal-crop", "--early-stop", "--text-fast-path"])
+def test_mode_only_flags_rejected_in_combined_mode(flag, tmp_path):
+    proc = _run(flag, str(tmp_path / "x.pdf"))
+    assert proc.returncode == 2
+    assert flag in proc.stderr
+
+
+def test_mode_only_flag_rejected_in_other_mode(tmp_path):
+    proc = _run("--contract", "--seal-triage", str(tmp_path / "x.pdf"))
+    assert proc.returncode == 2
+    assert "--seal-triage" in proc.stderr
@@ -0,0 +1,56 @@
+# tests/test_contract_early_stop.py
+import asyncio
+from types import SimpleNamespace
+
+from synthetic_pdf import PageSpec
+
+from common.concurrency import arun_batches
+from contract_checker.checker import (EARLY_STOP_REQUIRED_FIELDS, JSON_SCHEMA, _FieldTracker,
+                                      acheck_contract_compliance)
+from .conftest import requires_poppler
+
+FILLED = {field: f"{field}-value" for field in JSON_SCHEMA["properties"]}
+
+
+def test_tracker_ignores_optional_fields():
+    tracker = _FieldTracker()
+    tracker.update({**FILLED, "related_entities": "", "quantity": ""})
+    assert tracker.complete
+
+
+def test_tracker_requires_clear_values():
+    tracker = _FieldTracker()
+    tracker.update({**FILLED, "seal_party_b": "（印章模糊）"})
+    assert not tracker.complete
+    tracker.update({"seal_party_b": "乙方合同专用章"})
+    assert tracker.complete
+    assert "related_entities" not in EARLY_STOP_REQUIRED_FIELDS
+
+
+def test_prefetched_pages_skip_model_call():
+    """预读入队的页面在取得并发名额后再检查一次，字段齐全后不再调用 worker。"""
+    calls = []
+
+    async def worker(pages):
+        calls.extend(p.page for p in pages)
+        await asyncio.sleep(0.01)
+        return [{"page": p.page, "result": FILLED} for p in pages]
+
+    tracker = _FieldTracker()
+    pages = (SimpleNamespace(page=n) for n in range(1, 31))
+    entries = asyncio.run(arun_batches(tracker.wrap(worker), pages, 1, concurrency=1))
+
+    assert calls == [1]
+    assert len(entries) == 30
+    assert all(e.get("skipped") for e in entries[1:])
+
+
+@requires_poppler
+def test_early_stop_end_to_end(mock_dashscope, synthetic_pdf):
+    pdf = synthetic_pdf("contract.pdf", [PageSpec("scan", n == 12) for n in range(1, 13)])
+    results = asyncio.run(acheck_contract_compliance(str(pdf), concurrency=4, early_stop=True))
+
+    assert [r["page"] for r in results] == list(range(1, 13))
+    assert mock_dashscope.stats["requests"] <= 4
+    skipped = [r for r in results if r.get("skipped")]
+    assert len(skipped) >= 8
@@ -0,0 +1,54 @@
+# tests/test_page_batch.py
+import asyncio
+import json
+
+import aiohttp
+import pytest
+
+from common.page_batch import BatchResponseError, parse_batch_response, with_single_fallback
+from common.pdf_to_images import RenderedPage
+from common.scheduler import ModelAPIError
+
+PAGES = [RenderedPage(n, b"img%d" % n) for n in (1, 2, 3)]
+
+
+def test_parse_batch_response():
+    raw = json.dumps({"pages": [{"page": 2, "x": 1}, {"page": 1, "x": 0}]})
+    assert parse_batch_response(raw, [1, 2]) == {1: {"x": 0}, 2: {"x": 1}}
+
+
+@pytest.mark.parametrize("raw", [
+    '{"pages": [{"page": 1}',
+    json.dumps({"pages": [{"page": 1}]}),
+    json.dumps({"pages": [{"page": 1}, {"page": 1}, {"page": 2}]}),
+    json.dumps({"pages": [{"page": 1}, {"page": 2}, {"page": 9}]}),
+])
+def test_parse_batch_response_rejects_mismatch(raw):
+    with pytest.raises(BatchResponseError):
+        parse_batch_response(raw, [1, 2])
+
+
+def _fallback(error):
+    singles = []
+
+    async def analyze_batch(pages):
+        raise error
+
+    async def process_single(page):
+        singles.append(page.page)
+        return {"page": page.page}
+
+    return asyncio.run(with_single_fallback(PAGES, analyze_batch, process_single)), singles
+
+
+def test_invalid_batch_response_falls_back_per_page():
+    entries, singles = _fallback(BatchResponseError("响应缺少页码: [3]"))
+    assert singles == [1, 2, 3]
+    assert [e["page"] for e in entries] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("error", [ModelAPIError(429, "Throttling"), ModelAPIError(503),
+                                   aiohttp.ClientConnectionError(), asyncio.TimeoutError()])
+def test_scheduler_errors_propagate_without_extra_requests(error):
+    with pytest.raises(type(error)):
+        _fallback(error)
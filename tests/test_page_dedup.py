@@ -0,0 +1,87 @@
+# tests/test_page_dedup.py
+import asyncio
+import io
+
+from PIL import Image, ImageDraw
+
+import common.text_layer as text_layer
+from common import page_dedup
+from common.page_dedup import PageIndex, is_plain_page, page_screen, perceptual_hash
+from common.pdf_to_images import RenderedPage
+from seal_detector.triage import no_seal_candidate
+
+PLAIN = {"requires_seal": False, "seals": []}
+
+
+def _page(signed: bool = False, variant: int = 0) -> bytes:
+    """签署页模板：正文若干行 + 两条签字横线；signed 为真时在甲方签字处加一笔手写签名。"""
+    img = Image.new("RGB", (800, 1130), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(20):
+        draw.rectangle((60, 60 + i * 30, 700 - (i + variant * 7) % 5 * 60, 72 + i * 30), fill=(20, 20, 20))
+    for y in (900, 1000):
+        draw.line((80, y, 360, y), fill=(20, 20, 20), width=2)
+    if signed:
+        draw.line([(100, 895), (120, 880), (140, 894), (160, 882), (180, 893)], fill=(30, 30, 30), width=2)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _distance(a: bytes, b: bytes) -> int:
+    return sum(bin(x ^ y).count("1") for x, y in zip(perceptual_hash(a)[0], perceptual_hash(b)[0]))
+
+
+def _run(index, pages, screen=None):
+    calls = []
+
+    async def worker(batch):
+        calls.extend(p.page for p in batch)
+        return [{"page": p.page, "image_bytes": len(p.data), "result": dict(PLAIN)} for p in batch]
+
+    async def run():
+        wrapped = index.wrap(worker, "seal", "doc.pdf", screen=screen)
+        return [entry for page in pages for entry in await wrapped([page])]
+    return asyncio.run(run()), calls
+
+
+def test_hash_distance():
+    assert _distance(_page(), _page()) == 0
+    assert _distance(_page(), _page(variant=1)) > 6
+
+
+def test_duplicate_plain_page_reused():
+    entries, calls = _run(PageIndex(100), [RenderedPage(1, _page()), RenderedPage(2, _page())])
+    assert calls == [1]
+    assert entries[1]["dedup_of"]["page"] == 1
+    assert entries[1]["image_bytes"] == 0
+    assert not is_plain_page(entries[1])
+
+
+def test_signed_copy_not_reused(monkeypatch):
+    """手写签名只改变极少的哈希位；文本层含签章字样的签署页不得沿用未签署模板页的结果。"""
+    blank, signed = _page(), _page(signed=True)
+    assert _distance(blank, signed) <= 6
+    pages = [RenderedPage(1, blank), RenderedPage(2, signed)]
+
+    # 无筛查时已签署副本会沿用模板页结果（这正是需要避免的情况）
+    _, calls = _run(PageIndex(100), pages)
+    assert calls == [1]
+
+    monkeypatch.setattr(page_dedup.shutil, "which", lambda name: "/usr/bin/" + name)
+    monkeypatch.setattr(text_layer, "extract_page_texts", lambda path: ["甲方（盖章）：\n签字：", "甲方（盖章）：\n签字："])
+    screen = page_screen("doc.pdf", no_seal_candidate)
+    entries, calls = _run(PageIndex(100), pages, screen=screen)
+    assert calls == [1, 2]
+    assert not any(e.get("dedup_of") for e in entries)
+
+
+def test_seal_candidate_page_not_reused():
+    stamped = Image.open(io.BytesIO(_page())).convert("RGB")
+    ImageDraw.Draw(stamped).ellipse((500, 850, 680, 1030), outline=(220, 30, 30), width=4)
+    buf = io.BytesIO()
+    stamped.save(buf, format="PNG")
+    pages = [RenderedPage(1, _page()), RenderedPage(2, buf.getvalue())]
+
+    _, calls = _run(PageIndex(100), pages, screen=lambda page: no_seal_candidate(page.data))
+    assert calls == [1, 2]
@@ -0,0 +1,97 @@
+# tests/test_page_journal.py
+import asyncio
+
+from common import pdf_to_images
+from common.config import Config
+from common.page_journal import PageJournal, merge_pages, resume_state
+
+
+def _entry(page: int, **extra) -> dict:
+    return {"page": page, "image_bytes": 10, "result": {"requires_seal": False, "seals": []}, **extra}
+
+
+def _pdf(tmp_path, name: str = "doc.pdf", content: bytes = b"%PDF-1.4 doc") -> str:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def _resumed_pages(pdf: str, mode: str = "seal") -> set:
+    journal = PageJournal.open(pdf, mode, resume=True)
+    journal.close()
+    return journal.done_pages()
+
+
+def test_resume_loads_completed_pages(tmp_path):
+    pdf = _pdf(tmp_path)
+    journal = PageJournal.open(pdf, "seal", resume=False)
+    journal.record([_entry(1), _entry(2, error="timeout"), _entry(3, skipped=True), _entry(4)])
+    journal.close()
+
+    resumed = PageJournal.open(pdf, "seal", resume=True)
+    assert resumed.done_pages() == {1, 4}
+    assert [e["page"] for e in resumed.entries()] == [1, 4]
+    resumed.complete()
+    assert not resumed.path.exists()
+
+
+def test_without_resume_starts_over(tmp_path):
+    pdf = _pdf(tmp_path)
+    journal = PageJournal.open(pdf, "seal", resume=False)
+    journal.record([_entry(1)])
+    journal.close()
+    restarted = PageJournal.open(pdf, "seal", resume=False)
+    assert not restarted.completed
+    restarted.close()
+
+
+def test_changed_settings_or_content_invalidate(tmp_path):
+    pdf = _pdf(tmp_path)
+    journal = PageJournal.open(pdf, "seal", resume=False)
+    journal.record([_entry(1)])
+    journal.close()
+
+    Config.SEAL_CROP_DPI += 1
+    assert not _resumed_pages(pdf)
+    Config.SEAL_CROP_DPI -= 1
+
+    journal = PageJournal.open(pdf, "seal", resume=False)
+    journal.record([_entry(1)])
+    journal.close()
+    (tmp_path / "doc.pdf").write_bytes(b"%PDF-1.4 edited")
+    assert not _resumed_pages(pdf)
+
+
+def test_copies_and_modes_use_separate_journals(tmp_path):
+    first, copy = _pdf(tmp_path, "a.pdf"), _pdf(tmp_path, "b.pdf")
+    journals = [PageJournal.open(first, "seal"), PageJournal.open(copy, "seal"), PageJournal.open(first, "contract")]
+    assert len({j.path for j in journals}) == 3
+    for j in journals:
+        j.close()
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    pdf = _pdf(tmp_path)
+    journal = PageJournal.open(pdf, "seal", resume=False)
+    journal.record([_entry(1), _entry(2)])
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"page": 3, "image_by')
+
+    assert _resumed_pages(pdf) == {1, 2}
+    # 续跑时重写日志，不完整的末行被丢弃
+    assert _resumed_pages(pdf) == {1, 2}
+
+
+def test_resume_state_and_merge(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_to_images, "get_page_count", lambda path: 4)
+    pdf = _pdf(tmp_path)
+    journal = PageJournal.open(pdf, "seal", resume=False)
+    journal.record([_entry(1), _entry(3)])
+
+    journaled, todo = asyncio.run(resume_state(pdf, journal))
+    assert todo == [2, 4]
+    merged = merge_pages(journaled, [_entry(2), _entry(4), _entry(3, image_bytes=99)])
+    assert [e["page"] for e in merged] == [1, 2, 3, 4]
+    assert merged[2]["image_bytes"] == 99
+    journal.close()
@@ -0,0 +1,23 @@
+# tests/test_path_validator.py
+from common.config import Config
+from common.path_validator import is_allowed_path, is_safe_path
+
+
+def test_safe_path_rejects_sibling_prefix(tmp_path):
+    base = tmp_path / "uploads"
+    assert is_safe_path(base, str(base / "a.pdf"))
+    assert not is_safe_path(base, str(tmp_path / "uploads_other" / "a.pdf"))
+    assert not is_safe_path(base, str(base / ".." / "a.pdf"))
+
+
+def test_upload_dir_allowed_from_other_cwd(tmp_path, monkeypatch):
+    """从其他工作目录启动服务时，上传目录中的文件仍可审核。"""
+    cwd = tmp_path / "elsewhere"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    Config.ALLOWED_BASE_DIR = cwd
+    Config.UPLOAD_DIR = tmp_path / "project" / "uploads"
+
+    assert is_allowed_path(str(Config.UPLOAD_DIR / "abc_x.pdf"))
+    assert is_allowed_path(str(cwd / "x.pdf"))
+    assert not is_allowed_path(str(tmp_path / "x.pdf"))
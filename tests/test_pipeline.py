@@ -0,0 +1,40 @@
+# tests/test_pipeline.py
+import asyncio
+
+from synthetic_pdf import PageSpec
+
+from audit_service.pipeline import aaudit_document
+from common.config import Config
+from common.page_journal import PageJournal
+from .conftest import requires_poppler
+
+PAGES = [PageSpec("scan", False), PageSpec("scan", True), PageSpec("text", False)]
+
+
+@requires_poppler
+def test_combined_audit_offline(mock_dashscope, synthetic_pdf):
+    pdf = synthetic_pdf("doc.pdf", PAGES)
+    report = asyncio.run(aaudit_document(str(pdf), "combined", export_excel=False))
+
+    outcome = report["outcome"]
+    assert outcome["pages"] == 3 and outcome["status"] == "pass"
+    assert outcome["contract"]["contract_id"]
+    assert [p["page"] for p in report["seal_report"]["raw_data"]] == [1, 2, 3]
+    assert mock_dashscope.stats["errors"] == 0
+
+
+@requires_poppler
+def test_resume_skips_journaled_pages(mock_dashscope, synthetic_pdf):
+    pdf = synthetic_pdf("doc.pdf", PAGES)
+    journal = PageJournal.open(str(pdf), "seal", resume=False)
+    journaled = {"page": 1, "image_bytes": 7, "result": {"requires_seal": False, "seals": []}}
+    journal.record([journaled])
+    journal.close()
+
+    Config.RESUME = True
+    report = asyncio.run(aaudit_document(str(pdf), "seal", export_excel=False))
+
+    assert mock_dashscope.stats["requests"] == 2
+    assert report["seal_report"]["raw_data"][0] == journaled
+    # 审核完成后删除日志
+    assert not journal.path.exists()
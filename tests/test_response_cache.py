@@ -0,0 +1,68 @@
+# tests/test_response_cache.py
+import asyncio
+import json
+
+from aiohttp import web
+
+from common.async_client import AsyncModelClient
+from common.config import Config
+from common.pdf_to_images import RenderedPage
+from common.response_cache import ResponseCache, is_cacheable
+
+
+def test_eviction_keeps_total_size_under_limit(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite3", max_bytes=1000, max_age_seconds=3600)
+    for i in range(100):
+        cache.put(f"k{i}", "x" * 50)
+    total = cache._conn.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+    assert total <= 1000
+    # 按最近访问时间淘汰：最后写入的条目保留
+    assert cache.get("k99") == "x" * 50
+    assert cache.get("k0") is None
+    cache.close()
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite3", max_bytes=10 ** 6, max_age_seconds=-1)
+    cache.put("k", "{}")
+    assert cache.get("k") is None
+    cache.close()
+
+
+def test_is_cacheable():
+    assert is_cacheable('{"requires_seal": true}')
+    assert not is_cacheable('{"requires_seal": tr')
+    assert not is_cacheable("[]")
+    assert not is_cacheable("")
+
+
+def test_unparseable_response_not_cached(tmp_path):
+    """被截断的响应不写入缓存，下一次请求重新调用模型；可解析的响应命中缓存。"""
+    replies = ['{"requires_seal": tr', '{"requires_seal": true}']
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        text = replies[0] if len(calls) == 1 else replies[1]
+        return web.json_response({"output": {"choices": [{"message": {"content": [{"text": text}]}}]}})
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/api/v1/{tail:.*}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        Config.DASHSCOPE_BASE_URL = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/api/v1"
+        page = RenderedPage(1, tmp_path.name.encode("utf-8"))
+        try:
+            async with AsyncModelClient() as client:
+                return [await client.vision(page, "prompt", {"type": "object"}) for _ in range(3)]
+        finally:
+            await runner.cleanup()
+
+    Config.CACHE_ENABLED = True
+    outputs = asyncio.run(run())
+    assert outputs[0] == replies[0]
+    assert json.loads(outputs[1]) == json.loads(outputs[2]) == {"requires_seal": True}
+    assert len(calls) == 2
@@ -0,0 +1,140 @@
+# tests/test_scheduler.py
+import asyncio
+import time
+
+import pytest
+
+from common.scheduler import CircuitBreaker, ModelAPIError, RequestScheduler, TokenBucket, is_retryable
+
+
+class Clock:
+    """可手动推进的 time.monotonic 替身。"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def test_bucket_burst_then_wait(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+    clock.now += 1.5
+    # 1.5 秒补充 3 个令牌，抵消欠账后剩 2 个（不超过容量）
+    assert bucket.reserve(2) == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_bucket_adjust_refunds_estimate(clock):
+    bucket = TokenBucket(rate=10, capacity=100)
+    assert bucket.reserve(100) == 0
+    assert bucket.reserve(50) == pytest.approx(5.0)
+    bucket.adjust(-50)
+    assert bucket.reserve(1) == pytest.approx(0.1)
+
+
+def test_unlimited_bucket():
+    bucket = TokenBucket(rate=0, capacity=0)
+    assert all(bucket.reserve(1e9) == 0 for _ in range(3))
+
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = CircuitBreaker(threshold=2, cooldown=10)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.wait_time() == 0
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.wait_time() == pytest.approx(10)
+
+    clock.now += 10
+    assert breaker.wait_time() == 0 and breaker.state == "half_open"
+    # 探测请求未返回前其余请求继续等待
+    assert breaker.wait_time() > 0
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.wait_time() == 0
+
+
+def test_breaker_reopens_on_failed_probe(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=5)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.wait_time() == 0
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.wait_time() == pytest.approx(5)
+
+
+def test_breaker_releases_cancelled_probe(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=5)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.wait_time() == 0
+    breaker.release_probe()
+    assert breaker.wait_time() == 0
+
+
+def test_retryable_errors():
+    assert is_retryable(ModelAPIError(429))
+    assert is_retryable(ModelAPIError(400, "Throttling.RateQuota"))
+    assert is_retryable(ModelAPIError(503))
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(ModelAPIError(400, "InvalidParameter"))
+    assert not is_retryable(ValueError("bad json"))
+
+
+def _scheduler(**kwargs):
+    options = dict(qps=0, tpm=0, max_retries=3, base_delay=0.001, max_delay=0.001,
+                   breaker_threshold=0, breaker_cooldown=1)
+    return RequestScheduler(**{**options, **kwargs})
+
+
+def test_submit_retries_retryable_errors():
+    errors = [ModelAPIError(429), ModelAPIError(503)]
+
+    async def call():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert asyncio.run(_scheduler().submit(call)) == "ok"
+    assert not errors
+
+
+def test_submit_gives_up_after_max_retries():
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise ModelAPIError(500)
+
+    with pytest.raises(ModelAPIError):
+        asyncio.run(_scheduler(max_retries=2).submit(call))
+    assert len(attempts) == 3
+
+
+def test_submit_fails_fast_on_client_error():
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise ModelAPIError(400, "InvalidParameter")
+
+    scheduler = _scheduler(breaker_threshold=1)
+    with pytest.raises(ModelAPIError):
+        asyncio.run(scheduler.submit(call))
+    assert len(attempts) == 1
+    # 接口有响应的错误不计入熔断
+    assert scheduler.breaker.state == "closed"
+
+
+def test_backoff_honours_retry_after():
+    scheduler = _scheduler(base_delay=1, max_delay=4)
+    assert all(0 <= scheduler.backoff(5) <= 4 for _ in range(20))
+    assert scheduler.backoff(1, retry_after=7) == 7
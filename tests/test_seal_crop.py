@@ -0,0 +1,76 @@
+# tests/test_seal_crop.py
+import asyncio
+import io
+import json
+
+import pdf2image
+from PIL import Image
+
+from common import pdf_to_images
+from common.pdf_to_images import RenderedPage, get_page_size, render_regions
+from seal_detector import detector, triage
+from seal_detector.crop import seal_regions
+from .conftest import requires_poppler
+
+
+def test_page_size_follows_rotation(monkeypatch):
+    monkeypatch.setattr(pdf2image, "pdfinfo_from_path", lambda path, first_page=None, last_page=None: {
+        "Pages": 5, f"Page {first_page:>4} size": "595.28 x 841.89 pts (A4)", f"Page {first_page:>4} rot": "90"})
+    assert get_page_size("a.pdf", 3) == (841.89, 595.28)
+
+
+def test_regions_render_only_the_boxes(monkeypatch):
+    calls = []
+
+    def render_box(pdf_path, page, dpi, x, y, w, h):
+        calls.append((page, dpi, x, y, w, h))
+        return Image.new("RGB", (w, h), "white")
+
+    def full_page(*args, **kwargs):
+        raise AssertionError("不应在裁剪 DPI 下渲染整页")
+
+    monkeypatch.setattr(pdf_to_images, "get_page_size", lambda path, page: (200.0, 100.0))
+    monkeypatch.setattr(pdf_to_images, "_render_box", render_box)
+    monkeypatch.setattr(pdf2image, "convert_from_path", full_page)
+
+    # 144 DPI 下页面为 400x200 像素
+    regions = render_regions("a.pdf", 2, [(0.5, 0.5, 0.75, 1.0), (0.1, 0.1, 0.1, 0.1)], 144)
+    assert calls == [(2, 144, 200, 100, 100, 100), (2, 144, 40, 20, 1, 1)]
+    assert [r.page for r in regions] == [2, 2]
+
+
+def test_crops_reuse_triage_candidates(monkeypatch):
+    rendered = []
+
+    def no_triage(data):
+        raise AssertionError("已有预筛结果时不应重新计算掩码")
+
+    def fake_render(pdf_path, page, boxes, dpi):
+        rendered.extend(boxes)
+        return [RenderedPage(page=page, data=b"crop") for _ in boxes]
+
+    class Client:
+        async def vision_images(self, images, prompt, schema):
+            return json.dumps({"requires_seal": True, "seals": []})
+
+    monkeypatch.setattr(triage, "find_seal_candidates", no_triage)
+    monkeypatch.setattr(detector, "render_regions", fake_render)
+    monkeypatch.setattr(detector.Config, "SEAL_CROP_PADDING", 0.0)
+    monkeypatch.setattr("seal_detector.crop.make_thumbnail", lambda page: page)
+
+    candidates = [{"bbox": (0.6, 0.7, 0.8, 0.85), "ink_ratio": 0.1, "color": "red", "fill": 0.2}]
+    entry = asyncio.run(detector._analyze_seal_crops(RenderedPage(page=4, data=b"page"), Client(), "a.pdf",
+                                                     candidates))
+    assert rendered == seal_regions(candidates) == [(0.6, 0.7, 0.8, 0.85)]
+    assert entry["seal_regions"] == [[0.6, 0.7, 0.8, 0.85]]
+
+
+@requires_poppler
+def test_region_matches_full_page_crop(synthetic_pdf):
+    from synthetic_pdf import PageSpec
+
+    pdf = synthetic_pdf("seal.pdf", [PageSpec(seal=True)])
+    page = pdf2image.convert_from_path(str(pdf), dpi=100, first_page=1, last_page=1)[0]
+    (region,) = render_regions(pdf, 1, [(0.25, 0.5, 0.75, 1.0)], 100)
+    with Image.open(io.BytesIO(region.data)) as crop:
+        assert abs(crop.width - page.width // 2) <= 2 and abs(crop.height - page.height // 2) <= 2
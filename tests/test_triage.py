@@ -0,0 +1,40 @@
+# tests/test_triage.py
+import io
+
+from PIL import Image, ImageDraw
+
+from seal_detector.triage import find_seal_candidates, no_seal_candidate
+
+
+def _page(seal_color=None) -> bytes:
+    """A4 比例页面：若干行黑色文字，可在右下角加盖指定颜色的圆形印章。"""
+    img = Image.new("RGB", (800, 1130), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(30):
+        draw.rectangle((60, 60 + i * 30, 700, 72 + i * 30), fill=(20, 20, 20))
+    if seal_color is not None:
+        draw.ellipse((520, 900, 700, 1080), outline=seal_color, width=8)
+        draw.text((570, 980), "SEAL", fill=seal_color)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_text_page_has_no_candidate():
+    assert find_seal_candidates(_page()) == []
+    assert no_seal_candidate(_page())
+
+
+def test_red_seal_is_candidate():
+    candidates = find_seal_candidates(_page((220, 30, 30)))
+    assert [c["color"] for c in candidates] == ["red"]
+    x0, y0, x1, y1 = candidates[0]["bbox"]
+    assert 0.6 < x0 < x1 <= 0.9 and 0.75 < y0 < y1 <= 0.97
+
+
+def test_blue_and_purple_seals_are_candidates():
+    """非红色印章也必须交给模型，否则“非红色”问题会因预筛跳过而漏报。"""
+    for color in ((40, 60, 190), (120, 40, 160)):
+        candidates = find_seal_candidates(_page(color))
+        assert [c["color"] for c in candidates] == ["other"], color
+        assert not no_seal_candidate(_page(color))